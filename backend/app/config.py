@@ -20,6 +20,13 @@ else:
 
 SQLALCHEMY_DATABASE_URL = f"sqlite:///{DB_PATH}"
 
+# Base de datos "fría" con las facturas y ventas archivadas (adjunta como 'archivo')
+ARCHIVE_DB_PATH = os.getenv('ARCHIVE_DB_PATH') or f"{os.path.splitext(DB_PATH)[0]}_archivo.db"
+
+# Respaldos en caliente (BACKUP_INTERVAL_HOURS=0 desactiva los programados)
+BACKUP_DIR = os.getenv('BACKUP_DIR') or os.path.join(os.path.dirname(DB_PATH), "respaldos")
+BACKUP_INTERVAL_HOURS = float(os.getenv('BACKUP_INTERVAL_HOURS', '24'))
+
 # --------------------------------------------------
 # 📌 Engine estable para Electron
 # --------------------------------------------------
@@ -37,8 +44,34 @@ engine = create_engine(
 def set_sqlite_pragma(dbapi_connection, connection_record):
     cursor = dbapi_connection.cursor()
     cursor.execute("PRAGMA foreign_keys=ON;")
+    cursor.execute("ATTACH DATABASE ? AS archivo", (ARCHIVE_DB_PATH,))
+    # Solo tiene efecto en bases nuevas (antes de crear tablas); permite
+    # compactar con incremental_vacuum sin un VACUUM que bloquee
+    cursor.execute("PRAGMA main.auto_vacuum=INCREMENTAL;")
+    cursor.execute("PRAGMA archivo.auto_vacuum=INCREMENTAL;")
     cursor.close()
 
+# --------------------------------------------------
+# 📌 Registro de consultas lentas (opcional)
+# --------------------------------------------------
+# SLOW_QUERY_MS=50 escribe en logs/consultas_lentas.jsonl cada sentencia
+# que tarde más de 50 ms, con su plan de ejecución (EXPLAIN QUERY PLAN)
+SLOW_QUERY_MS = os.getenv('SLOW_QUERY_MS')
+LOGS_DIR = os.getenv('LOGS_DIR') or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs"
+)
+
+if SLOW_QUERY_MS:
+    from app.utils.consultas_lentas import activar_registro
+    activar_registro(engine, float(SLOW_QUERY_MS), LOGS_DIR)
+
+# --------------------------------------------------
+# 📌 Endpoints de diagnóstico (/api/debug)
+# --------------------------------------------------
+# DEBUG_ENDPOINTS=1 habilita el perfilador y el estado completo de caja;
+# desactivado, las rutas no se registran
+DEBUG_ENDPOINTS = os.getenv('DEBUG_ENDPOINTS', '').lower() in ('1', 'true', 'si')
+
 # --------------------------------------------------
 # 📌 Sesión y Base
 # --------------------------------------------------
@@ -2,6 +2,10 @@
 from pydantic import BaseModel, Field, validator
 from typing import Optional, List, Dict, Any
 from decimal import Decimal
+import json
+from app.modelos.vehiculo_estacionado import CLASES_VEHICULO, CLASE_POR_DEFECTO
+
+CAMPOS_PRECIO_CLASE = ('precio_0_5_min', 'precio_6_30_min', 'precio_31_60_min', 'precio_hora_adicional', 'precio_nocturno')
 
 class RangoPersonalizado(BaseModel):
     """Schema para rangos personalizados"""
@@ -28,6 +32,18 @@ class ConfiguracionBase(BaseModel):
     # Rangos personalizados (JSON string)
     rangos_personalizados: Optional[str] = Field(None, description="Rangos personalizados en JSON")
 
+    # Tarifas de moto / camioneta (JSON string); lo que no definen sale de la tarifa base
+    tarifas_por_clase: Optional[str] = Field(
+        None,
+        description='Tarifas por clase en JSON, p. ej. {"moto": {"precio_31_60_min": 0.5}}'
+    )
+
+    # Recargo por ocupación (JSON string); "" las quita
+    bandas_ocupacion: Optional[str] = Field(
+        None,
+        description='Bandas en JSON, p. ej. [{"desde": 0.85, "multiplicador": 1.25}]'
+    )
+
     @validator('hora_inicio_nocturno', 'hora_fin_nocturno')
     def validar_formato_hora(cls, v):
         if v is not None:
@@ -45,6 +61,50 @@ class ConfiguracionBase(BaseModel):
                 raise ValueError('Formato de hora inválido, use HH:MM')
         return v
 
+    @validator('tarifas_por_clase')
+    def validar_tarifas_por_clase(cls, v):
+        if v is None or v == "":
+            return v
+        try:
+            tarifas = json.loads(v)
+        except json.JSONDecodeError:
+            raise ValueError('tarifas_por_clase debe ser un JSON válido')
+        if not isinstance(tarifas, dict):
+            raise ValueError('tarifas_por_clase debe ser un objeto {clase: tarifa}')
+        for clase, tarifa in tarifas.items():
+            if clase not in CLASES_VEHICULO or clase == CLASE_POR_DEFECTO:
+                raise ValueError(f'Clase inválida: {clase} (la tarifa base es la de {CLASE_POR_DEFECTO})')
+            if not isinstance(tarifa, dict):
+                raise ValueError(f'La tarifa de {clase} debe ser un objeto')
+            for campo, valor in tarifa.items():
+                if campo == 'rangos_personalizados':
+                    if valor is not None:
+                        [RangoPersonalizado(**rango) for rango in valor]
+                elif campo not in CAMPOS_PRECIO_CLASE:
+                    raise ValueError(f'{clase}: campo desconocido {campo}')
+                elif not isinstance(valor, (int, float)) or valor < 0:
+                    raise ValueError(f'{clase}: {campo} debe ser un número no negativo')
+        return v
+
+    @validator('bandas_ocupacion')
+    def validar_bandas_ocupacion(cls, v):
+        if v is None or v == "":
+            return v
+        try:
+            bandas = json.loads(v)
+        except json.JSONDecodeError:
+            raise ValueError('bandas_ocupacion debe ser un JSON válido')
+        if not isinstance(bandas, list):
+            raise ValueError('bandas_ocupacion debe ser una lista de bandas')
+        for i, banda in enumerate(bandas):
+            if not isinstance(banda, dict) or set(banda) != {'desde', 'multiplicador'}:
+                raise ValueError(f'Banda {i+1} debe tener desde y multiplicador')
+            if not isinstance(banda['desde'], (int, float)) or not 0 < banda['desde'] <= 1:
+                raise ValueError(f'Banda {i+1}: desde debe ser una fracción de ocupación (0-1]')
+            if not isinstance(banda['multiplicador'], (int, float)) or not 0 < banda['multiplicador'] <= 10:
+                raise ValueError(f'Banda {i+1}: multiplicador debe estar entre 0 y 10')
+        return v
+
 class ConfiguracionUpdate(ConfiguracionBase):
     """Schema para actualizar configuración"""
     pass
@@ -60,6 +120,8 @@ class ConfiguracionResponse(BaseModel):
     hora_inicio_nocturno: str
     hora_fin_nocturno: str
     rangos_personalizados: Optional[List[Dict[str, Any]]] = None
+    tarifas_por_clase: Optional[Dict[str, Dict[str, Any]]] = None
+    bandas_ocupacion: Optional[List[Dict[str, float]]] = None
     actualizado_en: Optional[str]
 
     class Config:
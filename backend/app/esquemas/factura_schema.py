@@ -55,6 +55,8 @@ class FacturaDetallada(BaseModel):
     es_nocturno: bool = False
     es_no_pagado: bool = False
     metodo_pago: str = "efectivo"  # ✅ AGREGAR
+    clase_vehiculo: str = "automovil"
+    multiplicador_ocupacion: float = 1.0
 
     class Config:
         from_attributes = True
@@ -97,6 +99,76 @@ class EstadisticasNoPagadasSchema(BaseModel):
     perdida_total: float
     vehiculos_nocturnos_no_pagados: Optional[int] = 0
 
+class IngresosClaseSchema(BaseModel):
+    """Ingresos y estadías de una clase de vehículo (salidas del período)"""
+    clase_vehiculo: str
+    estadias: int
+    estadias_pagadas: int
+    ingresos: float
+    no_cobrado: float
+    minutos_promedio: float
+    # Recargo por ocupación (tarifa dinámica) incluido en los ingresos
+    facturas_con_recargo: int = 0
+    recargo_ocupacion: float = 0.0
+
+class ReportePorClaseSchema(BaseModel):
+    """Schema para reporte de ingresos por clase de vehículo"""
+    fecha_inicio: str
+    fecha_fin: str
+    ingresos_total: float
+    clases: List[IngresosClaseSchema]
+
+    class Config:
+        from_attributes = True
+
+class IntervaloOcupacionSchema(BaseModel):
+    """Ocupación de un intervalo de la serie"""
+    inicio: str
+    fin: str
+    promedio: float
+    maximo: int
+    porcentaje_ocupacion: float
+
+class ReporteOcupacionSchema(BaseModel):
+    """Schema para la curva de ocupación de un rango"""
+    inicio: str
+    fin: str
+    intervalo_minutos: int
+    capacidad: int
+    estadias: int
+    pico: int
+    instante_pico: Optional[str] = None
+    minutos_a_capacidad: float
+    porcentaje_a_capacidad: float
+    ocupacion_promedio: float
+    intervalos: List[IntervaloOcupacionSchema]
+
+    class Config:
+        from_attributes = True
+
+class PercentilesDuracionSchema(BaseModel):
+    """Percentiles de duración de un valor de la dimensión (y de un día, si se pidió por día)"""
+    fecha: Optional[str] = None
+    valor: str
+    estadias: int
+    promedio_minutos: float
+    minimo_minutos: float
+    maximo_minutos: float
+    p50_minutos: float
+    p90_minutos: float
+    p99_minutos: float
+
+class ReporteDuracionesSchema(BaseModel):
+    """Schema para los percentiles de duración de un rango (sketches diarios combinados)"""
+    fecha_inicio: str
+    fecha_fin: str
+    dimension: str
+    precision_relativa: float
+    grupos: List[PercentilesDuracionSchema]
+
+    class Config:
+        from_attributes = True
+
 class ReporteDetalladoSchema(BaseModel):
     """Schema para reporte detallado con gráficos INCLUYENDO NO PAGADOS"""
     fecha: str
@@ -109,6 +181,8 @@ class ReporteDetalladoSchema(BaseModel):
     distribucion_tiempo: DistribucionTiempoSchema
     # ✅ NUEVO: Estadísticas de no pagados
     estadisticas_no_pagadas: Optional[EstadisticasNoPagadasSchema] = None
+    # Ingresos de los que SALIERON, por clase de vehículo
+    ingresos_por_clase: List[IngresosClaseSchema] = []
 
     class Config:
         from_attributes = True
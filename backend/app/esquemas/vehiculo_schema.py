@@ -1,8 +1,11 @@
 from pydantic import BaseModel, Field, validator
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 from typing import Literal  # 👈 AGREGAR ESTA IMPORTACIÓN
 
+# Mismas clases que CLASES_VEHICULO (app/modelos/vehiculo_estacionado.py)
+ClaseVehiculo = Literal["automovil", "moto", "camioneta"]
+
 
 class VehiculoBase(BaseModel):
     """Schema base para vehículos"""
@@ -19,6 +22,7 @@ class VehiculoEntrada(VehiculoBase):
     # CAMBIO: De le=15 a le=24
     espacio_numero: int = Field(..., ge=1, le=24, description="Número de espacio (1-24)")
     es_nocturno: bool = Field(False, description="Indica si el vehículo pagará tarifa nocturna")
+    clase_vehiculo: ClaseVehiculo = Field("automovil", description="Clase de vehículo (define la tarifa)")
 
 class VehiculoSalida(BaseModel):
     """Schema para registrar salida de un vehículo"""
@@ -31,6 +35,27 @@ class VehiculoSalida(BaseModel):
         """Convertir placa a mayúsculas y eliminar espacios"""
         return v.upper().strip()
 
+class EventoLote(BaseModel):
+    """Evento de entrada o salida dentro de un lote (controlador de portón, sincronización)"""
+    tipo: Literal["entrada", "salida"]
+    placa: str = Field(..., min_length=1, max_length=20, description="Placa del vehículo")
+    # Rango validado por evento en el servicio: un espacio inválido no rechaza todo el lote
+    espacio_numero: Optional[int] = Field(None, description="Número de espacio (solo entradas)")
+    es_nocturno: bool = Field(False, description="Solo entradas")
+    clase_vehiculo: ClaseVehiculo = Field("automovil", description="Solo entradas")
+    es_no_pagado: bool = Field(False, description="Solo salidas")
+    metodo_pago: Literal["efectivo", "tarjeta"] = Field("efectivo", description="Solo salidas")
+    fecha_hora: Optional[datetime] = Field(None, description="Momento del evento (por defecto, ahora)")
+
+    @validator('placa')
+    def validar_placa(cls, v):
+        """Convertir placa a mayúsculas y eliminar espacios"""
+        return v.upper().strip()
+
+class LoteEventos(BaseModel):
+    """Lote ordenado de eventos de entrada/salida"""
+    eventos: List[EventoLote] = Field(..., min_items=1, max_items=5000)
+
 class VehiculoResponse(BaseModel):
     """Schema para respuesta de vehículo"""
     id: int
@@ -41,6 +66,7 @@ class VehiculoResponse(BaseModel):
     costo_total: Optional[float]
     estado: str
     es_nocturno: bool
+    clase_vehiculo: str = "automovil"
     creado_en: str
 
     class Config:
@@ -71,6 +97,7 @@ class EspacioResponse(BaseModel):
     placa: Optional[str] = None
     entrada: Optional[str] = None
     es_nocturno: Optional[bool] = False
+    clase_vehiculo: Optional[str] = None
 
     class Config:
         from_attributes = True
\ No newline at end of file
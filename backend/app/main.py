@@ -4,17 +4,28 @@ from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy import text
 import sys
 
-from app.config import Base, engine, SessionLocal
+from app.config import Base, engine, SessionLocal, DEBUG_ENDPOINTS
+from app.utils.esquema_db import agregar_columnas_faltantes, crear_indices_faltantes, migrar_vehiculos_activos, crear_vistas
+from app.utils.metricas import MiddlewareMetricas
+from app.utils.idempotencia import MiddlewareIdempotencia
 
 # ----------------------------------------------------------------------
 # 🔹 IMPORTAR MODELOS (ANTES DE CREATE_ALL)
 # ----------------------------------------------------------------------
 from app.modelos import configuracion_precios
 from app.modelos import vehiculo_estacionado
+from app.modelos import vehiculo_activo
 from app.modelos import historial_factura
 from app.modelos import producto  
 from app.modelos import venta_servicio  
 from app.modelos import caja 
+from app.modelos import clave_idempotencia
+from app.modelos import version_tarifa
+from app.modelos import sketch_duracion
+
+from app.servicios.archivo_service import ArchivoService
+from app.servicios.respaldo_service import RespaldoService
+from app.servicios.duracion_service import DuracionService
 
 
 
@@ -36,6 +47,13 @@ app = FastAPI(
     description="API REST del sistema de parqueadero para hotel."
 )
 
+# ----------------------------------------------------------------------
+# 🔹 IDEMPOTENCY-KEY (reintentos de entrada/salida/venta sin duplicar)
+# Se agrega antes que CORS para quedar dentro: las respuestas repetidas
+# también llevan las cabeceras CORS.
+# ----------------------------------------------------------------------
+app.add_middleware(MiddlewareIdempotencia)
+
 # ----------------------------------------------------------------------
 # 🔹 CORS
 # ----------------------------------------------------------------------
@@ -52,6 +70,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ----------------------------------------------------------------------
+# 🔹 MÉTRICAS (tiempo y consultas SQL por ruta → /api/metrics)
+# ----------------------------------------------------------------------
+app.add_middleware(MiddlewareMetricas)
+
 # ----------------------------------------------------------------------
 # 🔹 STARTUP: CREAR TABLAS + CONFIGURAR SQLITE
 # ----------------------------------------------------------------------
@@ -63,16 +86,39 @@ def startup_db():
     # Crear tablas si no existen
     Base.metadata.create_all(bind=engine)
 
+    # Columnas e índices agregados a tablas que ya existían
+    agregar_columnas_faltantes(engine)
+    crear_indices_faltantes(engine)
+
+    # Vehículos activos de bases anteriores a la tabla activa + vistas
+    migrar_vehiculos_activos(engine)
+    crear_vistas(engine)
+
+    # Tablas de la base de archivo (adjunta como 'archivo')
+    ArchivoService.preparar(engine)
+
+    # Sketches de duración de bases anteriores a ellos (una sola vez)
+    DuracionService.inicializar()
+
     # Activar WAL UNA SOLA VEZ
     try:
         with engine.connect() as conn:
             conn.execute(text("PRAGMA journal_mode=WAL;"))
+            conn.execute(text("PRAGMA archivo.journal_mode=WAL;"))
             conn.execute(text("PRAGMA synchronous=NORMAL;"))
             conn.execute(text("PRAGMA foreign_keys=ON;"))
         print("[DB] SQLite configurado en modo WAL")
     except Exception as e:
         print(f"[DB] WARNING: No se pudo activar WAL: {e}")
 
+    # Respaldos en caliente y mantenimiento en segundo plano
+    RespaldoService.iniciar_programador()
+
+
+@app.on_event("shutdown")
+def shutdown_db():
+    RespaldoService.detener_programador()
+
 # ----------------------------------------------------------------------
 # 🔹 IMPORTAR ROUTERS
 # ----------------------------------------------------------------------
@@ -83,6 +129,12 @@ from app.routers import (
     producto_routes,
     venta_servicio_routes,
     caja_routes, 
+    eventos_routes,
+    metricas_routes,
+    debug_routes,
+    archivo_routes,
+    respaldo_routes,
+    exportacion_routes,
 )
 
 app.include_router(configuracion_routes.router)
@@ -91,6 +143,15 @@ app.include_router(reporte_routes.router)
 app.include_router(producto_routes.router)  
 app.include_router(venta_servicio_routes.router)  
 app.include_router(caja_routes.router)
+app.include_router(eventos_routes.router)
+app.include_router(metricas_routes.router)
+app.include_router(archivo_routes.router)
+app.include_router(respaldo_routes.router)
+app.include_router(exportacion_routes.router)
+
+# Diagnóstico: solo con DEBUG_ENDPOINTS activo
+if DEBUG_ENDPOINTS:
+    app.include_router(debug_routes.router)
 
 
 # ----------------------------------------------------------------------
@@ -0,0 +1,21 @@
+# app/modelos/clave_idempotencia.py
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
+from datetime import datetime
+from app.config import Base
+
+class ClaveIdempotencia(Base):
+    """Respuesta guardada de una escritura enviada con cabecera Idempotency-Key"""
+    __tablename__ = 'claves_idempotencia'
+
+    id = Column(Integer, primary_key=True, index=True)
+    clave = Column(String(255), nullable=False)
+    ruta = Column(String(100), nullable=False)
+    huella = Column(String(64), nullable=False)  # sha256 del cuerpo de la petición
+    codigo_estado = Column(Integer, nullable=False)
+    tipo_contenido = Column(String(100))
+    respuesta = Column(Text, nullable=False)
+    creado_en = Column(DateTime, default=datetime.now, nullable=False, index=True)
+
+    __table_args__ = (
+        Index('ix_claves_idempotencia_clave_ruta', 'clave', 'ruta', unique=True),
+    )
@@ -26,6 +26,13 @@ class ConfiguracionPrecios(Base):
     # Configuración personalizada de rangos (opcional, en formato JSON)
     rangos_personalizados = Column(Text, nullable=True, default=None)
     
+    # Tarifas de moto y camioneta (JSON): {"moto": {"precio_0_5_min": 0.25, ...}}.
+    # Los campos que no aparecen se toman de la tarifa base (automóvil)
+    tarifas_por_clase = Column(Text, nullable=True, default=None)
+    
+    # Recargo por ocupación (JSON): [{"desde": 0.85, "multiplicador": 1.25}, ...]
+    bandas_ocupacion = Column(Text, nullable=True, default=None)
+    
     actualizado_en = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     def to_dict(self):
@@ -36,6 +43,14 @@ class ConfiguracionPrecios(Base):
                 rangos = json.loads(self.rangos_personalizados)
             except:
                 rangos = []
+        try:
+            tarifas_por_clase = json.loads(self.tarifas_por_clase) if self.tarifas_por_clase else {}
+        except:
+            tarifas_por_clase = {}
+        try:
+            bandas_ocupacion = json.loads(self.bandas_ocupacion) if self.bandas_ocupacion else []
+        except:
+            bandas_ocupacion = []
         
         return {
             'id': self.id,
@@ -47,5 +62,7 @@ class ConfiguracionPrecios(Base):
             'hora_inicio_nocturno': str(self.hora_inicio_nocturno),
             'hora_fin_nocturno': str(self.hora_fin_nocturno),
             'rangos_personalizados': rangos,
+            'tarifas_por_clase': tarifas_por_clase,
+            'bandas_ocupacion': bandas_ocupacion,
             'actualizado_en': self.actualizado_en.isoformat() if self.actualizado_en else None
         }
\ No newline at end of file
@@ -3,6 +3,7 @@ from sqlalchemy import Column, Integer, String, Numeric, DateTime, ForeignKey, T
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.config import Base
+from app.modelos.vehiculo_estacionado import CLASE_POR_DEFECTO
 
 class HistorialFactura(Base):
     """Modelo para el historial de facturas"""
@@ -10,7 +11,7 @@ class HistorialFactura(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     vehiculo_id = Column(Integer, ForeignKey('vehiculos_estacionados.id'), nullable=False)
-    placa = Column(String(20), nullable=False)
+    placa = Column(String(20), nullable=False, index=True)
     espacio_numero = Column(Integer, nullable=False)
     fecha_hora_entrada = Column(DateTime, nullable=False)
     fecha_hora_salida = Column(DateTime, nullable=False)
@@ -23,6 +24,9 @@ class HistorialFactura(Base):
     
     # ✅ NUEVO: Método de pago
     metodo_pago = Column(String(20), nullable=False, default="efectivo")  # 'efectivo' o 'tarjeta'
+    clase_vehiculo = Column(String(20), nullable=False, default=CLASE_POR_DEFECTO, server_default=CLASE_POR_DEFECTO)
+    # Recargo por ocupación aplicado al cobrar (1 = sin recargo)
+    multiplicador_ocupacion = Column(Numeric(4, 2), nullable=False, default=1, server_default='1')
 
     # Relación con vehículo
     vehiculo = relationship("VehiculoEstacionado", back_populates="factura")
@@ -42,5 +46,7 @@ class HistorialFactura(Base):
             'fecha_generacion': self.fecha_generacion.isoformat(),
             'es_nocturno': self.es_nocturno,
             'es_no_pagado': self.es_no_pagado,
-            'metodo_pago': self.metodo_pago  # ✅ AGREGAR
+            'metodo_pago': self.metodo_pago,  # ✅ AGREGAR
+            'clase_vehiculo': self.clase_vehiculo,
+            'multiplicador_ocupacion': float(self.multiplicador_ocupacion) if self.multiplicador_ocupacion is not None else 1.0
         }
\ No newline at end of file
@@ -0,0 +1,31 @@
+# app/modelos/sketch_duracion.py
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, Index
+from datetime import datetime
+from app.config import Base
+
+# Dimensiones con un sketch por día y por valor:
+#   total   -> ''                       (todas las estadías del día)
+#   espacio -> '1'..'24'
+#   horario -> 'nocturno' / 'diurno'    (es_nocturno de la estadía)
+#   clase   -> clase_vehiculo
+DIMENSIONES_DURACION = ('total', 'espacio', 'horario', 'clase')
+
+class SketchDuracion(Base):
+    """
+    Sketch de cuantiles (SketchCuantiles, en JSON) de las duraciones de
+    las estadías que salieron un día, para un valor de una dimensión.
+    Se actualiza en la misma transacción que cada factura.
+    """
+    __tablename__ = 'sketches_duracion'
+
+    id = Column(Integer, primary_key=True, index=True)
+    fecha = Column(Date, nullable=False)  # día de salida
+    dimension = Column(String(20), nullable=False)
+    valor = Column(String(20), nullable=False, default='')
+    estadias = Column(Integer, nullable=False, default=0)
+    datos = Column(Text, nullable=False)
+    actualizado_en = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+    __table_args__ = (
+        Index('ix_sketches_duracion_dimension_fecha_valor', 'dimension', 'fecha', 'valor', unique=True),
+    )
@@ -0,0 +1,111 @@
+# app/modelos/vehiculo_activo.py
+from sqlalchemy import (
+    Column, Integer, String, DateTime, Boolean, Numeric, CheckConstraint,
+    MetaData, Table, select, func, union_all, literal_column
+)
+from sqlalchemy.dialects import sqlite
+from datetime import datetime
+from app.config import Base
+from app.modelos.vehiculo_estacionado import VehiculoEstacionado, CLASE_POR_DEFECTO
+
+# Espacios del parqueadero (1-24)
+CAPACIDAD_ESPACIOS = 24
+
+class VehiculoActivo(Base):
+    """
+    Vehículos que están en el parqueadero ahora (a lo sumo 24 filas).
+
+    Al salir, la fila se mueve a vehiculos_estacionados (historial de
+    estadías) con el mismo id, en la misma transacción que la factura.
+    """
+    __tablename__ = 'vehiculos_activos'
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    placa = Column(String(20), nullable=False, unique=True)
+    espacio_numero = Column(Integer, nullable=False, unique=True)
+    fecha_hora_entrada = Column(DateTime, nullable=False, default=datetime.now)
+    es_nocturno = Column(Boolean, default=False, nullable=False)
+    clase_vehiculo = Column(String(20), nullable=False, default=CLASE_POR_DEFECTO, server_default=CLASE_POR_DEFECTO)
+    creado_en = Column(DateTime, default=datetime.now)
+
+    __table_args__ = (
+        CheckConstraint('espacio_numero >= 1 AND espacio_numero <= 24', name='check_espacio_activo_valido'),
+    )
+
+    # Mismos atributos que VehiculoEstacionado para el código que los lee
+    estado = 'activo'
+    fecha_hora_salida = None
+    costo_total = None
+    es_no_pagado = False
+
+    def to_dict(self):
+        """Convertir el modelo a diccionario (mismas claves que VehiculoEstacionado)"""
+        return {
+            'id': self.id,
+            'placa': self.placa,
+            'espacio_numero': self.espacio_numero,
+            'fecha_hora_entrada': self.fecha_hora_entrada.isoformat() if self.fecha_hora_entrada else None,
+            'fecha_hora_salida': None,
+            'costo_total': None,
+            'estado': 'activo',
+            'es_nocturno': self.es_nocturno,
+            'es_no_pagado': False,
+            'clase_vehiculo': self.clase_vehiculo,
+            'creado_en': self.creado_en.isoformat() if self.creado_en else None
+        }
+
+
+def siguiente_id_vehiculo():
+    """
+    Próximo id de estadía como subconsulta escalar. Los ids se comparten
+    entre la tabla activa y el historial para que una estadía conserve su
+    id al moverse (historial_facturas.vehiculo_id apunta al historial).
+    """
+    activos = VehiculoActivo.__table__
+    historial = VehiculoEstacionado.__table__
+    maximos = union_all(
+        select(func.max(activos.c.id).label('id')),
+        select(func.max(historial.c.id).label('id'))
+    ).subquery()
+    return select(func.coalesce(func.max(maximos.c.id), 0) + 1).scalar_subquery()
+
+
+# Vista de compatibilidad: todas las estadías (activas + historial) con las
+# columnas de vehiculos_estacionados. Se crea al arrancar (esquema_db);
+# tiene su propio MetaData para que create_all no la trate como tabla.
+VISTA_VEHICULOS_TODOS = 'vehiculos_estacionados_todos'
+
+vehiculos_todos = Table(
+    VISTA_VEHICULOS_TODOS, MetaData(),
+    Column('id', Integer, primary_key=True),
+    Column('placa', String(20)),
+    Column('espacio_numero', Integer),
+    Column('fecha_hora_entrada', DateTime),
+    Column('fecha_hora_salida', DateTime),
+    Column('costo_total', Numeric(10, 2)),
+    Column('estado', String(20)),
+    Column('es_nocturno', Boolean),
+    Column('es_no_pagado', Boolean),
+    Column('clase_vehiculo', String(20)),
+    Column('creado_en', DateTime),
+)
+
+
+def sql_vista_vehiculos_todos() -> str:
+    activos = VehiculoActivo.__table__
+    historial = VehiculoEstacionado.__table__
+    consulta = union_all(
+        select(
+            activos.c.id, activos.c.placa, activos.c.espacio_numero, activos.c.fecha_hora_entrada,
+            literal_column('NULL').label('fecha_hora_salida'), literal_column('NULL').label('costo_total'),
+            literal_column("'activo'").label('estado'), activos.c.es_nocturno,
+            literal_column('0').label('es_no_pagado'), activos.c.clase_vehiculo, activos.c.creado_en
+        ),
+        select(
+            historial.c.id, historial.c.placa, historial.c.espacio_numero, historial.c.fecha_hora_entrada,
+            historial.c.fecha_hora_salida, historial.c.costo_total, historial.c.estado,
+            historial.c.es_nocturno, historial.c.es_no_pagado, historial.c.clase_vehiculo,
+            historial.c.creado_en
+        )
+    )
+    return str(consulta.compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True}))
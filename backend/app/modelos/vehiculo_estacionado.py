@@ -3,19 +3,24 @@ from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.config import Base
 
+# Clases de vehículo con tarifa propia; la tarifa base es la de automóvil
+CLASES_VEHICULO = ('automovil', 'moto', 'camioneta')
+CLASE_POR_DEFECTO = 'automovil'
+
 class VehiculoEstacionado(Base):
-    """Modelo para vehículos estacionados"""
+    """Historial de estadías (los vehículos presentes están en vehiculos_activos)"""
     __tablename__ = 'vehiculos_estacionados'
     
     id = Column(Integer, primary_key=True, index=True)
     placa = Column(String(20), nullable=False, index=True)
     espacio_numero = Column(Integer, nullable=False, index=True)
     fecha_hora_entrada = Column(DateTime, nullable=False, default=datetime.now)
-    fecha_hora_salida = Column(DateTime, nullable=True)
+    fecha_hora_salida = Column(DateTime, nullable=True, index=True)
     costo_total = Column(Numeric(10, 2), nullable=True)
     estado = Column(Enum('activo', 'finalizado', name='estado_vehiculo'), default='activo', index=True)
     es_nocturno = Column(Boolean, default=False, nullable=False, index=True)
     es_no_pagado = Column(Boolean, default=False, nullable=False, index=True) # ✅ NUEVO
+    clase_vehiculo = Column(String(20), nullable=False, default=CLASE_POR_DEFECTO, server_default=CLASE_POR_DEFECTO)
     creado_en = Column(DateTime, default=datetime.now)
 
     # Relación con facturas
@@ -37,5 +42,6 @@ class VehiculoEstacionado(Base):
             'estado': self.estado,
             'es_nocturno': self.es_nocturno,
             'es_no_pagado': self.es_no_pagado, # ✅ NUEVO
+            'clase_vehiculo': self.clase_vehiculo,
             'creado_en': self.creado_en.isoformat() if self.creado_en else None
         }
\ No newline at end of file
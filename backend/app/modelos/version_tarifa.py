@@ -0,0 +1,44 @@
+# app/modelos/version_tarifa.py
+from sqlalchemy import Column, Integer, Numeric, Time, DateTime, Text
+from datetime import datetime
+from app.config import Base
+
+class VersionTarifa(Base):
+    """
+    Tarifa vigente desde un instante. Cada cambio de configuracion_precios
+    agrega una versión; las estadías que cruzan un cambio se cobran por
+    tramos con la versión de cada tramo.
+    """
+    __tablename__ = 'versiones_tarifa'
+
+    id = Column(Integer, primary_key=True, index=True)
+    vigente_desde = Column(DateTime, nullable=False, unique=True, index=True)
+
+    precio_0_5_min = Column(Numeric(10, 2), nullable=False)
+    precio_6_30_min = Column(Numeric(10, 2), nullable=False)
+    precio_31_60_min = Column(Numeric(10, 2), nullable=False)
+    precio_hora_adicional = Column(Numeric(10, 2), nullable=False)
+    precio_nocturno = Column(Numeric(10, 2), nullable=False)
+    hora_inicio_nocturno = Column(Time, nullable=False)
+    hora_fin_nocturno = Column(Time, nullable=False)
+    rangos_personalizados = Column(Text, nullable=True)
+    tarifas_por_clase = Column(Text, nullable=True)
+
+    creado_en = Column(DateTime, default=datetime.now)
+
+    def to_dict(self):
+        """Convertir el modelo a diccionario"""
+        return {
+            'id': self.id,
+            'vigente_desde': self.vigente_desde.isoformat() if self.vigente_desde else None,
+            'precio_0_5_min': float(self.precio_0_5_min),
+            'precio_6_30_min': float(self.precio_6_30_min),
+            'precio_31_60_min': float(self.precio_31_60_min),
+            'precio_hora_adicional': float(self.precio_hora_adicional),
+            'precio_nocturno': float(self.precio_nocturno),
+            'hora_inicio_nocturno': str(self.hora_inicio_nocturno),
+            'hora_fin_nocturno': str(self.hora_fin_nocturno),
+            'rangos_personalizados': self.rangos_personalizados,
+            'tarifas_por_clase': self.tarifas_por_clase,
+            'creado_en': self.creado_en.isoformat() if self.creado_en else None
+        }
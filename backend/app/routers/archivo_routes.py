@@ -0,0 +1,38 @@
+# app/routers/archivo_routes.py
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from app.config import get_db
+from app.servicios.archivo_service import ArchivoService, MESES_EN_CALIENTE, TAMANO_LOTE
+
+router = APIRouter(
+    prefix="/api/archivo",
+    tags=["Archivo"]
+)
+
+
+@router.get("/estado")
+def obtener_estado_archivo(db: Session = Depends(get_db)):
+    """Corte actual y filas en la base principal y en el archivo por tabla"""
+    try:
+        return {"success": True, "data": ArchivoService.obtener_estado(db)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al obtener estado del archivo: {str(e)}")
+
+
+@router.post("/ejecutar")
+def ejecutar_archivado(
+    meses: int = Query(MESES_EN_CALIENTE, ge=1, description="Meses completos que se conservan en la base principal"),
+    lote: int = Query(TAMANO_LOTE, ge=1, le=50000),
+    db: Session = Depends(get_db)
+):
+    """
+    Mover a la base de archivo las facturas pagadas y las ventas de los
+    meses anteriores al corte. Los reportes siguen viéndolas.
+    """
+    try:
+        return {"success": True, "data": ArchivoService.archivar(db, meses=meses, lote=lote)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error al archivar: {str(e)}")
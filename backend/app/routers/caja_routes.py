@@ -1,9 +1,11 @@
 # app/routers/caja_routes.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from datetime import date
 from app.config import get_db
-import traceback 
 from app.servicios.caja_service import CajaService
+from app.servicios.descarga_reportes_service import DescargaReportesService
 from app.esquemas.caja_schema import (
     CajaAperturaRequest,
     CajaCierreRequest,
@@ -14,16 +16,27 @@ from app.esquemas.caja_schema import (
     AgregarEfectivoRequest,
     EgresoRequest
 )
+from app.utils.cache_respuestas import CacheRespuestas
+from app.utils.serializacion import RespuestaJSON
 from typing import List
 
 router = APIRouter(prefix="/api/caja", tags=["Caja"])
 
 @router.get("/estado", response_model=CajaEstadoResponse)
-async def obtener_estado_caja(db: Session = Depends(get_db)):
+async def obtener_estado_caja(request: Request, db: Session = Depends(get_db)):
     try:
-        estado = CajaService.obtener_estado_caja(db)
-        print(f"📊 Estado de caja enviado: saldo_neto={estado.get('saldo_neto', 0)}, total_dia_egresos={estado.get('total_dia_egresos', 0)}")
-        return estado
+        def generar():
+            estado = CajaService.obtener_estado_caja(db)
+            print(f"📊 Estado de caja enviado: saldo_neto={estado.get('saldo_neto', 0)}, total_dia_egresos={estado.get('total_dia_egresos', 0)}")
+            return estado
+
+        # La caja abierta depende del día: la fecha forma parte de la clave
+        return CacheRespuestas.responder(
+            request,
+            f"caja:estado:{date.today().isoformat()}",
+            generar,
+            CajaEstadoResponse
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al obtener estado de caja: {str(e)}")
 
@@ -70,10 +83,27 @@ async def obtener_resumen_caja(db: Session = Depends(get_db)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al obtener resumen: {str(e)}")
 
-@router.get("/historial", response_model=List[CajaResponse])
+@router.get("/resumen/descargar")
+def descargar_cierre_caja(
+    formato: str = Query("xlsx", description="csv o xlsx"),
+    db: Session = Depends(get_db)
+):
+    """Resumen de cierre de la caja abierta y sus movimientos como archivo"""
+    try:
+        contenido, media_type, nombre = DescargaReportesService.preparar_cierre_caja(db, formato)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al generar cierre: {str(e)}")
+    return StreamingResponse(
+        contenido, media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{nombre}"'}
+    )
+
+@router.get("/historial", response_model=List[CajaResponse], response_class=RespuestaJSON)
 async def obtener_historial_cajas(limite: int = 30, db: Session = Depends(get_db)):
     try:
-        return CajaService.obtener_historial_cajas(db, limite)
+        return RespuestaJSON(CajaService.obtener_historial_cajas(db, limite))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al obtener historial: {str(e)}")
 
@@ -132,51 +162,23 @@ async def registrar_egreso(datos: EgresoRequest, db: Session = Depends(get_db)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al registrar egreso: {str(e)}")
     
-# app/routers/caja_routes.py - AGREGAR ESTE ENDPOINT TEMPORAL
-
-@router.get("/debug/estado-completo")
-async def debug_estado_caja(db: Session = Depends(get_db)):
-    """Endpoint de depuración para ver el estado completo de la caja"""
+@router.get("/{caja_id}/movimientos/descargar")
+def descargar_movimientos_caja(
+    caja_id: int,
+    formato: str = Query("xlsx", description="csv o xlsx"),
+    db: Session = Depends(get_db)
+):
+    """Movimientos de una caja (abierta o cerrada) como archivo"""
     try:
-        caja = CajaService.verificar_caja_abierta(db)
-        
-        if not caja:
-            return {
-                "caja_abierta": False,
-                "mensaje": "No hay caja abierta",
-                "totales": None
-            }
-        
-        # Obtener totales con egresos
-        totales_con_egresos = CajaService.obtener_totales_con_egresos(db, caja.id, caja.fecha_apertura)
-        
-        # Obtener denominaciones
-        denominaciones = CajaService.obtener_denominaciones(db, caja.id)
-        
-        # Obtener movimientos
-        movimientos = CajaService.obtener_movimientos_dia(db)
-        
-        return {
-            "caja_abierta": True,
-            "caja_id": caja.id,
-            "monto_inicial": float(caja.monto_inicial),
-            "fecha_apertura": caja.fecha_apertura.isoformat(),
-            "operador": caja.operador_apertura,
-            "totales": totales_con_egresos,
-            "denominaciones": denominaciones,
-            "movimientos_resumen": {
-                "cantidad": movimientos.get("total_movimientos", 0),
-                "total_efectivo": movimientos.get("total_efectivo", 0),
-                "total_tarjeta": movimientos.get("total_tarjeta", 0),
-                "total_egresos": movimientos.get("total_egresos", 0),
-                "saldo_neto": movimientos.get("saldo_neto", 0)
-            }
-        }
+        contenido, media_type, nombre = DescargaReportesService.preparar_movimientos_caja(db, caja_id, formato)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        return {
-            "error": str(e),
-            "traceback": traceback.format_exc()
-        }
+        raise HTTPException(status_code=500, detail=f"Error al generar movimientos: {str(e)}")
+    return StreamingResponse(
+        contenido, media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{nombre}"'}
+    )
 
 # =========================================
 # NUEVO ENDPOINT - Obtener caja por ID (para historial)
@@ -1,10 +1,14 @@
 # app/routes/configuracion_routes.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 from app.config import get_db
 from app.servicios.configuracion_service import ConfiguracionService
+from app.servicios.simulacion_tarifas_service import SimulacionTarifasService
+from app.servicios.version_tarifa_service import VersionTarifaService
 from app.esquemas.configuracion_schema import ConfiguracionResponse, ConfiguracionUpdate
 from app.utils.validators import validar_formato_hora
+from app.utils.cache_respuestas import CacheRespuestas
 
 router = APIRouter(
     prefix="/api/configuracion",
@@ -12,11 +16,15 @@ router = APIRouter(
 )
 
 @router.get("/", response_model=ConfiguracionResponse)
-async def obtener_configuracion(db: Session = Depends(get_db)):
-    """Obtener la configuración actual de precios"""
+async def obtener_configuracion(request: Request, db: Session = Depends(get_db)):
+    """Obtener la configuración actual de precios (cacheada por versión de datos)"""
     try:
-        config = ConfiguracionService.obtener_configuracion(db)
-        return config.to_dict()
+        return CacheRespuestas.responder(
+            request,
+            "configuracion",
+            lambda: ConfiguracionService.obtener_configuracion(db).to_dict(),
+            ConfiguracionResponse
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -161,10 +169,46 @@ async def obtener_tarifas(db: Session = Depends(get_db)):
             except:
                 tarifas["rangos_personalizados"] = []
         
+        # Tarifas propias de moto / camioneta (solo los campos que redefinen)
+        tarifas["por_clase"] = config.to_dict()["tarifas_por_clase"]
+        
         return tarifas
         
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error al obtener tarifas: {str(e)}"
-        )
\ No newline at end of file
+        )
+@router.post("/simular")
+def simular_tarifa(
+    datos: ConfiguracionUpdate,
+    fecha_inicio: Optional[str] = None,
+    fecha_fin: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Simular el impacto de una tarifa candidata sobre las estadías históricas
+    (salidas entre fecha_inicio y fecha_fin, YYYY-MM-DD; por defecto el
+    último año). El cuerpo tiene los mismos campos que PUT /; los que no se
+    envían conservan el valor actual. No guarda nada.
+    """
+    try:
+        return SimulacionTarifasService.simular(db, datos.dict(exclude_none=True), fecha_inicio, fecha_fin)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al simular tarifa: {str(e)}"
+        )
+
+@router.get("/versiones")
+def listar_versiones_tarifa(db: Session = Depends(get_db)):
+    """Versiones de tarifa con su vigencia (la más reciente primero)"""
+    try:
+        return VersionTarifaService.listar(db)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al obtener versiones de tarifa: {str(e)}"
+        )
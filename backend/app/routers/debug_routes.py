@@ -0,0 +1,89 @@
+# app/routers/debug_routes.py
+"""
+Herramientas de diagnóstico. El router solo se incluye en la app cuando
+DEBUG_ENDPOINTS está activo (ver config.py); si no, estas rutas no existen.
+"""
+from datetime import datetime
+import traceback
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.orm import Session
+
+from app.config import get_db
+from app.servicios.caja_service import CajaService
+from app.utils.perfilador import PerfiladorMuestreo, MAX_SEGUNDOS
+
+router = APIRouter(
+    prefix="/api/debug",
+    tags=["Diagnóstico"]
+)
+
+
+@router.get("/profile")
+async def perfilar(
+    seconds: float = Query(10, gt=0, le=MAX_SEGUNDOS),
+    incluir_esperas: bool = False
+):
+    """
+    Muestrea las pilas de todos los hilos durante `seconds` segundos y
+    devuelve un archivo collapsed stack (flamegraph.pl, speedscope).
+    Conviene lanzarlo mientras se reproduce la lentitud.
+    """
+    try:
+        # El muestreo corre en un hilo del pool; el event loop sigue atendiendo
+        resultado = await run_in_threadpool(PerfiladorMuestreo.perfilar, seconds, incluir_esperas)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al perfilar: {str(e)}")
+
+    nombre = f"perfil_{datetime.now().strftime('%Y%m%d_%H%M%S')}.folded"
+    return PlainTextResponse(
+        resultado["pilas"],
+        headers={
+            "Content-Disposition": f'attachment; filename="{nombre}"',
+            "X-Muestras": str(resultado["muestras"]),
+        }
+    )
+
+
+@router.get("/caja")
+async def debug_estado_caja(db: Session = Depends(get_db)):
+    """Estado completo de la caja abierta (totales, denominaciones, movimientos)"""
+    try:
+        caja = CajaService.verificar_caja_abierta(db)
+
+        if not caja:
+            return {
+                "caja_abierta": False,
+                "mensaje": "No hay caja abierta",
+                "totales": None
+            }
+
+        totales_con_egresos = CajaService.obtener_totales_con_egresos(db, caja.id, caja.fecha_apertura)
+        denominaciones = CajaService.obtener_denominaciones(db, caja.id)
+        movimientos = CajaService.obtener_movimientos_dia(db)
+
+        return {
+            "caja_abierta": True,
+            "caja_id": caja.id,
+            "monto_inicial": float(caja.monto_inicial),
+            "fecha_apertura": caja.fecha_apertura.isoformat(),
+            "operador": caja.operador_apertura,
+            "totales": totales_con_egresos,
+            "denominaciones": denominaciones,
+            "movimientos_resumen": {
+                "cantidad": movimientos.get("total_movimientos", 0),
+                "total_efectivo": movimientos.get("total_efectivo", 0),
+                "total_tarjeta": movimientos.get("total_tarjeta", 0),
+                "total_egresos": movimientos.get("total_egresos", 0),
+                "saldo_neto": movimientos.get("saldo_neto", 0)
+            }
+        }
+    except Exception as e:
+        return {
+            "error": str(e),
+            "traceback": traceback.format_exc()
+        }
@@ -0,0 +1,48 @@
+# app/routers/eventos_routes.py
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+from app.servicios.eventos_service import EventosService
+
+router = APIRouter(
+    prefix="/api/eventos",
+    tags=["Eventos"]
+)
+
+# Segundos sin eventos antes de enviar un comentario keep-alive
+INTERVALO_KEEPALIVE = 15
+
+
+@router.get("/stream")
+async def stream_eventos(request: Request):
+    """
+    Flujo Server-Sent Events con los cambios de ocupación y caja.
+
+    Eventos: espacio_ocupado, espacio_liberado, salida_facturada,
+    deuda_pagada, venta_registrada, egreso_registrado, caja_actualizada
+    y resync (el cliente debe volver a consultar el estado completo).
+    """
+    cliente = EventosService.suscribir()
+
+    async def generar():
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                eventos = await cliente.siguientes(INTERVALO_KEEPALIVE)
+                if not eventos:
+                    yield ": keep-alive\n\n"
+                    continue
+                for evento in eventos:
+                    yield EventosService.formatear_sse(evento)
+        finally:
+            EventosService.desuscribir(cliente)
+
+    return StreamingResponse(
+        generar(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/health")
+def health_check():
+    return {"success": True, "message": "Servicio de eventos funcionando correctamente"}
@@ -0,0 +1,71 @@
+# app/routers/exportacion_routes.py
+import tempfile
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from app.config import get_db
+from app.servicios.exportacion_service import ExportacionService
+
+router = APIRouter(
+    prefix="/api/exportacion",
+    tags=["Exportación"]
+)
+
+# Lo que supere este tamaño se guarda en disco mientras llega el archivo
+MAX_BYTES_EN_MEMORIA = 8 * 1024 * 1024
+
+
+@router.get("/{tabla}")
+def exportar(
+    tabla: str,
+    formato: str = Query("csv", description="csv, arrow o parquet"),
+    fecha_inicio: str = Query(None, description="YYYY-MM-DD (incluido)"),
+    fecha_fin: str = Query(None, description="YYYY-MM-DD (incluido)")
+):
+    """
+    Descargar facturas o ventas (una fila por item) en streaming. El archivo
+    se genera por bloques mientras se lee la base, sin armarlo en memoria.
+    """
+    try:
+        contenido, media_type, nombre = ExportacionService.preparar_exportacion(
+            tabla, formato, fecha_inicio, fecha_fin
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al exportar: {str(e)}")
+
+    return StreamingResponse(
+        contenido,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{nombre}"'}
+    )
+
+
+@router.post("/{tabla}/importar")
+async def importar(
+    tabla: str,
+    request: Request,
+    formato: str = Query("csv", description="csv, arrow o parquet"),
+    db: Session = Depends(get_db)
+):
+    """
+    Importar un archivo exportado desde otra sede (el archivo va como
+    cuerpo de la petición). Todo o nada: un error deshace la importación.
+    """
+    archivo = tempfile.SpooledTemporaryFile(max_size=MAX_BYTES_EN_MEMORIA)
+    try:
+        async for parte in request.stream():
+            archivo.write(parte)
+        archivo.seek(0)
+        resultado = await run_in_threadpool(ExportacionService.importar, db, tabla, formato, archivo)
+        return {"success": True, "data": resultado}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al importar: {str(e)}")
+    finally:
+        archivo.close()
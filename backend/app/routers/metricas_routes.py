@@ -0,0 +1,37 @@
+# app/routers/metricas_routes.py
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Request
+from fastapi.responses import PlainTextResponse
+from app.utils.metricas import Metricas, VENTANA_MINUTOS
+
+router = APIRouter(
+    prefix="/api/metrics",
+    tags=["Métricas"]
+)
+
+
+@router.get("")
+def obtener_metricas(request: Request, formato: Optional[Literal["json", "prometheus"]] = None):
+    """
+    Tiempo total, consultas SQL y tiempo SQL por ruta de los últimos
+    minutos. Responde en formato de texto de Prometheus con
+    formato=prometheus o cuando el cliente lo pide en Accept (scraper).
+    """
+    if formato is None:
+        aceptar = request.headers.get("accept", "")
+        formato = "prometheus" if "text/plain" in aceptar or "openmetrics" in aceptar else "json"
+
+    if formato == "prometheus":
+        return PlainTextResponse(
+            Metricas.exportar_prometheus(),
+            media_type="text/plain; version=0.0.4; charset=utf-8"
+        )
+    return {"success": True, "data": Metricas.exportar_json()}
+
+
+@router.delete("")
+def reiniciar_metricas():
+    """Descartar las métricas acumuladas (por ejemplo antes de una medición)"""
+    Metricas.limpiar()
+    return {"success": True, "message": f"Métricas reiniciadas (ventana de {VENTANA_MINUTOS} min)"}
@@ -1,5 +1,5 @@
 # app/routers/producto_routes.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 from app.config import get_db
 from app.servicios.producto_service import ProductoService
@@ -8,6 +8,7 @@ from app.esquemas.producto_schema import (
     ProductoUpdate,
     ProductoResponse
 )
+from app.utils.cache_respuestas import CacheRespuestas
 from typing import List, Optional
 
 router = APIRouter(
@@ -17,14 +18,19 @@ router = APIRouter(
 
 @router.get("/", response_model=List[ProductoResponse])
 async def obtener_productos(
+    request: Request,
     categoria: Optional[str] = None,
     activos_solo: bool = True,
     db: Session = Depends(get_db)
 ):
-    """Obtener todos los productos"""
+    """Obtener todos los productos (cacheado por versión de datos)"""
     try:
-        productos = ProductoService.obtener_todos(db, categoria, activos_solo)
-        return [p.to_dict() for p in productos]
+        return CacheRespuestas.responder(
+            request,
+            f"productos:{categoria}:{activos_solo}",
+            lambda: [p.to_dict() for p in ProductoService.obtener_todos(db, categoria, activos_solo)],
+            List[ProductoResponse]
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -1,15 +1,55 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta, date
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, or_, func, select, case
 from app.config import get_db
-from app.esquemas.factura_schema import ReporteDiario, ReporteDetalladoSchema,ReporteNoPagadosSchema
+from app.esquemas.factura_schema import (
+    ReporteDiario, ReporteDetalladoSchema, ReporteNoPagadosSchema, ReportePorClaseSchema, ReporteOcupacionSchema,
+    ReporteDuracionesSchema
+)
+from app.servicios.ocupacion_service import OcupacionService
+from app.servicios.duracion_service import DuracionService
 
 router = APIRouter(
     prefix="/api/reportes",
     tags=["Reportes"]
 )
 
+def _ingresos_por_clase(db: Session, Factura, inicio: datetime, fin: datetime) -> list:
+    """Salidas de [inicio, fin) agrupadas por clase de vehículo (GROUP BY en SQL)"""
+    pagada = Factura.es_no_pagado == False
+    con_recargo = and_(pagada, Factura.multiplicador_ocupacion != 1)
+    filas = db.execute(
+        select(
+            Factura.clase_vehiculo,
+            func.count(),
+            func.coalesce(func.sum(case((pagada, 1), else_=0)), 0),
+            func.coalesce(func.sum(case((pagada, Factura.costo_total), else_=0)), 0),
+            func.coalesce(func.sum(case((pagada, 0), else_=Factura.costo_total)), 0),
+            func.coalesce(func.avg(Factura.tiempo_total_minutos), 0),
+            func.coalesce(func.sum(case((con_recargo, 1), else_=0)), 0),
+            func.coalesce(func.sum(case(
+                (con_recargo, Factura.costo_total - Factura.costo_total / Factura.multiplicador_ocupacion), else_=0
+            )), 0),
+        ).where(
+            Factura.fecha_hora_salida >= inicio,
+            Factura.fecha_hora_salida < fin
+        ).group_by(Factura.clase_vehiculo).order_by(Factura.clase_vehiculo)
+    ).all()
+    return [
+        {
+            "clase_vehiculo": clase,
+            "estadias": estadias,
+            "estadias_pagadas": pagadas,
+            "ingresos": round(float(ingresos), 2),
+            "no_cobrado": round(float(no_cobrado), 2),
+            "minutos_promedio": round(float(minutos), 1),
+            "facturas_con_recargo": recargadas,
+            "recargo_ocupacion": round(float(recargo), 2),
+        }
+        for clase, estadias, pagadas, ingresos, no_cobrado, minutos, recargadas, recargo in filas
+    ]
+
 @router.get("/diario", response_model=ReporteDiario)
 def obtener_reporte_diario(fecha: str = None, db: Session = Depends(get_db)):
     """
@@ -27,21 +67,21 @@ def obtener_reporte_diario(fecha: str = None, db: Session = Depends(get_db)):
         fin_dia = datetime.combine(fecha_actual + timedelta(days=1), datetime.min.time())
         
         from app.modelos.vehiculo_estacionado import VehiculoEstacionado
-        
-        # Total vehículos: Los que ENTRARON este día (excluyendo no pagados)
-        vehiculos_entraron = db.query(VehiculoEstacionado).filter(
-            VehiculoEstacionado.fecha_hora_entrada >= inicio_dia,
-            VehiculoEstacionado.fecha_hora_entrada < fin_dia
-        ).all()
-        
-        # Filtrar para excluir los que NO pagaron (si ya salieron)
-        vehiculos_entraron_filtrados = []
-        for v in vehiculos_entraron:
-            # Si ya salió, verificar si pagó
-            if v.estado == "finalizado" and v.fecha_hora_salida:
-                if v.es_no_pagado:
-                    continue  # Excluir no pagados
-            vehiculos_entraron_filtrados.append(v)
+        from app.modelos.vehiculo_activo import vehiculos_todos
+        
+        # Total vehículos: Los que ENTRARON este día (activos e historial),
+        # excluyendo los que ya salieron sin pagar
+        total_vehiculos = db.execute(
+            select(func.count()).select_from(vehiculos_todos).where(
+                vehiculos_todos.c.fecha_hora_entrada >= inicio_dia,
+                vehiculos_todos.c.fecha_hora_entrada < fin_dia,
+                ~and_(
+                    vehiculos_todos.c.estado == "finalizado",
+                    vehiculos_todos.c.fecha_hora_salida.isnot(None),
+                    vehiculos_todos.c.es_no_pagado == True
+                )
+            )
+        ).scalar()
         
         # Ingresos: Solo de los que SALIERON este día y PAGARON
         vehiculos_salieron_pagados = db.query(VehiculoEstacionado).filter(
@@ -56,7 +96,7 @@ def obtener_reporte_diario(fecha: str = None, db: Session = Depends(get_db)):
         
         return ReporteDiario(
             fecha=fecha_actual.strftime("%Y-%m-%d"),
-            total_vehiculos=len(vehiculos_entraron_filtrados),
+            total_vehiculos=total_vehiculos,
             ingresos_total=float(ingresos_total)
         )
         
@@ -79,23 +119,26 @@ def obtener_reporte_detallado(fecha: str = None, db: Session = Depends(get_db)):
         inicio_dia = datetime.combine(fecha_actual, datetime.min.time())
         fin_dia = datetime.combine(fecha_actual + timedelta(days=1), datetime.min.time())
         
-        from app.modelos.historial_factura import HistorialFactura
+        from app.servicios.archivo_service import ArchivoService
+        
+        # Días ya archivados se leen también de la base de archivo
+        Factura = ArchivoService.historial(db, inicio_dia)
         
         # Vehículos que ENTRARON este día
-        facturas_dia = db.query(HistorialFactura).filter(
-            HistorialFactura.fecha_hora_entrada >= inicio_dia,
-            HistorialFactura.fecha_hora_entrada < fin_dia
-        ).all()
+        facturas_dia = db.query(Factura).filter(
+            Factura.fecha_hora_entrada >= inicio_dia,
+            Factura.fecha_hora_entrada < fin_dia
+        ).order_by(Factura.id).all()
         
         # Filtrar excluyendo no pagados (para estadísticas principales)
         facturas_pagadas = [f for f in facturas_dia if not f.es_no_pagado]
         facturas_no_pagadas = [f for f in facturas_dia if f.es_no_pagado]
         
         # Vehículos que SALIERON este día y PAGARON (para ingresos)
-        facturas_salieron_pagadas = db.query(HistorialFactura).filter(
-            HistorialFactura.fecha_hora_salida >= inicio_dia,
-            HistorialFactura.fecha_hora_salida < fin_dia,
-            HistorialFactura.es_no_pagado == False
+        facturas_salieron_pagadas = db.query(Factura).filter(
+            Factura.fecha_hora_salida >= inicio_dia,
+            Factura.fecha_hora_salida < fin_dia,
+            Factura.es_no_pagado == False
         ).all()
         
         # ===== CALCULAR ESTADÍSTICAS PRINCIPALES =====
@@ -184,12 +227,117 @@ def obtener_reporte_detallado(fecha: str = None, db: Session = Depends(get_db)):
             horas_pico=horas_pico,
             espacios_mas_utilizados=espacios_mas_utilizados,
             distribucion_tiempo=distribucion,
-            estadisticas_no_pagadas=estadisticas_no_pagadas
+            estadisticas_no_pagadas=estadisticas_no_pagadas,
+            ingresos_por_clase=_ingresos_por_clase(db, Factura, inicio_dia, fin_dia)
         )
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/por-clase", response_model=ReportePorClaseSchema)
+def obtener_reporte_por_clase(fecha_inicio: str = None, fecha_fin: str = None, db: Session = Depends(get_db)):
+    """
+    Ingresos por clase de vehículo (automóvil, moto, camioneta) de las
+    salidas entre fecha_inicio y fecha_fin (YYYY-MM-DD, ambas incluidas;
+    por defecto, hoy)
+    """
+    try:
+        try:
+            hasta = datetime.strptime(fecha_fin, "%Y-%m-%d").date() if fecha_fin else date.today()
+            desde = datetime.strptime(fecha_inicio, "%Y-%m-%d").date() if fecha_inicio else hasta
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Formato de fecha inválido. Use YYYY-MM-DD")
+        if desde > hasta:
+            raise HTTPException(status_code=400, detail="fecha_inicio debe ser anterior a fecha_fin")
+        
+        inicio = datetime.combine(desde, datetime.min.time())
+        fin = datetime.combine(hasta + timedelta(days=1), datetime.min.time())
+        
+        from app.servicios.archivo_service import ArchivoService
+        
+        clases = _ingresos_por_clase(db, ArchivoService.historial(db, inicio), inicio, fin)
+        return ReportePorClaseSchema(
+            fecha_inicio=desde.strftime("%Y-%m-%d"),
+            fecha_fin=hasta.strftime("%Y-%m-%d"),
+            ingresos_total=round(sum(c["ingresos"] for c in clases), 2),
+            clases=clases
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al generar reporte por clase: {str(e)}")
+
+@router.get("/ocupacion", response_model=ReporteOcupacionSchema)
+def obtener_curva_ocupacion(
+    fecha_inicio: str = None,
+    fecha_fin: str = None,
+    intervalo: int = 60,
+    db: Session = Depends(get_db)
+):
+    """
+    Curva de ocupación entre fecha_inicio y fecha_fin (YYYY-MM-DD, ambas
+    incluidas; por defecto, hoy): pico, tiempo con el parqueadero lleno y
+    promedio / máximo por intervalo de `intervalo` minutos
+    """
+    try:
+        try:
+            hasta = datetime.strptime(fecha_fin, "%Y-%m-%d").date() if fecha_fin else date.today()
+            desde = datetime.strptime(fecha_inicio, "%Y-%m-%d").date() if fecha_inicio else hasta
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Formato de fecha inválido. Use YYYY-MM-DD")
+        
+        return OcupacionService.serie(
+            db,
+            datetime.combine(desde, datetime.min.time()),
+            datetime.combine(hasta + timedelta(days=1), datetime.min.time()),
+            intervalo
+        )
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al calcular la ocupación: {str(e)}")
+
+@router.get("/duraciones", response_model=ReporteDuracionesSchema)
+def obtener_percentiles_duracion(
+    fecha_inicio: str = None,
+    fecha_fin: str = None,
+    dimension: str = "total",
+    valor: str = None,
+    por_dia: bool = False,
+    db: Session = Depends(get_db)
+):
+    """
+    Mediana, p90 y p99 de la duración de las estadías que salieron entre
+    fecha_inicio y fecha_fin (YYYY-MM-DD, ambas incluidas; por defecto, hoy)
+    por valor de `dimension` (total, espacio, horario o clase), combinando
+    los sketches diarios. `por_dia=true` da una fila por día y valor.
+    """
+    try:
+        try:
+            hasta = datetime.strptime(fecha_fin, "%Y-%m-%d").date() if fecha_fin else date.today()
+            desde = datetime.strptime(fecha_inicio, "%Y-%m-%d").date() if fecha_inicio else hasta
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Formato de fecha inválido. Use YYYY-MM-DD")
+        
+        return DuracionService.percentiles(db, desde, hasta, dimension, valor, por_dia)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al calcular percentiles de duración: {str(e)}")
+
+@router.post("/duraciones/reconstruir")
+def reconstruir_sketches_duracion(db: Session = Depends(get_db)):
+    """Volver a calcular los sketches de duración desde todo el historial"""
+    try:
+        return {"success": True, "data": DuracionService.reconstruir(db)}
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error al reconstruir sketches de duración: {str(e)}")
+
 @router.get("/no-pagados", response_model=ReporteNoPagadosSchema)
 def obtener_estadisticas_no_pagados(fecha: str = None, db: Session = Depends(get_db)):
     """Obtener estadísticas específicas de vehículos no pagados"""
@@ -0,0 +1,47 @@
+# app/routers/respaldo_routes.py
+from fastapi import APIRouter, HTTPException
+from app.servicios.respaldo_service import RespaldoService
+
+router = APIRouter(
+    prefix="/api/respaldos",
+    tags=["Respaldos"]
+)
+
+
+@router.get("/")
+def listar_respaldos():
+    """Copias disponibles y resultado del último respaldo y mantenimiento"""
+    try:
+        return {
+            "success": True,
+            "data": RespaldoService.listar_respaldos(),
+            "ultimo_respaldo": RespaldoService.ultimo_respaldo,
+            "ultimo_mantenimiento": RespaldoService.ultimo_mantenimiento,
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al listar respaldos: {str(e)}")
+
+
+@router.post("/")
+def crear_respaldo():
+    """Respaldo inmediato en caliente (no detiene las escrituras)"""
+    try:
+        return {"success": True, "data": RespaldoService.respaldar()}
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al crear respaldo: {str(e)}")
+
+
+@router.post("/mantenimiento")
+def ejecutar_mantenimiento(vacuum_completo: bool = False):
+    """
+    Checkpoint del WAL e incremental_vacuum. vacuum_completo=true convierte
+    una base antigua a auto_vacuum incremental (bloquea mientras dura).
+    """
+    try:
+        return {"success": True, "data": RespaldoService.mantenimiento(vacuum_completo)}
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error en el mantenimiento: {str(e)}")
@@ -1,17 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Literal, Optional
 from app.config import get_db
 from app.servicios.vehiculo_service import VehiculoService
 from app.modelos.historial_factura import HistorialFactura  
 from app.esquemas.vehiculo_schema import (
     VehiculoEntrada, 
     VehiculoSalida, 
+    LoteEventos,
     VehiculoResponse,
     VehiculoConEstimacion,
     EspacioResponse
 )
 from app.esquemas.factura_schema import FacturaDetallada
+from app.servicios.eventos_service import EventosService
+from app.servicios.busqueda_placas_service import BusquedaPlacasService
+from app.utils.cache_respuestas import CacheRespuestas
+from app.utils.serializacion import RespuestaJSON
 
 
 router = APIRouter(
@@ -20,15 +25,20 @@ router = APIRouter(
 )
 
 @router.get("/espacios", response_model=List[EspacioResponse])
-def obtener_espacios(db: Session = Depends(get_db)):
+def obtener_espacios(request: Request, db: Session = Depends(get_db)):
     """
     Obtener el estado de los 15 espacios de estacionamiento
     
-    Retorna una lista con el estado de cada espacio (ocupado/libre)
+    Retorna una lista con el estado de cada espacio (ocupado/libre).
+    Cacheado por versión de datos (ETag / 304).
     """
     try:
-        espacios = VehiculoService.obtener_espacios(db)
-        return espacios
+        return CacheRespuestas.responder(
+            request,
+            "vehiculos:espacios",
+            lambda: VehiculoService.obtener_espacios(db),
+            List[EspacioResponse]
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -38,7 +48,7 @@ def registrar_entrada(datos: VehiculoEntrada, db: Session = Depends(get_db)):
     Registrar la entrada de un vehículo
     
     Args:
-        datos: Placa, número de espacio y si es nocturno
+        datos: Placa, número de espacio, si es nocturno y clase de vehículo
     
     Returns:
         Información del vehículo registrado
@@ -48,7 +58,8 @@ def registrar_entrada(datos: VehiculoEntrada, db: Session = Depends(get_db)):
             db, 
             datos.placa, 
             datos.espacio_numero,
-            datos.es_nocturno  # NUEVO
+            datos.es_nocturno,  # NUEVO
+            datos.clase_vehiculo
         )
         return vehiculo.to_dict()
     except ValueError as e:
@@ -85,6 +96,8 @@ def registrar_salida(datos: VehiculoSalida, db: Session = Depends(get_db)):
                 "es_nocturno": vehiculo.es_nocturno,
                 "es_no_pagado": vehiculo.es_no_pagado,
                 "metodo_pago": datos.metodo_pago,  # 👈 AGREGAR AL RESPONSE
+                "clase_vehiculo": vehiculo.clase_vehiculo,
+                "multiplicador_ocupacion": resultado['multiplicador'],
                 "tarifa_aplicada": "NOCTURNA" if vehiculo.es_nocturno else "NORMAL"
             }
         }
@@ -93,6 +106,22 @@ def registrar_salida(datos: VehiculoSalida, db: Session = Depends(get_db)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/lote")
+def registrar_lote(datos: LoteEventos, db: Session = Depends(get_db)):
+    """
+    Registrar un lote ordenado de entradas y salidas (controlador de portón
+    que reenvía eventos tras una caída de red, sincronización offline).
+
+    Todo se escribe en una sola transacción; cada evento trae su resultado
+    (ok, vehiculo_id, factura_id, costo) o el error que lo rechazó.
+    """
+    try:
+        return VehiculoService.registrar_lote(db, datos.eventos)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al registrar lote: {str(e)}")
+
 @router.get("/buscar/{placa}")
 def buscar_vehiculo(placa: str, db: Session = Depends(get_db)):
     """
@@ -112,7 +141,11 @@ def buscar_vehiculo(placa: str, db: Session = Depends(get_db)):
                 **vehiculo_dict,
                 "costo_estimado": resultado['costo_estimado'],
                 "tiempo_estimado": resultado['tiempo_estimado'],
-                "detalles": resultado['detalles']
+                "detalles": resultado['detalles'],
+                "desglose": resultado['desglose'],
+                "precio_valido_hasta": resultado['valido_hasta'].isoformat() if resultado['valido_hasta'] else None,
+                "multiplicador_ocupacion": resultado['multiplicador'],
+                "ocupacion": resultado['ocupacion']
             }
         }
         
@@ -126,27 +159,79 @@ def buscar_vehiculo(placa: str, db: Session = Depends(get_db)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/historial")
-def obtener_historial(fecha: str = None, limite: int = 50, db: Session = Depends(get_db)):
+@router.get("/sugerencias")
+def sugerir_placas(q: str, limite: int = 10, db: Session = Depends(get_db)):
     """
-    Obtener el historial de facturas
+    Sugerir placas (activas e históricas) para lo que el operador escribió
     
     Args:
-        fecha: Fecha en formato YYYY-MM-DD (opcional)
-        limite: Número máximo de registros a retornar (default: 50)
+        q: Placa completa, prefijo o con errores de tipeo
+        limite: Número máximo de sugerencias (default: 10)
     
     Returns:
-        Lista de facturas del historial
+        Placas ordenadas por coincidencia (exacta, prefijo, aproximada),
+        primero las activas y las de más visitas
     """
     try:
-        historial = VehiculoService.obtener_historial(db, fecha, limite)
+        sugerencias = BusquedaPlacasService.sugerir(db, q, max(1, min(limite, 50)))
         return {
             "success": True,
-            "data": [factura.to_dict() for factura in historial]
+            "data": sugerencias
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/historial", response_class=RespuestaJSON)
+def obtener_historial(
+    fecha: str = None,
+    limite: int = 50,
+    placa: Optional[str] = None,
+    fecha_desde: Optional[str] = None,
+    fecha_hasta: Optional[str] = None,
+    metodo_pago: Optional[Literal["efectivo", "tarjeta"]] = None,
+    es_nocturno: Optional[bool] = None,
+    es_no_pagado: Optional[bool] = None,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Obtener el historial de facturas
+    
+    Args:
+        fecha: Fecha en formato YYYY-MM-DD (opcional)
+        limite: Número máximo de registros a retornar (default: 50, máx: 1000; fuera de rango responde 400)
+        placa: Prefijo de placa (opcional)
+        fecha_desde / fecha_hasta: Rango de fechas YYYY-MM-DD (opcional)
+        metodo_pago: 'efectivo' o 'tarjeta' (opcional)
+        es_nocturno / es_no_pagado: Filtros opcionales
+        cursor: 'siguiente_cursor' de la respuesta anterior para la página siguiente
+    
+    Returns:
+        Lista de facturas del historial y el cursor de la siguiente página
+    """
+    try:
+        resultado = VehiculoService.obtener_historial(
+            db,
+            fecha=fecha,
+            limite=limite,
+            placa=placa,
+            fecha_desde=fecha_desde,
+            fecha_hasta=fecha_hasta,
+            metodo_pago=metodo_pago,
+            es_nocturno=es_nocturno,
+            es_no_pagado=es_no_pagado,
+            cursor=cursor
+        )
+        return RespuestaJSON({
+            "success": True,
+            "data": resultado['data'],
+            "siguiente_cursor": resultado['siguiente_cursor']
+        })
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/health")
 def health_check():
     """Verificar que el servicio de vehículos está funcionando"""
@@ -219,6 +304,12 @@ def pagar_deuda(placa: str, db: Session = Depends(get_db)):
         
         db.commit()
         
+        EventosService.publicar('deuda_pagada', {
+            'placa': placa,
+            'cantidad': len(deudas),
+            'total_pagado': sum(float(d.costo_total) for d in deudas)
+        })
+        
         return {
             "success": True,
             "message": f"Se han marcado {len(deudas)} deudas como pagadas para la placa {placa}",
@@ -1,5 +1,6 @@
 # app/routers/venta_servicio_routes.py
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
 from datetime import datetime, date, timedelta
@@ -7,12 +8,14 @@ from typing import List, Optional
 
 from app.config import get_db
 from app.servicios.venta_servicio_service import VentaServicioService
+from app.servicios.descarga_reportes_service import DescargaReportesService
 from app.esquemas.venta_servicio_schema import (
     VentaServicioCreate,
     VentaServicioResponse,
     ReporteVentasResponse,
 )
 from app.modelos.venta_servicio import VentaServicio
+from app.utils.serializacion import RespuestaJSON
 
 router = APIRouter(
     prefix="/api/ventas-servicios",
@@ -82,7 +85,35 @@ async def obtener_reporte_diario(
         )
 
 
-@router.get("/", response_model=List[VentaServicioResponse])
+@router.get("/reporte/descargar")
+def descargar_reporte(
+    fecha_inicio: Optional[str] = Query(None, description="Fecha inicio YYYY-MM-DD (por defecto hoy)"),
+    fecha_fin: Optional[str] = Query(None, description="Fecha fin YYYY-MM-DD (por defecto fecha_inicio)"),
+    formato: str = Query("xlsx", description="csv o xlsx"),
+    db: Session = Depends(get_db),
+):
+    """
+    Reporte de ventas del rango como archivo: detalle por item y hojas de
+    resumen, por producto y por habitación (p. ej. el cierre del mes).
+    """
+    try:
+        inicio = datetime.strptime(fecha_inicio, "%Y-%m-%d").date() if fecha_inicio else date.today()
+        fin = datetime.strptime(fecha_fin, "%Y-%m-%d").date() if fecha_fin else inicio
+        contenido, media_type, nombre = DescargaReportesService.preparar_reporte_ventas(db, inicio, fin, formato)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al generar reporte: {str(e)}",
+        )
+    return StreamingResponse(
+        contenido, media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{nombre}"'}
+    )
+
+
+@router.get("/", response_model=List[VentaServicioResponse], response_class=RespuestaJSON)
 async def obtener_ventas(
     fecha: Optional[str] = None,
     limite: int = 50,
@@ -90,8 +121,8 @@ async def obtener_ventas(
 ):
     """Obtener ventas con filtro de fecha opcional"""
     try:
-        ventas = VentaServicioService.obtener_ventas(db, fecha, limite)
-        return [v.to_dict() for v in ventas]
+        ventas = VentaServicioService.obtener_ventas_listado(db, fecha, limite)
+        return RespuestaJSON(ventas)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
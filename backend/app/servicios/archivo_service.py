@@ -0,0 +1,283 @@
+# app/servicios/archivo_service.py
+"""
+Archivo de facturas y ventas antiguas en una base de datos "fría".
+
+historial_facturas, ventas_servicios e items_venta_servicio crecen sin
+límite; cada reporte por rango recorre índices cada vez más grandes y el
+cache de páginas de SQLite se llena de datos que casi nunca se consultan.
+
+- archivar() mueve los meses cerrados (anteriores a N meses) a la base
+  adjunta 'archivo' (config.ARCHIVE_DB_PATH), en lotes de copiar + borrar
+  con un commit por lote. Los ids se conservan, así que volver a ejecutar
+  tras una interrupción completa el trabajo sin duplicar filas.
+- Las facturas no pagadas (deudas pendientes) nunca se archivan, ni nada
+  posterior a la apertura de una caja que sigue abierta.
+- historial() / ventas() / items() devuelven el modelo normal o, si el
+  rango consultado llega a la zona archivada, una entidad sobre
+  UNION ALL (principal + archivo) con los mismos atributos.
+"""
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import (
+    MetaData, Table, Column, Index, String, Integer, DateTime,
+    select, insert, delete, union_all, func
+)
+from sqlalchemy.orm import Session, aliased
+
+from app.modelos.caja import Caja, EstadoCaja
+from app.modelos.historial_factura import HistorialFactura
+from app.modelos.venta_servicio import VentaServicio, ItemVentaServicio
+from app.utils.esquema_db import agregar_columnas_faltantes
+
+ESQUEMA_ARCHIVO = "archivo"
+# Meses completos que se mantienen en la base principal
+MESES_EN_CALIENTE = 6
+TAMANO_LOTE = 2000
+# fecha_generacion (UTC) puede ir unas horas detrás/delante de la fecha de
+# salida que define el corte; las consultas usan este margen de seguridad
+MARGEN_CORTE = timedelta(days=1)
+
+_metadata_archivo = MetaData(schema=ESQUEMA_ARCHIVO)
+
+
+def _tabla_archivo(tabla, *indices) -> Table:
+    """Copia de las columnas de la tabla (sin claves foráneas: otra base)"""
+    copia = Table(
+        tabla.name, _metadata_archivo,
+        *[
+            Column(
+                c.name, c.type, primary_key=c.primary_key, nullable=c.nullable,
+                server_default=c.server_default.arg if c.server_default is not None else None
+            )
+            for c in tabla.columns
+        ]
+    )
+    for columna in indices:
+        Index(f"ix_archivo_{tabla.name}_{columna}", copia.c[columna])
+    return copia
+
+
+historial_archivo = _tabla_archivo(
+    HistorialFactura.__table__, "fecha_hora_salida", "fecha_hora_entrada", "fecha_generacion", "placa"
+)
+ventas_archivo = _tabla_archivo(VentaServicio.__table__, "fecha")
+items_archivo = _tabla_archivo(ItemVentaServicio.__table__, "venta_id")
+
+estado_archivo = Table(
+    "estado_archivo", _metadata_archivo,
+    Column("clave", String(50), primary_key=True),
+    Column("fecha", DateTime),
+    Column("filas", Integer, default=0),
+)
+
+
+class ArchivoService:
+    """Mover datos antiguos al archivo y consultarlos de forma transparente"""
+
+    # Fecha de salida/venta por debajo de la cual los datos pueden estar
+    # archivados (None = archivo vacío). Se carga una vez por proceso.
+    _corte = None
+    _corte_cargado = False
+
+    # =========================
+    # Esquema
+    # =========================
+
+    @staticmethod
+    def preparar(engine):
+        """Crear las tablas del archivo si no existen y completar sus columnas (idempotente)"""
+        _metadata_archivo.create_all(bind=engine)
+        agregar_columnas_faltantes(engine, _metadata_archivo)
+
+    # =========================
+    # Consultas transparentes
+    # =========================
+
+    @classmethod
+    def corte(cls, db: Session) -> Optional[datetime]:
+        if not cls._corte_cargado:
+            cls._corte = db.execute(
+                select(estado_archivo.c.fecha).where(estado_archivo.c.clave == "corte")
+            ).scalar()
+            cls._corte_cargado = True
+        return cls._corte
+
+    @classmethod
+    def alcanza_archivo(cls, db: Session, inicio: Optional[datetime]) -> bool:
+        """¿Un rango que empieza en `inicio` (None = sin límite) puede incluir datos archivados?"""
+        corte = cls.corte(db)
+        if corte is None:
+            return False
+        return inicio is None or inicio < corte + MARGEN_CORTE
+
+    @classmethod
+    def historial(cls, db: Session, inicio: Optional[datetime]):
+        """HistorialFactura o su unión con el archivo si el rango lo alcanza"""
+        if not cls.alcanza_archivo(db, inicio):
+            return HistorialFactura
+        return cls._union(HistorialFactura, historial_archivo)
+
+    @classmethod
+    def ventas(cls, db: Session, inicio: Optional[datetime]):
+        if not cls.alcanza_archivo(db, inicio):
+            return VentaServicio
+        return cls._union(VentaServicio, ventas_archivo)
+
+    @classmethod
+    def items(cls, db: Session, inicio: Optional[datetime]):
+        if not cls.alcanza_archivo(db, inicio):
+            return ItemVentaServicio
+        return cls._union(ItemVentaServicio, items_archivo)
+
+    @staticmethod
+    def _union(modelo, tabla_archivo):
+        principal = modelo.__table__
+        union = union_all(
+            select(*principal.columns),
+            select(*[tabla_archivo.c[c.name] for c in principal.columns])
+        ).subquery(f"{principal.name}_completo")
+        return aliased(modelo, union)
+
+    # =========================
+    # Archivado
+    # =========================
+
+    @classmethod
+    def calcular_corte(cls, db: Session, meses: int = MESES_EN_CALIENTE) -> datetime:
+        """Inicio del mes de hace `meses` meses, sin pasar la apertura de una caja abierta"""
+        hoy = datetime.now()
+        mes = hoy.year * 12 + (hoy.month - 1) - meses
+        corte = datetime(mes // 12, mes % 12 + 1, 1)
+
+        apertura = db.query(func.min(Caja.fecha_apertura)).filter(
+            Caja.estado == EstadoCaja.ABIERTA
+        ).scalar()
+        if apertura is not None and apertura < corte:
+            corte = datetime.combine(apertura.date(), datetime.min.time())
+        return corte
+
+    @classmethod
+    def archivar(cls, db: Session, meses: int = MESES_EN_CALIENTE, lote: int = TAMANO_LOTE) -> dict:
+        """
+        Mover al archivo las facturas pagadas y las ventas (con sus items)
+        anteriores al corte. Un commit por lote para no bloquear la base
+        principal durante todo el proceso.
+
+        Returns:
+            dict con el corte aplicado y las filas movidas por tabla
+        """
+        if meses < 1:
+            raise ValueError("Se deben conservar al menos 1 mes en la base principal")
+        if lote < 1:
+            raise ValueError("El tamaño de lote debe ser mayor a 0")
+
+        corte = cls.calcular_corte(db, meses)
+        inicio = datetime.now()
+        # El corte se publica antes de mover nada: cada lote confirmado ya
+        # debe ser visible para las consultas que unen el archivo
+        cls._guardar_corte(db, corte, 0)
+        movidas = {"historial_facturas": 0, "ventas_servicios": 0, "items_venta_servicio": 0}
+
+        # La fila con el id más alto se queda siempre en la base principal:
+        # si la tabla quedara vacía, SQLite reutilizaría ids ya archivados
+        facturas = HistorialFactura.__table__
+        id_maximo = db.execute(select(func.max(facturas.c.id))).scalar() or 0
+        while True:
+            ids = db.execute(
+                select(facturas.c.id).where(
+                    facturas.c.fecha_hora_salida < corte,
+                    facturas.c.es_no_pagado == False,
+                    facturas.c.id < id_maximo
+                ).order_by(facturas.c.id).limit(lote)
+            ).scalars().all()
+            if not ids:
+                break
+            cls._mover(db, facturas, historial_archivo, facturas.c.id.in_(ids))
+            db.commit()
+            movidas["historial_facturas"] += len(ids)
+
+        ventas = VentaServicio.__table__
+        items = ItemVentaServicio.__table__
+        id_maximo = db.execute(select(func.max(ventas.c.id))).scalar() or 0
+        while True:
+            ids = db.execute(
+                select(ventas.c.id).where(
+                    ventas.c.fecha < corte,
+                    ventas.c.id < id_maximo
+                ).order_by(ventas.c.id).limit(lote)
+            ).scalars().all()
+            if not ids:
+                break
+            # Items primero: tienen clave foránea hacia la venta
+            movidas["items_venta_servicio"] += cls._mover(db, items, items_archivo, items.c.venta_id.in_(ids))
+            cls._mover(db, ventas, ventas_archivo, ventas.c.id.in_(ids))
+            db.commit()
+            movidas["ventas_servicios"] += len(ids)
+
+        total = sum(movidas.values())
+        if total:
+            cls._guardar_corte(db, corte, total)
+
+        duracion = (datetime.now() - inicio).total_seconds()
+        print(f"🗄️ Archivado hasta {corte:%Y-%m-%d}: {movidas} en {duracion:.1f}s")
+        return {
+            "corte": corte.isoformat(),
+            "filas_movidas": movidas,
+            "duracion_segundos": round(duracion, 2),
+        }
+
+    @staticmethod
+    def _mover(db: Session, origen: Table, destino: Table, condicion) -> int:
+        columnas = [c.name for c in origen.columns]
+        db.execute(
+            insert(destino).prefix_with("OR IGNORE").from_select(
+                columnas, select(*origen.columns).where(condicion)
+            )
+        )
+        return db.execute(delete(origen).where(condicion)).rowcount
+
+    @classmethod
+    def _guardar_corte(cls, db: Session, corte: datetime, filas: int):
+        anterior = db.execute(
+            select(estado_archivo.c.fecha, estado_archivo.c.filas).where(estado_archivo.c.clave == "corte")
+        ).first()
+        if anterior is None:
+            db.execute(insert(estado_archivo).values(clave="corte", fecha=corte, filas=filas))
+        else:
+            db.execute(
+                estado_archivo.update().where(estado_archivo.c.clave == "corte").values(
+                    fecha=max(anterior.fecha, corte), filas=(anterior.filas or 0) + filas
+                )
+            )
+            corte = max(anterior.fecha, corte)
+        db.commit()
+        cls._corte = corte
+        cls._corte_cargado = True
+
+    # =========================
+    # Estado
+    # =========================
+
+    @classmethod
+    def obtener_estado(cls, db: Session) -> dict:
+        def contar(tabla):
+            return db.execute(select(func.count()).select_from(tabla)).scalar()
+
+        return {
+            "corte": cls.corte(db).isoformat() if cls.corte(db) else None,
+            "tablas": {
+                "historial_facturas": {
+                    "principal": contar(HistorialFactura.__table__),
+                    "archivo": contar(historial_archivo),
+                },
+                "ventas_servicios": {
+                    "principal": contar(VentaServicio.__table__),
+                    "archivo": contar(ventas_archivo),
+                },
+                "items_venta_servicio": {
+                    "principal": contar(ItemVentaServicio.__table__),
+                    "archivo": contar(items_archivo),
+                },
+            },
+        }
@@ -0,0 +1,195 @@
+# app/servicios/busqueda_placas_service.py
+"""
+Índice en memoria de placas (activas e históricas) para sugerencias.
+
+Se construye una sola vez desde la base de datos (una consulta agregada
+por placa) y luego se mantiene al día con las entradas y salidas. Combina:
+- lista ordenada de placas normalizadas → coincidencias por prefijo (bisect)
+- índice de trigramas → candidatos aproximados para placas mal escritas,
+  ordenados por distancia de edición
+"""
+import bisect
+import re
+import threading
+from collections import Counter
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.modelos.vehiculo_activo import VehiculoActivo
+from app.servicios.archivo_service import ArchivoService
+
+# Candidatos aproximados que se evalúan con distancia de edición
+MAX_CANDIDATOS_APROXIMADOS = 60
+# Distancia de edición máxima para considerar una sugerencia aproximada
+MAX_DISTANCIA = 2
+
+
+def normalizar_placa(placa: str) -> str:
+    """Mayúsculas y solo letras/números ('abc-123 ' → 'ABC123')"""
+    return re.sub(r'[^A-Z0-9]', '', (placa or '').upper())
+
+
+def _trigramas(clave: str) -> set:
+    relleno = f"  {clave} "
+    return {relleno[i:i + 3] for i in range(len(relleno) - 2)}
+
+
+def _distancia_edicion(a: str, b: str, maximo: int) -> int:
+    """Levenshtein con corte temprano (devuelve maximo + 1 si lo supera)"""
+    if abs(len(a) - len(b)) > maximo:
+        return maximo + 1
+    anterior = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        actual = [i]
+        for j, cb in enumerate(b, 1):
+            actual.append(min(
+                anterior[j] + 1,
+                actual[j - 1] + 1,
+                anterior[j - 1] + (ca != cb)
+            ))
+        if min(actual) > maximo:
+            return maximo + 1
+        anterior = actual
+    return anterior[-1]
+
+
+class BusquedaPlacasService:
+    """Sugerencias de placas por prefijo y similitud"""
+
+    _lock = threading.Lock()
+    _cargado = False
+    _placas = {}        # clave normalizada -> datos de la placa
+    _ordenadas = []     # claves normalizadas ordenadas
+    _trigramas = {}     # trigrama -> set(claves)
+
+    # =========================
+    # Construcción del índice
+    # =========================
+
+    @classmethod
+    def _cargar(cls, db: Session):
+        # Incluye las facturas archivadas: las visitas antiguas también cuentan
+        Factura = ArchivoService.historial(db, None)
+        visitas = db.query(
+            Factura.placa,
+            func.count(Factura.id)
+        ).group_by(Factura.placa).all()
+
+        activos = db.query(
+            VehiculoActivo.placa,
+            VehiculoActivo.espacio_numero
+        ).all()
+
+        cls._placas = {}
+        cls._ordenadas = []
+        cls._trigramas = {}
+        for placa, cantidad in visitas:
+            cls._agregar(placa)['visitas'] += cantidad
+        for placa, espacio in activos:
+            datos = cls._agregar(placa)
+            datos['activo'] = True
+            datos['espacio'] = espacio
+
+        cls._ordenadas.sort()
+        cls._cargado = True
+        print(f"🔎 Índice de placas cargado: {len(cls._placas)} placas")
+
+    @classmethod
+    def _agregar(cls, placa: str, ordenar: bool = False) -> dict:
+        clave = normalizar_placa(placa)
+        datos = cls._placas.get(clave)
+        if datos is None:
+            datos = {'placa': placa, 'visitas': 0, 'activo': False, 'espacio': None}
+            cls._placas[clave] = datos
+            if ordenar:
+                bisect.insort(cls._ordenadas, clave)
+            else:
+                cls._ordenadas.append(clave)
+            for trigrama in _trigramas(clave):
+                cls._trigramas.setdefault(trigrama, set()).add(clave)
+        return datos
+
+    @classmethod
+    def invalidar(cls):
+        """Forzar la reconstrucción del índice en la próxima consulta"""
+        with cls._lock:
+            cls._cargado = False
+
+    # =========================
+    # Actualización incremental
+    # =========================
+
+    @classmethod
+    def registrar_entrada(cls, placa: str, espacio_numero: int):
+        with cls._lock:
+            if not cls._cargado:
+                return
+            datos = cls._agregar(placa, ordenar=True)
+            datos['activo'] = True
+            datos['espacio'] = espacio_numero
+
+    @classmethod
+    def registrar_salida(cls, placa: str):
+        with cls._lock:
+            if not cls._cargado:
+                return
+            datos = cls._agregar(placa, ordenar=True)
+            datos['visitas'] += 1
+            datos['activo'] = False
+            datos['espacio'] = None
+
+    # =========================
+    # Consulta
+    # =========================
+
+    @classmethod
+    def sugerir(cls, db: Session, q: str, limite: int = 10) -> list:
+        """
+        Sugerencias ordenadas: exacta, luego prefijo, luego aproximadas por
+        distancia de edición; a igualdad, activas primero y más visitas.
+        """
+        consulta = normalizar_placa(q)
+        if not consulta:
+            return []
+
+        with cls._lock:
+            if not cls._cargado:
+                cls._cargar(db)
+
+            # (tipo, distancia, activo, visitas) → menor es mejor
+            resultados = {}
+
+            # Prefijo: rango contiguo en la lista ordenada
+            inicio = bisect.bisect_left(cls._ordenadas, consulta)
+            for clave in cls._ordenadas[inicio:inicio + limite * 5]:
+                if not clave.startswith(consulta):
+                    break
+                tipo = 0 if clave == consulta else 1
+                resultados[clave] = (tipo, len(clave) - len(consulta))
+
+            # Aproximadas: candidatos con más trigramas en común
+            if len(resultados) < limite:
+                comunes = Counter()
+                for trigrama in _trigramas(consulta):
+                    comunes.update(cls._trigramas.get(trigrama, ()))
+                for clave, _ in comunes.most_common(MAX_CANDIDATOS_APROXIMADOS):
+                    if clave in resultados:
+                        continue
+                    distancia = _distancia_edicion(consulta, clave, MAX_DISTANCIA)
+                    if distancia <= MAX_DISTANCIA:
+                        resultados[clave] = (2, distancia)
+
+            def orden(clave):
+                datos = cls._placas[clave]
+                tipo, distancia = resultados[clave]
+                return (tipo, distancia, not datos['activo'], -datos['visitas'], clave)
+
+            tipos = {0: 'exacta', 1: 'prefijo', 2: 'aproximada'}
+            return [
+                {
+                    **cls._placas[clave],
+                    'coincidencia': tipos[resultados[clave][0]]
+                }
+                for clave in sorted(resultados, key=orden)[:limite]
+            ]
@@ -1,7 +1,7 @@
 # app/servicios/caja_service.py
 
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
+from sqlalchemy import func, and_, cast, Float
 from datetime import datetime, date, timedelta
 from typing import Optional, Dict, Any, List
 
@@ -11,6 +11,8 @@ from app.modelos.venta_servicio import VentaServicio
 from app.modelos.movimiento_manual import MovimientoManualCaja
 from app.modelos.denominacion_caja import DenominacionCaja
 from app.modelos.egreso_caja import EgresoCaja
+from app.servicios.eventos_service import EventosService
+from app.servicios.archivo_service import ArchivoService
 
 
 class CajaService:
@@ -241,6 +243,7 @@ class CajaService:
             CajaService.guardar_denominaciones(db, caja.id, 'apertura', denom_dict)
             db.refresh(caja)
         
+        EventosService.publicar('caja_actualizada', {'caja_id': caja.id, 'estado': 'abierta'}, clave='caja')
         return caja
 
     # =========================
@@ -282,6 +285,7 @@ class CajaService:
             CajaService.guardar_denominaciones(db, caja.id, 'cierre', denom_dict)
             db.refresh(caja)
         
+        EventosService.publicar('caja_actualizada', {'caja_id': caja.id, 'estado': 'cerrada'}, clave='caja')
         return caja
 
     # =========================
@@ -375,24 +379,54 @@ class CajaService:
 
     @staticmethod
     def obtener_historial_cajas(db: Session, limite: int = 30) -> list:
-        """Obtiene el historial de cajas cerradas"""
-        cajas = db.query(Caja).filter(
+        """
+        Obtiene el historial de cajas cerradas.
+
+        Solo lee las columnas de CajaResponse (las denominaciones y egresos
+        se consultan por caja en /api/caja/{caja_id}).
+        """
+        filas = db.query(
+            Caja.id,
+            cast(Caja.monto_inicial, Float),
+            Caja.fecha_apertura,
+            Caja.operador_apertura,
+            cast(Caja.monto_final, Float),
+            Caja.fecha_cierre,
+            Caja.operador_cierre,
+            cast(Caja.total_parqueo, Float),
+            cast(Caja.total_servicios, Float),
+            cast(Caja.total_ingresos, Float),
+            cast(Caja.monto_esperado, Float),
+            cast(Caja.diferencia, Float),
+            Caja.notas_apertura,
+            Caja.notas_cierre,
+        ).filter(
             Caja.estado == EstadoCaja.CERRADA
         ).order_by(
             Caja.fecha_cierre.desc()
         ).limit(limite).all()
-        
-        resultado = []
-        for caja in cajas:
-            caja_dict = caja.to_dict()
-            denominaciones = CajaService.obtener_denominaciones(db, caja.id)
-            caja_dict['denominaciones'] = denominaciones
-            egresos = CajaService.obtener_egresos_caja(db, caja.id)
-            caja_dict['egresos'] = egresos
-            caja_dict['total_egresos'] = sum(e['monto'] for e in egresos)
-            resultado.append(caja_dict)
-        
-        return resultado
+
+        # Mismas reglas de nulos/ceros que Caja.to_dict
+        return [
+            {
+                'id': f[0],
+                'monto_inicial': f[1],
+                'fecha_apertura': f[2],
+                'operador_apertura': f[3],
+                'monto_final': f[4] or None,
+                'fecha_cierre': f[5],
+                'operador_cierre': f[6],
+                'total_parqueo': f[7] or 0,
+                'total_servicios': f[8] or 0,
+                'total_ingresos': f[9] or 0,
+                'monto_esperado': f[10] or None,
+                'diferencia': f[11] or None,
+                'estado': EstadoCaja.CERRADA.value,
+                'notas_apertura': f[12],
+                'notas_cierre': f[13],
+            }
+            for f in filas
+        ]
 
     # =========================
     # Movimientos manuales
@@ -419,6 +453,10 @@ class CajaService:
         db.commit()
         db.refresh(movimiento)
         
+        EventosService.publicar('caja_actualizada', {
+            'caja_id': caja.id,
+            'efectivo_manual': float(movimiento.monto)
+        }, clave='caja')
         return movimiento.to_dict()
 
     # =========================================
@@ -461,6 +499,12 @@ class CajaService:
         db.commit()
         db.refresh(egreso)
         
+        EventosService.publicar('egreso_registrado', {
+            'id': egreso.id,
+            'caja_id': caja_id,
+            'monto': float(egreso.monto),
+            'operador': egreso.operador
+        })
         return egreso.to_dict()
 
     @staticmethod
@@ -616,14 +660,19 @@ class CajaService:
         caja = db.query(Caja).filter(Caja.id == caja_id).first()
         fecha_limite = caja.fecha_cierre if caja.fecha_cierre else datetime.now()
 
+        # Cajas antiguas: sus movimientos pueden estar en la base de archivo
+        Factura = ArchivoService.historial(db, fecha_apertura)
+        Venta = ArchivoService.ventas(db, fecha_apertura)
+        Item = ArchivoService.items(db, fecha_apertura)
+
         # PARQUEO
-        facturas = db.query(HistorialFactura).filter(
+        facturas = db.query(Factura).filter(
             and_(
-                HistorialFactura.fecha_hora_salida >= fecha_apertura,
-                HistorialFactura.fecha_hora_salida <= fecha_limite,
-                HistorialFactura.es_no_pagado == False
+                Factura.fecha_hora_salida >= fecha_apertura,
+                Factura.fecha_hora_salida <= fecha_limite,
+                Factura.es_no_pagado == False
             )
-        ).order_by(HistorialFactura.fecha_hora_salida.desc()).all()
+        ).order_by(Factura.fecha_hora_salida.desc()).all()
 
         for f in facturas:
             metodo_pago = getattr(f, 'metodo_pago', 'efectivo')
@@ -638,15 +687,22 @@ class CajaService:
             })
 
         # SERVICIOS
-        ventas = db.query(VentaServicio).filter(
+        ventas = db.query(Venta).filter(
             and_(
-                VentaServicio.fecha >= fecha_apertura,
-                VentaServicio.fecha <= fecha_limite
+                Venta.fecha >= fecha_apertura,
+                Venta.fecha <= fecha_limite
             )
-        ).order_by(VentaServicio.fecha.desc()).all()
+        ).order_by(Venta.fecha.desc()).all()
+
+        nombres_por_venta = {}
+        if ventas:
+            for venta_id, nombre in db.query(Item.venta_id, Item.nombre_producto).filter(
+                Item.venta_id.in_([v.id for v in ventas])
+            ).order_by(Item.id):
+                nombres_por_venta.setdefault(venta_id, []).append(nombre)
 
         for v in ventas:
-            nombres = ", ".join(i.nombre_producto for i in v.items) if v.items else "Servicio"
+            nombres = ", ".join(nombres_por_venta[v.id]) if v.id in nombres_por_venta else "Servicio"
             movimientos.append({
                 "id": f"servicio-{v.id}",
                 "tipo": "servicio",
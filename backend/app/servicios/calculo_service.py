@@ -4,13 +4,13 @@ class CalculoService:
     """Servicio que utiliza la calculadora de precios"""
     
     @staticmethod
-    def calcular_costo(fecha_entrada, fecha_salida, config, es_nocturno=False):
+    def calcular_costo(fecha_entrada, fecha_salida, config, es_nocturno=False, versiones=None):
         """Calcular el costo del estacionamiento"""
         print("\n" + "="*60)
         print(" DEBUG CalculoService.calcular_costo")
         print(f"Recibido es_nocturno: {es_nocturno} (tipo: {type(es_nocturno)})")
         
-        resultado = CalculadoraPrecios.calcular_costo(fecha_entrada, fecha_salida, config, es_nocturno)
+        resultado = CalculadoraPrecios.calcular_costo(fecha_entrada, fecha_salida, config, es_nocturno, versiones)
         
         print(f"Resultado del cálculo:")
         print(f"  Costo: {resultado['costo']}")
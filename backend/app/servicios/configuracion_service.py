@@ -3,6 +3,8 @@ from sqlalchemy.orm import Session
 from app.modelos.configuracion_precios import ConfiguracionPrecios
 from datetime import datetime, time as dt_time
 import json
+from app.utils.cache_cotizaciones import CacheCotizaciones
+from app.servicios.version_tarifa_service import VersionTarifaService
 
 class ConfiguracionService:
     """Servicio para manejar la configuración de precios"""
@@ -32,8 +34,9 @@ class ConfiguracionService:
     
     @staticmethod
     def actualizar_configuracion(db: Session, datos: dict):
-        """Actualizar la configuración"""
+        """Actualizar la configuración y registrarla como nueva versión de tarifa"""
         config = ConfiguracionService.obtener_configuracion(db)
+        VersionTarifaService.asegurar_inicial(db, config)
         
         # Campos numéricos
         if 'precio_0_5_min' in datos and datos['precio_0_5_min'] is not None:
@@ -96,10 +99,32 @@ class ConfiguracionService:
                 # Mantener los rangos existentes si hay error
                 pass
         
+        # Tarifas por clase de vehículo (validadas en el esquema)
+        if 'tarifas_por_clase' in datos:
+            tarifas = datos['tarifas_por_clase']
+            if tarifas is None or tarifas == "" or tarifas == {}:
+                config.tarifas_por_clase = None
+            elif isinstance(tarifas, str):
+                config.tarifas_por_clase = tarifas
+            else:
+                config.tarifas_por_clase = json.dumps(tarifas)
+        
+        # Bandas de recargo por ocupación (validadas en el esquema)
+        if 'bandas_ocupacion' in datos:
+            bandas = datos['bandas_ocupacion']
+            if bandas is None or bandas == "" or bandas == []:
+                config.bandas_ocupacion = None
+            elif isinstance(bandas, str):
+                config.bandas_ocupacion = bandas
+            else:
+                config.bandas_ocupacion = json.dumps(bandas)
+        
         # Actualizar timestamp
         config.actualizado_en = datetime.utcnow()
+        VersionTarifaService.registrar(db, config)
         
         db.commit()
         db.refresh(config)
+        CacheCotizaciones.invalidar_tarifa()
         
         return config
\ No newline at end of file
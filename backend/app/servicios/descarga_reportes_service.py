@@ -0,0 +1,302 @@
+# app/servicios/descarga_reportes_service.py
+"""
+Descarga de reportes en CSV/XLSX generados en el servidor.
+
+El cierre de caja, los movimientos de una caja y el reporte de ventas por
+rango se escriben fila por fila mientras se leen de la base (yield_per),
+en vez de armar el JSON completo para que el frontend lo convierta.
+
+Cada preparar_*() valida con la sesión de la petición (caja existente,
+fechas) antes de que empiece la respuesta; los generadores abren su propia
+sesión porque la de la petición se cierra al devolver el StreamingResponse.
+"""
+import heapq
+from collections import defaultdict
+from datetime import datetime, date, timedelta
+from decimal import Decimal
+from typing import Iterator, Optional
+
+from sqlalchemy import select, func, literal
+from sqlalchemy.orm import Session
+
+from app.config import SessionLocal
+from app.modelos.caja import Caja
+from app.modelos.egreso_caja import EgresoCaja
+from app.modelos.movimiento_manual import MovimientoManualCaja
+from app.modelos.producto import Producto
+from app.servicios.archivo_service import ArchivoService
+from app.servicios.caja_service import CajaService
+from app.utils.archivos_streaming import FORMATOS_DESCARGA
+
+TAMANO_BLOQUE = 2000
+
+ENCABEZADOS_MOVIMIENTOS = (
+    "Fecha", "Tipo", "Referencia", "Descripción", "Método de pago", "Monto", "Suma a caja"
+)
+ENCABEZADOS_DETALLE_VENTAS = (
+    "Fecha", "Venta", "Método de pago", "Tipo", "Categoría", "Producto",
+    "Habitación", "Cantidad", "Precio unitario", "Subtotal"
+)
+ENCABEZADOS_DESGLOSE = ("Nombre", "Cantidad", "Total", "Efectivo", "Tarjeta", "Transferencia")
+
+# Claves de obtener_resumen_caja en el orden y con el texto del cierre
+CONCEPTOS_RESUMEN_CAJA = (
+    ("operador", "Operador"),
+    ("fecha_apertura", "Fecha de apertura"),
+    ("monto_inicial", "Monto inicial"),
+    ("ingresos_parqueo", "Ingresos parqueo (efectivo)"),
+    ("ingresos_servicios", "Ingresos servicios (efectivo)"),
+    ("total_ingresos", "Total ingresos"),
+    ("total_egresos", "Total egresos"),
+    ("saldo_neto", "Saldo neto"),
+    ("monto_esperado", "Monto esperado"),
+)
+
+
+class DescargaReportesService:
+    """Reportes de caja y ventas como archivos descargables por partes"""
+
+    @staticmethod
+    def _formato(formato: str):
+        if formato not in FORMATOS_DESCARGA:
+            raise ValueError(f"Formato no soportado: {formato}. Opciones: {', '.join(FORMATOS_DESCARGA)}")
+        return FORMATOS_DESCARGA[formato]
+
+    # =========================
+    # Caja
+    # =========================
+
+    @classmethod
+    def preparar_cierre_caja(cls, db: Session, formato: str):
+        """
+        Resumen de la caja abierta (hoja 'Resumen') y sus movimientos.
+
+        Returns:
+            (generador de bytes, media_type, nombre de archivo)
+
+        Raises:
+            ValueError: Formato inválido o no hay caja abierta
+        """
+        media_type, escribir = cls._formato(formato)
+        caja = CajaService.verificar_caja_abierta(db)
+        if not caja:
+            raise ValueError("No hay una caja abierta")
+        resumen = CajaService.obtener_resumen_caja(db)
+        caja_id, apertura = caja.id, caja.fecha_apertura
+
+        def hojas():
+            yield "Resumen", ("Concepto", "Valor"), [
+                (etiqueta, resumen[clave]) for clave, etiqueta in CONCEPTOS_RESUMEN_CAJA
+            ]
+            yield "Movimientos", ENCABEZADOS_MOVIMIENTOS, cls._movimientos_caja(caja_id, apertura, None)
+
+        nombre = f"cierre_caja_{caja_id}_{datetime.now():%Y%m%d_%H%M}.{formato}"
+        return escribir(hojas()), media_type, nombre
+
+    @classmethod
+    def preparar_movimientos_caja(cls, db: Session, caja_id: int, formato: str):
+        """
+        Movimientos de una caja (abierta o cerrada), del más reciente al más antiguo.
+
+        Raises:
+            ValueError: Formato inválido o caja inexistente
+        """
+        media_type, escribir = cls._formato(formato)
+        caja = db.query(Caja).filter(Caja.id == caja_id).first()
+        if not caja:
+            raise ValueError("Caja no encontrada")
+        apertura, cierre = caja.fecha_apertura, caja.fecha_cierre
+
+        def hojas():
+            yield "Movimientos", ENCABEZADOS_MOVIMIENTOS, cls._movimientos_caja(caja_id, apertura, cierre)
+
+        nombre = f"movimientos_caja_{caja_id}_{apertura:%Y%m%d}.{formato}"
+        return escribir(hojas()), media_type, nombre
+
+    @staticmethod
+    def _movimientos_caja(caja_id: int, apertura: datetime, cierre: Optional[datetime]) -> Iterator[tuple]:
+        """
+        Mismas reglas que CajaService.obtener_movimientos_por_caja, pero cada
+        fuente se lee ordenada por fecha y se intercalan con heapq.merge: en
+        memoria solo hay un bloque por fuente.
+        """
+        db = SessionLocal()
+        try:
+            limite = cierre or datetime.now()
+            Factura = ArchivoService.historial(db, apertura)
+            Venta = ArchivoService.ventas(db, apertura)
+            Item = ArchivoService.items(db, apertura)
+
+            nombres_items = (
+                select(func.group_concat(Item.nombre_producto, ", "))
+                .where(Item.venta_id == Venta.id)
+                .scalar_subquery()
+            )
+            fuentes = (
+                select(
+                    Factura.fecha_hora_salida, literal("parqueo"), Factura.id,
+                    literal("Parqueo ") + Factura.placa, Factura.metodo_pago, Factura.costo_total
+                ).where(
+                    Factura.fecha_hora_salida >= apertura,
+                    Factura.fecha_hora_salida <= limite,
+                    Factura.es_no_pagado == False
+                ).order_by(Factura.fecha_hora_salida.desc()),
+                select(
+                    Venta.fecha, literal("servicio"), Venta.id,
+                    func.coalesce(nombres_items, "Servicio"), func.coalesce(Venta.metodo_pago, "efectivo"),
+                    Venta.total
+                ).where(
+                    Venta.fecha >= apertura,
+                    Venta.fecha <= limite
+                ).order_by(Venta.fecha.desc()),
+                select(
+                    MovimientoManualCaja.fecha, literal("efectivo_manual"), MovimientoManualCaja.id,
+                    MovimientoManualCaja.descripcion, literal("efectivo"), MovimientoManualCaja.monto
+                ).where(MovimientoManualCaja.caja_id == caja_id).order_by(MovimientoManualCaja.fecha.desc()),
+                select(
+                    EgresoCaja.fecha, literal("egreso"), EgresoCaja.id,
+                    EgresoCaja.descripcion, literal("efectivo"), -EgresoCaja.monto
+                ).where(EgresoCaja.caja_id == caja_id).order_by(EgresoCaja.fecha.desc()),
+            )
+            cursores = [
+                db.execute(consulta.execution_options(yield_per=TAMANO_BLOQUE)) for consulta in fuentes
+            ]
+
+            for fecha, tipo, referencia, descripcion, metodo_pago, monto in heapq.merge(
+                *cursores, key=lambda fila: fila[0], reverse=True
+            ):
+                suma_a_caja = tipo == "efectivo_manual" or (tipo != "egreso" and metodo_pago == "efectivo")
+                yield (
+                    fecha, tipo, f"{tipo}-{referencia}", descripcion, metodo_pago or "efectivo",
+                    Decimal(str(monto)), suma_a_caja
+                )
+        finally:
+            db.close()
+
+    # =========================
+    # Ventas por rango
+    # =========================
+
+    @classmethod
+    def preparar_reporte_ventas(cls, db: Session, fecha_inicio: date, fecha_fin: date, formato: str):
+        """
+        Detalle de items del rango y, al final, el resumen y los desgloses
+        por producto y por habitación (mismos totales que el reporte JSON).
+
+        Raises:
+            ValueError: Formato inválido o rango invertido
+        """
+        media_type, escribir = cls._formato(formato)
+        if fecha_fin < fecha_inicio:
+            raise ValueError("La fecha fin no puede ser anterior a la fecha inicio")
+
+        totales = _TotalesVentas()
+
+        def hojas():
+            yield "Detalle", ENCABEZADOS_DETALLE_VENTAS, cls._detalle_ventas(fecha_inicio, fecha_fin, totales)
+            # Estas hojas se piden cuando el detalle ya se recorrió completo
+            yield "Resumen", ("Concepto", "Valor"), totales.resumen(fecha_inicio, fecha_fin)
+            yield "Por producto", ENCABEZADOS_DESGLOSE, totales.desglose(totales.por_producto)
+            yield "Por habitación", ENCABEZADOS_DESGLOSE, totales.desglose(totales.por_habitacion)
+
+        nombre = f"ventas_{fecha_inicio:%Y%m%d}_{fecha_fin:%Y%m%d}.{formato}"
+        return escribir(hojas()), media_type, nombre
+
+    @staticmethod
+    def _detalle_ventas(fecha_inicio: date, fecha_fin: date, totales: "_TotalesVentas") -> Iterator[tuple]:
+        inicio = datetime.combine(fecha_inicio, datetime.min.time())
+        fin = datetime.combine(fecha_fin + timedelta(days=1), datetime.min.time())
+
+        db = SessionLocal()
+        try:
+            Venta = ArchivoService.ventas(db, inicio)
+            Item = ArchivoService.items(db, inicio)
+            consulta = (
+                select(
+                    Venta.fecha, Venta.id, Venta.metodo_pago, Venta.total,
+                    Item.tipo_item, Producto.categoria, Item.nombre_producto, Item.habitacion,
+                    Item.cantidad, Item.precio_unitario, Item.subtotal
+                )
+                .outerjoin(Item, Item.venta_id == Venta.id)
+                .outerjoin(Producto, Producto.id == Item.producto_id)
+                .where(Venta.fecha >= inicio, Venta.fecha < fin)
+                .order_by(Venta.fecha, Venta.id, Item.id)
+                .execution_options(yield_per=TAMANO_BLOQUE)
+            )
+
+            for fila in db.execute(consulta):
+                categoria = fila.categoria.value if fila.categoria is not None else None
+                totales.agregar(fila, categoria)
+                # Venta sin items: una fila con los datos de la venta
+                if fila.nombre_producto is None:
+                    yield (fila.fecha, fila.id, fila.metodo_pago, None, None, None, None, None, None, fila.total)
+                    continue
+                yield (
+                    fila.fecha, fila.id, fila.metodo_pago, fila.tipo_item, categoria,
+                    fila.nombre_producto, fila.habitacion, fila.cantidad,
+                    fila.precio_unitario, fila.subtotal
+                )
+        finally:
+            db.close()
+
+
+class _TotalesVentas:
+    """Acumula los totales del reporte por rango mientras se recorre el detalle"""
+
+    def __init__(self):
+        self.venta_actual = None
+        self.tickets = 0
+        self.productos_vendidos = 0
+        self.por_metodo = defaultdict(Decimal)
+        self.por_categoria = {c: Decimal("0.00") for c in ("bebidas", "snacks", "otros", "bano", "hotel")}
+        self.por_producto = {}
+        self.por_habitacion = {}
+
+    @staticmethod
+    def _sumar(desglose: dict, nombre: str, cantidad: int, subtotal: Decimal, metodo_pago: str):
+        fila = desglose.setdefault(nombre, {
+            "cantidad": 0, "total": Decimal("0.00"), "efectivo": Decimal("0.00"),
+            "tarjeta": Decimal("0.00"), "transferencia": Decimal("0.00")
+        })
+        fila["cantidad"] += cantidad
+        fila["total"] += subtotal
+        fila[metodo_pago if metodo_pago in ("efectivo", "tarjeta") else "transferencia"] += subtotal
+
+    def agregar(self, fila, categoria: Optional[str]):
+        # Las filas llegan ordenadas por venta: el total se cuenta una vez por venta
+        if fila.id != self.venta_actual:
+            self.venta_actual = fila.id
+            self.tickets += 1
+            self.por_metodo[fila.metodo_pago] += Decimal(str(fila.total))
+
+        if fila.nombre_producto is None:
+            return
+        subtotal = Decimal(str(fila.subtotal))
+        if fila.tipo_item == "producto":
+            self.productos_vendidos += fila.cantidad
+            self._sumar(self.por_producto, fila.nombre_producto, fila.cantidad, subtotal, fila.metodo_pago)
+            if categoria in self.por_categoria:
+                self.por_categoria[categoria] += subtotal
+        elif fila.tipo_item == "bano":
+            self.por_categoria["bano"] += subtotal
+        elif fila.tipo_item == "hotel":
+            self.por_categoria["hotel"] += subtotal
+            if fila.habitacion:
+                self._sumar(self.por_habitacion, fila.habitacion, 1, subtotal, fila.metodo_pago)
+
+    def resumen(self, fecha_inicio: date, fecha_fin: date) -> Iterator[tuple]:
+        yield "Fecha inicio", fecha_inicio
+        yield "Fecha fin", fecha_fin
+        yield "Total ventas", sum(self.por_metodo.values(), Decimal("0.00"))
+        yield "Efectivo", self.por_metodo.get("efectivo", Decimal("0.00"))
+        yield "Tarjeta", self.por_metodo.get("tarjeta", Decimal("0.00"))
+        yield "Transferencia", self.por_metodo.get("transferencia", Decimal("0.00"))
+        yield "Tickets", self.tickets
+        yield "Productos vendidos", self.productos_vendidos
+        for categoria, total in self.por_categoria.items():
+            yield f"Categoría {categoria}", total
+
+    @staticmethod
+    def desglose(datos: dict) -> Iterator[tuple]:
+        for nombre, fila in sorted(datos.items(), key=lambda par: par[1]["total"], reverse=True):
+            yield (nombre, fila["cantidad"], fila["total"], fila["efectivo"], fila["tarjeta"], fila["transferencia"])
@@ -0,0 +1,199 @@
+# app/servicios/duracion_service.py
+"""
+Percentiles de duración de las estadías (mediana, p90, p99).
+
+Por cada día de salida y cada valor de una dimensión (total, espacio,
+horario nocturno/diurno, clase de vehículo) se guarda un SketchCuantiles
+en sketches_duracion. registrar_salida, registrar_lote y la importación
+de facturas lo actualizan en la misma transacción que la factura, así que
+los percentiles de cualquier rango se obtienen combinando los sketches
+diarios (a lo sumo un día x 30 valores por fila), sin leer
+tiempo_total_minutos del historial. Los sketches no se mueven al archivar:
+también cubren el historial archivado.
+"""
+from collections import defaultdict
+from datetime import date, datetime
+
+from sqlalchemy import delete, func, insert, select, tuple_
+from sqlalchemy.orm import Session
+
+from app.config import SessionLocal
+from app.modelos.sketch_duracion import SketchDuracion, DIMENSIONES_DURACION
+from app.servicios.archivo_service import ArchivoService
+from app.utils.sketch_cuantiles import SketchCuantiles, PRECISION_RELATIVA
+
+# Claves por consulta al leer los sketches existentes (3 parámetros cada una)
+CLAVES_POR_CONSULTA = 500
+# Filas por bloque al reconstruir desde el historial
+TAMANO_BLOQUE = 5000
+
+PERCENTILES = (('p50', 0.5), ('p90', 0.9), ('p99', 0.99))
+
+
+def _claves(fecha_salida: datetime, espacio: int, es_nocturno: bool, clase: str) -> tuple:
+    """(dimensión, fecha, valor) de cada sketch al que aporta una estadía"""
+    dia = fecha_salida.date()
+    return (
+        ('total', dia, ''),
+        ('espacio', dia, str(espacio)),
+        ('horario', dia, 'nocturno' if es_nocturno else 'diurno'),
+        ('clase', dia, clase),
+    )
+
+
+class DuracionService:
+    """Sketches diarios de duración por dimensión"""
+
+    @staticmethod
+    def columnas(Factura) -> tuple:
+        """Columnas de una factura en el orden que espera registrar()"""
+        return (
+            Factura.fecha_hora_salida, Factura.tiempo_total_minutos, Factura.espacio_numero,
+            Factura.es_nocturno, Factura.clase_vehiculo
+        )
+
+    @staticmethod
+    def registrar(db: Session, estadias) -> int:
+        """
+        Agregar estadías a los sketches de su día (sin commit: va en la
+        transacción de la factura). Llamar después de la primera escritura
+        de la transacción, para leer los sketches con el bloqueo ya tomado.
+
+        Args:
+            estadias: (fecha_hora_salida, tiempo_total_minutos, espacio_numero,
+                       es_nocturno, clase_vehiculo) por estadía
+        """
+        nuevos = defaultdict(SketchCuantiles)
+        for fecha_salida, minutos, espacio, es_nocturno, clase in estadias:
+            for clave in _claves(fecha_salida, espacio, es_nocturno, clase):
+                nuevos[clave].agregar(minutos)
+        DuracionService._guardar(db, nuevos)
+        return len(nuevos)
+
+    @staticmethod
+    def _guardar(db: Session, nuevos: dict):
+        """Combinar `nuevos` ({(dimensión, fecha, valor): sketch}) con lo guardado"""
+        claves = list(nuevos)
+        existentes = {}
+        for desde in range(0, len(claves), CLAVES_POR_CONSULTA):
+            bloque = claves[desde:desde + CLAVES_POR_CONSULTA]
+            for fila in db.query(SketchDuracion).filter(
+                tuple_(SketchDuracion.dimension, SketchDuracion.fecha, SketchDuracion.valor).in_(bloque)
+            ):
+                existentes[(fila.dimension, fila.fecha, fila.valor)] = fila
+
+        filas_nuevas = []
+        for clave, sketch in nuevos.items():
+            fila = existentes.get(clave)
+            if fila is None:
+                dimension, fecha, valor = clave
+                filas_nuevas.append({
+                    'dimension': dimension, 'fecha': fecha, 'valor': valor,
+                    'estadias': sketch.total, 'datos': sketch.a_json(),
+                    'actualizado_en': datetime.now(),
+                })
+                continue
+            guardado = SketchCuantiles.desde_json(fila.datos)
+            guardado.combinar(sketch)
+            fila.datos = guardado.a_json()
+            fila.estadias = guardado.total
+        if filas_nuevas:
+            db.execute(insert(SketchDuracion), filas_nuevas)
+
+    # =========================
+    # Consulta
+    # =========================
+
+    @staticmethod
+    def percentiles(db: Session, desde: date, hasta: date, dimension: str = 'total',
+                    valor: str = None, por_dia: bool = False) -> dict:
+        """
+        Percentiles de duración (minutos) de las estadías que salieron entre
+        `desde` y `hasta` (ambos incluidos), por valor de la dimensión y, si
+        `por_dia`, también por día
+        """
+        if dimension not in DIMENSIONES_DURACION:
+            raise ValueError(f"Dimensión inválida. Use: {', '.join(DIMENSIONES_DURACION)}")
+        if desde > hasta:
+            raise ValueError("La fecha de inicio es posterior a la fecha de fin")
+
+        consulta = select(SketchDuracion.fecha, SketchDuracion.valor, SketchDuracion.datos).where(
+            SketchDuracion.dimension == dimension,
+            SketchDuracion.fecha >= desde,
+            SketchDuracion.fecha <= hasta
+        )
+        if valor is not None:
+            consulta = consulta.where(SketchDuracion.valor == valor)
+
+        grupos = defaultdict(SketchCuantiles)
+        for fecha, valor_fila, datos in db.execute(consulta):
+            grupos[(fecha if por_dia else None, valor_fila)].combinar(SketchCuantiles.desde_json(datos))
+
+        def orden(clave):
+            fecha, valor_grupo = clave
+            return (fecha or date.min, int(valor_grupo) if dimension == 'espacio' else valor_grupo)
+
+        return {
+            'fecha_inicio': desde.isoformat(),
+            'fecha_fin': hasta.isoformat(),
+            'dimension': dimension,
+            'precision_relativa': PRECISION_RELATIVA,
+            'grupos': [
+                DuracionService._resumen(grupos[clave], *clave) for clave in sorted(grupos, key=orden)
+            ],
+        }
+
+    @staticmethod
+    def _resumen(sketch: SketchCuantiles, fecha, valor: str) -> dict:
+        resumen = {
+            'fecha': fecha.isoformat() if fecha else None,
+            'valor': valor,
+            'estadias': sketch.total,
+            'promedio_minutos': round(sketch.promedio, 1),
+            'minimo_minutos': sketch.minimo,
+            'maximo_minutos': sketch.maximo,
+        }
+        for nombre, q in PERCENTILES:
+            resumen[f'{nombre}_minutos'] = round(sketch.cuantil(q), 1)
+        return resumen
+
+    # =========================
+    # Reconstrucción
+    # =========================
+
+    @staticmethod
+    def reconstruir(db: Session) -> dict:
+        """
+        Volver a calcular todos los sketches desde el historial (principal y
+        archivo) en un solo recorrido. Para bases anteriores a los sketches.
+        """
+        Factura = ArchivoService.historial(db, None)
+        nuevos = defaultdict(SketchCuantiles)
+        leidas = 0
+        for fecha_salida, minutos, espacio, es_nocturno, clase in db.execute(
+            select(*DuracionService.columnas(Factura)).execution_options(yield_per=TAMANO_BLOQUE)
+        ):
+            for clave in _claves(fecha_salida, espacio, es_nocturno, clase):
+                nuevos[clave].agregar(minutos)
+            leidas += 1
+
+        db.execute(delete(SketchDuracion))
+        DuracionService._guardar(db, nuevos)
+        db.commit()
+        return {'facturas_leidas': leidas, 'sketches': len(nuevos)}
+
+    @staticmethod
+    def inicializar():
+        """Al arrancar: construir los sketches si la tabla está vacía y ya hay facturas"""
+        db = SessionLocal()
+        try:
+            if db.execute(select(func.count()).select_from(SketchDuracion)).scalar():
+                return
+            Factura = ArchivoService.historial(db, None)
+            if db.execute(select(Factura.id).limit(1)).first() is None:
+                return
+            resultado = DuracionService.reconstruir(db)
+            print(f"[DB] Sketches de duración construidos: {resultado['sketches']} "
+                  f"({resultado['facturas_leidas']} facturas)")
+        finally:
+            db.close()
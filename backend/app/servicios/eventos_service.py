@@ -0,0 +1,116 @@
+# app/servicios/eventos_service.py
+"""
+Bus de eventos en proceso (asyncio) para notificar cambios a las terminales.
+
+Los servicios publican después del commit (espacio ocupado/liberado, salida
+facturada, venta, egreso...). Cada cliente conectado tiene una cola acotada
+con coalescencia: un evento con la misma clave que otro aún no entregado lo
+reemplaza, y si la cola se llena se descarta todo y se envía un único
+evento 'resync' para que el cliente vuelva a pedir el estado completo.
+"""
+import asyncio
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+
+# Eventos pendientes por cliente antes de forzar un 'resync'
+MAX_EVENTOS_POR_CLIENTE = 100
+
+
+class ClienteEventos:
+    """Cola acotada y coalescente de un cliente suscrito"""
+
+    def __init__(self, maximo: int = MAX_EVENTOS_POR_CLIENTE):
+        self.maximo = maximo
+        self.pendientes = OrderedDict()  # clave -> evento
+        self.hay_eventos = asyncio.Event()
+
+    def encolar(self, evento: dict):
+        clave = evento["clave"]
+        if clave in self.pendientes:
+            # Coalescer: solo importa el último estado de la misma clave
+            del self.pendientes[clave]
+        elif len(self.pendientes) >= self.maximo:
+            # Consumidor lento: descartar todo y pedir resincronización
+            self.pendientes.clear()
+            clave = "resync"
+            evento = {**evento, "tipo": "resync", "clave": clave, "datos": {}}
+        self.pendientes[clave] = evento
+        self.hay_eventos.set()
+
+    async def siguientes(self, timeout: float) -> list:
+        """Esperar y vaciar los eventos pendientes ([] si vence el timeout)"""
+        try:
+            await asyncio.wait_for(self.hay_eventos.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        eventos = list(self.pendientes.values())
+        self.pendientes.clear()
+        self.hay_eventos.clear()
+        return eventos
+
+
+class EventosService:
+    """Publicación y suscripción de eventos del parqueadero"""
+
+    _clientes = set()
+    _loop: Optional[asyncio.AbstractEventLoop] = None
+    _lock = threading.Lock()
+    _secuencia = 0
+
+    @classmethod
+    def suscribir(cls) -> ClienteEventos:
+        """Registrar un cliente (debe llamarse desde el event loop)"""
+        cls._loop = asyncio.get_running_loop()
+        cliente = ClienteEventos()
+        cls._clientes.add(cliente)
+        print(f"📡 Cliente de eventos conectado ({len(cls._clientes)} activos)")
+        return cliente
+
+    @classmethod
+    def desuscribir(cls, cliente: ClienteEventos):
+        cls._clientes.discard(cliente)
+        print(f"📡 Cliente de eventos desconectado ({len(cls._clientes)} activos)")
+
+    @classmethod
+    def publicar(cls, tipo: str, datos: dict, clave: Optional[str] = None):
+        """
+        Publicar un evento. Seguro desde cualquier hilo (los servicios se
+        ejecutan en el threadpool de FastAPI o en el propio event loop).
+
+        Args:
+            tipo: Tipo de evento (ej. 'espacio_ocupado')
+            datos: Contenido serializable a JSON
+            clave: Clave de coalescencia (por defecto, única por evento)
+        """
+        if not cls._clientes or cls._loop is None or cls._loop.is_closed():
+            return
+
+        with cls._lock:
+            cls._secuencia += 1
+            secuencia = cls._secuencia
+
+        evento = {
+            "id": secuencia,
+            "tipo": tipo,
+            "clave": clave or f"{tipo}:{secuencia}",
+            "datos": datos,
+            "fecha": datetime.now().isoformat(),
+        }
+        try:
+            cls._loop.call_soon_threadsafe(cls._distribuir, evento)
+        except RuntimeError:
+            # El loop se cerró mientras se publicaba (apagado del servidor)
+            pass
+
+    @classmethod
+    def _distribuir(cls, evento: dict):
+        for cliente in list(cls._clientes):
+            cliente.encolar(evento)
+
+    @staticmethod
+    def formatear_sse(evento: dict) -> str:
+        datos = json.dumps(evento["datos"], ensure_ascii=False, default=str)
+        return f"id: {evento['id']}\nevent: {evento['tipo']}\ndata: {datos}\n\n"
@@ -0,0 +1,480 @@
+# app/servicios/exportacion_service.py
+"""
+Exportación e importación masiva del historial (facturas y ventas).
+
+Exportar:
+- Se lee con yield_per (cursor del servidor, TAMANO_BLOQUE filas por
+  bloque) y cada bloque se escribe al StreamingResponse apenas se lee:
+  la memoria es constante aunque se exporte un año completo.
+- Formatos: csv (UTF-8 con BOM, abre bien en Excel), arrow (Arrow IPC
+  stream) y parquet (un row group por bloque), estos dos con pyarrow.
+- Si el rango llega a la zona archivada se lee también del archivo.
+
+Importar (migración desde otra sede):
+- Mismo formato y columnas que la exportación. Los ids de la otra sede
+  no se conservan: cada factura crea su vehículo finalizado y cada venta
+  se reagrupa por su venta_id de origen con sus items.
+- Todo el archivo entra en una sola transacción con executemany por
+  lotes; ante cualquier error no queda nada a medias.
+"""
+import csv
+import io
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from typing import Iterator, Optional
+
+import pyarrow as pa
+import pyarrow.ipc
+import pyarrow.parquet as pq
+from sqlalchemy import select, insert, func, bindparam
+from sqlalchemy.orm import Session
+
+from app.config import SessionLocal
+from app.modelos.historial_factura import HistorialFactura
+from app.modelos.vehiculo_estacionado import VehiculoEstacionado, CLASES_VEHICULO, CLASE_POR_DEFECTO
+from app.modelos.vehiculo_activo import siguiente_id_vehiculo
+from app.modelos.venta_servicio import VentaServicio, ItemVentaServicio
+from app.servicios.archivo_service import ArchivoService
+from app.servicios.busqueda_placas_service import BusquedaPlacasService
+from app.servicios.duracion_service import DuracionService
+from app.utils.archivos_streaming import SumideroBytes
+
+TAMANO_BLOQUE = 5000
+TAMANO_LOTE_IMPORTACION = 5000
+FORMATOS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+# Columnas por tabla: (nombre, tipo). El orden es el de los archivos.
+COLUMNAS = {
+    "facturas": (
+        ("id", "int"),
+        ("placa", "str"),
+        ("espacio_numero", "int"),
+        ("fecha_hora_entrada", "datetime"),
+        ("fecha_hora_salida", "datetime"),
+        ("tiempo_total_minutos", "int"),
+        ("costo_total", "decimal"),
+        ("detalles_cobro", "str"),
+        ("fecha_generacion", "datetime"),
+        ("es_nocturno", "bool"),
+        ("es_no_pagado", "bool"),
+        ("metodo_pago", "str"),
+        ("clase_vehiculo", "str"),
+        ("multiplicador_ocupacion", "decimal"),
+    ),
+    # Una fila por item (la venta se repite en cada item)
+    "ventas": (
+        ("venta_id", "int"),
+        ("fecha", "datetime"),
+        ("metodo_pago", "str"),
+        ("total", "decimal"),
+        ("item_id", "int"),
+        ("tipo_item", "str"),
+        ("producto_id", "int"),
+        ("nombre_producto", "str"),
+        ("cantidad", "int"),
+        ("precio_unitario", "decimal"),
+        ("subtotal", "decimal"),
+        ("habitacion", "str"),
+    ),
+}
+
+# Columnas que el archivo a importar debe traer, con valor en cada fila
+OBLIGATORIAS = {
+    "facturas": {"placa", "espacio_numero", "fecha_hora_entrada", "fecha_hora_salida",
+                 "tiempo_total_minutos", "costo_total"},
+    "ventas": {"venta_id", "fecha", "total"},
+}
+
+
+def _tipo_arrow(tipo: str):
+    return {
+        "int": pa.int64(),
+        "str": pa.string(),
+        "decimal": pa.decimal128(10, 2),
+        "datetime": pa.timestamp("us"),
+        "bool": pa.bool_(),
+    }[tipo]
+
+
+def _texto_csv(valor):
+    if valor is None:
+        return ""
+    if isinstance(valor, bool):
+        return "true" if valor else "false"
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    return valor
+
+
+class ExportacionService:
+    """Exportación en streaming e importación masiva del historial"""
+
+    # =========================
+    # Exportación
+    # =========================
+
+    @staticmethod
+    def _consulta(db: Session, tabla: str, inicio: Optional[datetime], fin: Optional[datetime]):
+        if tabla == "facturas":
+            Factura = ArchivoService.historial(db, inicio)
+            columnas = [getattr(Factura, nombre) for nombre, _ in COLUMNAS["facturas"]]
+            fecha = Factura.fecha_hora_salida
+            orden = (Factura.fecha_hora_salida, Factura.id)
+            consulta = select(*columnas)
+        else:
+            Venta = ArchivoService.ventas(db, inicio)
+            Item = ArchivoService.items(db, inicio)
+            consulta = select(
+                Venta.id, Venta.fecha, func.coalesce(Venta.metodo_pago, "efectivo"), Venta.total,
+                Item.id, Item.tipo_item, Item.producto_id, Item.nombre_producto,
+                Item.cantidad, Item.precio_unitario, Item.subtotal, Item.habitacion,
+            ).outerjoin(Item, Item.venta_id == Venta.id)
+            fecha = Venta.fecha
+            orden = (Venta.fecha, Venta.id, Item.id)
+
+        if inicio:
+            consulta = consulta.where(fecha >= inicio)
+        if fin:
+            consulta = consulta.where(fecha < fin)
+        return consulta.order_by(*orden)
+
+    @classmethod
+    def preparar_exportacion(
+        cls,
+        tabla: str,
+        formato: str,
+        fecha_inicio: Optional[str] = None,
+        fecha_fin: Optional[str] = None
+    ):
+        """
+        Validar los parámetros antes de empezar a enviar la respuesta.
+
+        Returns:
+            (generador de bytes, media_type, nombre de archivo)
+
+        Raises:
+            ValueError: Tabla, formato o fechas inválidos
+        """
+        if tabla not in COLUMNAS:
+            raise ValueError(f"Tabla no exportable: {tabla}. Opciones: {', '.join(COLUMNAS)}")
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato no soportado: {formato}. Opciones: {', '.join(FORMATOS)}")
+
+        try:
+            inicio = datetime.strptime(fecha_inicio, "%Y-%m-%d") if fecha_inicio else None
+            fin = datetime.strptime(fecha_fin, "%Y-%m-%d") + timedelta(days=1) if fecha_fin else None
+        except ValueError:
+            raise ValueError("Formato de fecha inválido. Use YYYY-MM-DD")
+
+        media_type, extension = FORMATOS[formato]
+        sufijo = "_".join(f for f in (fecha_inicio, fecha_fin) if f) or datetime.now().strftime("%Y%m%d")
+        nombre = f"{tabla}_{sufijo}.{extension}"
+        escritores = {"csv": cls._csv, "arrow": cls._arrow, "parquet": cls._parquet}
+        return escritores[formato](tabla, inicio, fin), media_type, nombre
+
+    @classmethod
+    def _bloques(cls, tabla: str, inicio, fin) -> Iterator[list]:
+        """Filas en bloques de TAMANO_BLOQUE con una sesión propia"""
+        db = SessionLocal()
+        try:
+            resultado = db.execute(
+                cls._consulta(db, tabla, inicio, fin).execution_options(yield_per=TAMANO_BLOQUE)
+            )
+            for bloque in resultado.partitions():
+                yield bloque
+        finally:
+            db.close()
+
+    @classmethod
+    def _csv(cls, tabla: str, inicio, fin) -> Iterator[bytes]:
+        texto = io.StringIO()
+        escritor = csv.writer(texto)
+        escritor.writerow([nombre for nombre, _ in COLUMNAS[tabla]])
+        yield ("﻿" + texto.getvalue()).encode("utf-8")
+
+        for bloque in cls._bloques(tabla, inicio, fin):
+            texto.seek(0)
+            texto.truncate()
+            escritor.writerows([[_texto_csv(v) for v in fila] for fila in bloque])
+            yield texto.getvalue().encode("utf-8")
+
+    @staticmethod
+    def _esquema(tabla: str):
+        return pa.schema([(nombre, _tipo_arrow(tipo)) for nombre, tipo in COLUMNAS[tabla]])
+
+    @classmethod
+    def _lote_arrow(cls, tabla: str, esquema, bloque):
+        columnas = list(zip(*bloque))
+        return pa.record_batch(
+            [pa.array(list(valores), type=campo.type) for valores, campo in zip(columnas, esquema)],
+            schema=esquema
+        )
+
+    @classmethod
+    def _arrow(cls, tabla: str, inicio, fin) -> Iterator[bytes]:
+        esquema = cls._esquema(tabla)
+        sumidero = SumideroBytes()
+        with pa.ipc.new_stream(pa.PythonFile(sumidero, mode="w"), esquema) as escritor:
+            for bloque in cls._bloques(tabla, inicio, fin):
+                escritor.write_batch(cls._lote_arrow(tabla, esquema, bloque))
+                yield sumidero.vaciar()
+        yield sumidero.vaciar()
+
+    @classmethod
+    def _parquet(cls, tabla: str, inicio, fin) -> Iterator[bytes]:
+        esquema = cls._esquema(tabla)
+        sumidero = SumideroBytes()
+        with pq.ParquetWriter(pa.PythonFile(sumidero, mode="w"), esquema) as escritor:
+            for bloque in cls._bloques(tabla, inicio, fin):
+                escritor.write_batch(cls._lote_arrow(tabla, esquema, bloque))
+                yield sumidero.vaciar()
+        # El pie del archivo (metadatos) se escribe al cerrar
+        yield sumidero.vaciar()
+
+    # =========================
+    # Importación
+    # =========================
+
+    @classmethod
+    def importar(cls, db: Session, tabla: str, formato: str, archivo) -> dict:
+        """
+        Importar un archivo exportado desde otra sede.
+
+        Args:
+            archivo: Objeto tipo archivo binario, posicionado al inicio
+
+        Returns:
+            dict con filas leídas y registros creados
+
+        Raises:
+            ValueError: Tabla/formato inválidos, columnas faltantes o datos inválidos
+        """
+        if tabla not in COLUMNAS:
+            raise ValueError(f"Tabla no importable: {tabla}. Opciones: {', '.join(COLUMNAS)}")
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato no soportado: {formato}. Opciones: {', '.join(FORMATOS)}")
+
+        lotes = cls._leer(tabla, formato, archivo)
+        try:
+            if tabla == "facturas":
+                resultado = cls._importar_facturas(db, lotes)
+            else:
+                resultado = cls._importar_ventas(db, lotes)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        if tabla == "facturas":
+            # Las placas importadas deben aparecer en las sugerencias
+            BusquedaPlacasService.invalidar()
+        print(f"📥 Importación de {tabla}: {resultado}")
+        return resultado
+
+    @classmethod
+    def _leer(cls, tabla: str, formato: str, archivo) -> Iterator[list]:
+        """Lotes de dicts con los valores ya convertidos al tipo de cada columna"""
+        tipos = dict(COLUMNAS[tabla])
+
+        def convertir(filas, numero_inicial):
+            lote = []
+            for numero, fila in enumerate(filas, numero_inicial):
+                try:
+                    valores = {
+                        nombre: _convertir(fila.get(nombre), tipos[nombre])
+                        for nombre in tipos
+                    }
+                except (ValueError, InvalidOperation) as e:
+                    raise ValueError(f"Fila {numero}: {e}")
+                vacias = sorted(nombre for nombre in OBLIGATORIAS[tabla] if valores[nombre] is None)
+                # Un item (nombre_producto) necesita su subtotal; la venta sin items no
+                if tabla == "ventas" and valores["nombre_producto"] is not None and valores["subtotal"] is None:
+                    vacias.append("subtotal")
+                if vacias:
+                    raise ValueError(f"Fila {numero}: faltan valores obligatorios: {', '.join(vacias)}")
+                lote.append(valores)
+            return lote
+
+        if formato == "csv":
+            texto = io.TextIOWrapper(archivo, encoding="utf-8-sig", newline="")
+            lector = csv.DictReader(texto)
+            cls._validar_columnas(tabla, lector.fieldnames or [])
+            numero = 1
+            while True:
+                filas = [fila for _, fila in zip(range(TAMANO_LOTE_IMPORTACION), lector)]
+                if not filas:
+                    break
+                yield convertir(filas, numero)
+                numero += len(filas)
+            return
+
+        if formato == "arrow":
+            lector = pa.ipc.open_stream(archivo)
+            nombres = lector.schema.names
+            lotes = lector
+        else:
+            parquet = pq.ParquetFile(archivo)
+            nombres = parquet.schema_arrow.names
+            lotes = parquet.iter_batches(batch_size=TAMANO_LOTE_IMPORTACION)
+        cls._validar_columnas(tabla, nombres)
+
+        numero = 1
+        for lote in lotes:
+            filas = lote.to_pylist()
+            yield convertir(filas, numero)
+            numero += len(filas)
+
+    @staticmethod
+    def _validar_columnas(tabla: str, columnas):
+        faltantes = OBLIGATORIAS[tabla] - set(columnas)
+        if faltantes:
+            raise ValueError(f"Faltan columnas obligatorias: {', '.join(sorted(faltantes))}")
+
+    @staticmethod
+    def _importar_facturas(db: Session, lotes) -> dict:
+        vehiculos = VehiculoEstacionado.__table__
+        facturas = HistorialFactura.__table__
+        leidas = 0
+
+        for lote in lotes:
+            filas_vehiculos = []
+            filas_facturas = []
+            for fila in lote:
+                if not 1 <= fila["espacio_numero"] <= 24:
+                    raise ValueError(f"Espacio inválido para {fila['placa']}: {fila['espacio_numero']}")
+                es_nocturno = bool(fila["es_nocturno"])
+                es_no_pagado = bool(fila["es_no_pagado"])
+                clase_vehiculo = fila["clase_vehiculo"] or CLASE_POR_DEFECTO
+                if clase_vehiculo not in CLASES_VEHICULO:
+                    raise ValueError(f"Clase de vehículo inválida para {fila['placa']}: {clase_vehiculo}")
+                filas_vehiculos.append({
+                    "placa": fila["placa"].upper(),
+                    "espacio_numero": fila["espacio_numero"],
+                    "fecha_hora_entrada": fila["fecha_hora_entrada"],
+                    "fecha_hora_salida": fila["fecha_hora_salida"],
+                    "costo_total": fila["costo_total"],
+                    "estado": "finalizado",
+                    "es_nocturno": es_nocturno,
+                    "es_no_pagado": es_no_pagado,
+                    "clase_vehiculo": clase_vehiculo,
+                    "creado_en": fila["fecha_hora_entrada"],
+                })
+                filas_facturas.append({
+                    "placa": fila["placa"].upper(),
+                    "espacio_numero": fila["espacio_numero"],
+                    "fecha_hora_entrada": fila["fecha_hora_entrada"],
+                    "fecha_hora_salida": fila["fecha_hora_salida"],
+                    "tiempo_total_minutos": fila["tiempo_total_minutos"],
+                    "costo_total": fila["costo_total"],
+                    "detalles_cobro": fila["detalles_cobro"],
+                    "fecha_generacion": fila["fecha_generacion"] or fila["fecha_hora_salida"],
+                    "es_nocturno": es_nocturno,
+                    "es_no_pagado": es_no_pagado,
+                    "metodo_pago": fila["metodo_pago"] or "efectivo",
+                    "clase_vehiculo": clase_vehiculo,
+                    "multiplicador_ocupacion": fila["multiplicador_ocupacion"] or 1,
+                })
+
+            # Los ids de estadía se comparten con vehiculos_activos: se toman
+            # de siguiente_id_vehiculo() dentro del INSERT, ya con el bloqueo
+            # de escritura, y las N filas recién insertadas son las N de id
+            # más alto (mismo orden que el lote)
+            columnas = list(filas_vehiculos[0])
+            db.execute(
+                insert(vehiculos).from_select(
+                    ["id", *columnas],
+                    select(siguiente_id_vehiculo(), *[bindparam(c, type_=vehiculos.c[c].type) for c in columnas])
+                ),
+                filas_vehiculos
+            )
+            ids = db.execute(
+                select(vehiculos.c.id).order_by(vehiculos.c.id.desc()).limit(len(filas_vehiculos))
+            ).scalars().all()
+            for fila_factura, vehiculo_id in zip(filas_facturas, reversed(ids)):
+                fila_factura["vehiculo_id"] = vehiculo_id
+            db.execute(insert(facturas), filas_facturas)
+            DuracionService.registrar(db, [
+                tuple(fila[c.name] for c in DuracionService.columnas(HistorialFactura))
+                for fila in filas_facturas
+            ])
+            leidas += len(lote)
+
+        return {"filas_leidas": leidas, "facturas_creadas": leidas}
+
+    @staticmethod
+    def _importar_ventas(db: Session, lotes) -> dict:
+        ventas = VentaServicio.__table__
+        items = ItemVentaServicio.__table__
+        # venta_id de la otra sede -> id local (las filas de una venta son contiguas)
+        ids_locales = {}
+        leidas = 0
+        items_creados = 0
+
+        for lote in lotes:
+            origenes = []
+            filas_ventas = []
+            filas_items = []
+            for fila in lote:
+                origen = fila["venta_id"]
+                if origen not in ids_locales and origen not in origenes:
+                    origenes.append(origen)
+                    filas_ventas.append({
+                        "total": fila["total"],
+                        "fecha": fila["fecha"],
+                        "metodo_pago": fila["metodo_pago"] or "efectivo",
+                    })
+                # Venta sin items: la exportación deja las columnas del item vacías
+                if fila["nombre_producto"] is None:
+                    continue
+                cantidad = fila["cantidad"] or 1
+                filas_items.append({
+                    "venta_id": origen,
+                    # El catálogo de otra sede no corresponde con el local
+                    "producto_id": None,
+                    "tipo_item": fila["tipo_item"] or "producto",
+                    "nombre_producto": fila["nombre_producto"],
+                    "cantidad": cantidad,
+                    "precio_unitario": fila["precio_unitario"] if fila["precio_unitario"] is not None
+                    else fila["subtotal"] / cantidad,
+                    "subtotal": fila["subtotal"],
+                    "habitacion": fila["habitacion"],
+                })
+
+            # Los ids los asigna SQLite al insertar (una venta de mostrador
+            # puede llegar en medio de la importación); RETURNING los devuelve
+            # en el orden del lote
+            if filas_ventas:
+                ids = db.execute(
+                    insert(ventas).returning(ventas.c.id, sort_by_parameter_order=True),
+                    filas_ventas
+                ).scalars().all()
+                ids_locales.update(zip(origenes, ids))
+            if filas_items:
+                for fila_item in filas_items:
+                    fila_item["venta_id"] = ids_locales[fila_item["venta_id"]]
+                db.execute(insert(items), filas_items)
+            leidas += len(lote)
+            items_creados += len(filas_items)
+
+        return {"filas_leidas": leidas, "ventas_creadas": len(ids_locales), "items_creados": items_creados}
+
+
+def _convertir(valor, tipo: str):
+    """Valor de CSV (texto) o de Arrow (ya tipado) al tipo de la columna"""
+    if valor is None or valor == "":
+        return None
+    if tipo == "int":
+        return int(valor)
+    if tipo == "decimal":
+        return valor if isinstance(valor, Decimal) else Decimal(str(valor))
+    if tipo == "datetime":
+        return valor if isinstance(valor, datetime) else datetime.fromisoformat(str(valor))
+    if tipo == "bool":
+        if isinstance(valor, bool):
+            return valor
+        return str(valor).strip().lower() in ("true", "1", "si", "sí")
+    return str(valor)
@@ -0,0 +1,136 @@
+# app/servicios/ocupacion_service.py
+"""
+Curva de ocupación (vehículos estacionados en cada instante) de un rango.
+
+Cada estadía que se cruza con el rango aporta dos eventos: +1 en su
+entrada (o al inicio del rango si ya estaba) y -1 en su salida (si sale
+antes del fin; los vehículos activos siguen hasta el fin). SQLite ordena
+los eventos y acumula la ocupación con una función de ventana
+(SUM(delta) OVER (ORDER BY instante, delta)): O(n log n) sobre las
+estadías del rango. Con la curva escalonada ya ordenada, una sola pasada
+calcula el pico, el tiempo a capacidad y el promedio ponderado por tiempo
+de cada intervalo.
+"""
+import math
+from datetime import datetime, timedelta
+
+from sqlalchemy import DateTime, Integer, case, func, literal, or_, select, union_all
+from sqlalchemy.orm import Session
+
+from app.modelos.vehiculo_activo import vehiculos_todos, CAPACIDAD_ESPACIOS
+
+# Intervalos máximos por consulta (p. ej. 1 año en intervalos de 6 h)
+MAX_INTERVALOS = 2000
+
+
+class OcupacionService:
+    """Serie de tiempo de ocupación por barrido de eventos"""
+
+    @staticmethod
+    def serie(db: Session, inicio: datetime, fin: datetime, intervalo_minutos: int = 60) -> dict:
+        """
+        Args:
+            inicio, fin: Rango [inicio, fin); lo posterior a ahora no se cuenta
+            intervalo_minutos: Tamaño de cada intervalo de la serie
+
+        Returns:
+            dict con el pico, el tiempo a capacidad, la ocupación promedio
+            y un elemento por intervalo (promedio y máximo)
+        """
+        fin = min(fin, datetime.now())
+        if inicio >= fin:
+            raise ValueError("El rango no contiene tiempo transcurrido")
+        if intervalo_minutos < 1:
+            raise ValueError("El intervalo debe ser de al menos 1 minuto")
+        intervalo = timedelta(minutes=intervalo_minutos)
+        cantidad = math.ceil((fin - inicio) / intervalo)
+        if cantidad > MAX_INTERVALOS:
+            raise ValueError(f"Demasiados intervalos ({cantidad}); use un intervalo mayor o un rango menor")
+
+        curva = db.execute(OcupacionService._consulta_curva(inicio, fin)).all()
+
+        # Barrido: la ocupación de cada fila rige hasta el instante de la siguiente
+        areas = [0.0] * cantidad      # vehículo-segundos por intervalo
+        maximos = [0] * cantidad
+        pico, instante_pico = 0, None
+        segundos_a_capacidad = 0.0
+        estadias = 0
+        ocupacion, desde = 0, inicio
+        for instante, delta, acumulada in curva + [(fin, 0, None)]:
+            if instante > desde:
+                OcupacionService._acumular(areas, maximos, inicio, intervalo, desde, instante, ocupacion)
+                if ocupacion >= CAPACIDAD_ESPACIOS:
+                    segundos_a_capacidad += (instante - desde).total_seconds()
+                desde = instante
+            if acumulada is None:
+                break
+            ocupacion = acumulada
+            estadias += delta > 0
+            if ocupacion > pico:
+                pico, instante_pico = ocupacion, instante
+
+        segundos_totales = (fin - inicio).total_seconds()
+        intervalos = []
+        for indice in range(cantidad):
+            desde = inicio + indice * intervalo
+            hasta = min(desde + intervalo, fin)
+            promedio = areas[indice] / (hasta - desde).total_seconds()
+            intervalos.append({
+                "inicio": desde.isoformat(),
+                "fin": hasta.isoformat(),
+                "promedio": round(promedio, 2),
+                "maximo": maximos[indice],
+                "porcentaje_ocupacion": round(promedio / CAPACIDAD_ESPACIOS * 100, 1),
+            })
+
+        return {
+            "inicio": inicio.isoformat(),
+            "fin": fin.isoformat(),
+            "intervalo_minutos": intervalo_minutos,
+            "capacidad": CAPACIDAD_ESPACIOS,
+            "estadias": estadias,
+            "pico": pico,
+            "instante_pico": instante_pico.isoformat() if instante_pico else None,
+            "minutos_a_capacidad": round(segundos_a_capacidad / 60, 1),
+            "porcentaje_a_capacidad": round(segundos_a_capacidad / segundos_totales * 100, 2),
+            "ocupacion_promedio": round(sum(areas) / segundos_totales, 2),
+            "intervalos": intervalos,
+        }
+
+    @staticmethod
+    def _consulta_curva(inicio: datetime, fin: datetime):
+        """(instante, delta, ocupación acumulada) ordenado; en empates, salidas primero"""
+        estadias = select(
+            vehiculos_todos.c.fecha_hora_entrada.label("entrada"),
+            vehiculos_todos.c.fecha_hora_salida.label("salida"),
+        ).where(
+            vehiculos_todos.c.fecha_hora_entrada < fin,
+            or_(vehiculos_todos.c.fecha_hora_salida.is_(None), vehiculos_todos.c.fecha_hora_salida > inicio)
+        ).cte("estadias")
+
+        eventos = union_all(
+            select(
+                case((estadias.c.entrada < inicio, literal(inicio, DateTime)), else_=estadias.c.entrada).label("instante"),
+                literal(1, Integer).label("delta"),
+            ),
+            select(estadias.c.salida, literal(-1, Integer)).where(estadias.c.salida < fin),
+        ).subquery("eventos")
+
+        orden = (eventos.c.instante, eventos.c.delta)
+        return select(
+            eventos.c.instante,
+            eventos.c.delta,
+            func.sum(eventos.c.delta).over(order_by=orden, rows=(None, 0)).label("ocupacion"),
+        ).order_by(*orden)
+
+    @staticmethod
+    def _acumular(areas, maximos, inicio, intervalo, desde, hasta, ocupacion):
+        """Sumar el tramo [desde, hasta) con ocupación constante a los intervalos que cruza"""
+        indice = int((desde - inicio) / intervalo)
+        while desde < hasta and indice < len(areas):
+            borde = min(inicio + (indice + 1) * intervalo, hasta)
+            areas[indice] += ocupacion * (borde - desde).total_seconds()
+            if ocupacion > maximos[indice]:
+                maximos[indice] = ocupacion
+            desde = borde
+            indice += 1
@@ -0,0 +1,77 @@
+# app/servicios/precio_dinamico_service.py
+"""
+Tarifa dinámica por ocupación.
+
+configuracion_precios.bandas_ocupacion define los recargos como una lista
+JSON [{"desde": 0.85, "multiplicador": 1.25}, {"desde": 0.95, ...}]: con la
+ocupación en o por encima de "desde", el costo calculado se multiplica por
+la banda más alta alcanzada. Sin bandas no hay recargo.
+
+Se aplica al cotizar (buscar_vehiculo) y al cobrar la salida, con la
+ocupación del momento (ContadorOcupacion, el vehículo que sale incluido).
+El multiplicador queda en historial_facturas.multiplicador_ocupacion.
+"""
+import json
+import threading
+from bisect import bisect_right
+
+from app.modelos.vehiculo_activo import CAPACIDAD_ESPACIOS
+from app.utils.cache_cotizaciones import CacheCotizaciones
+
+
+class PrecioDinamicoService:
+    """Recargo por ocupación sobre el costo de la estadía"""
+
+    _lock = threading.Lock()
+    _bandas = None  # (versión de tarifa, (umbrales, multiplicadores))
+
+    @staticmethod
+    def multiplicador(bandas, ocupados: int) -> float:
+        """Multiplicador de la banda que corresponde a `ocupados` espacios (1.0 sin recargo)"""
+        umbrales, multiplicadores = bandas
+        indice = bisect_right(umbrales, ocupados / CAPACIDAD_ESPACIOS) - 1
+        return multiplicadores[indice] if indice >= 0 else 1.0
+
+    @staticmethod
+    def aplicar(calculo: dict, bandas, ocupados: int) -> dict:
+        """
+        Resultado de CalculadoraPrecios.calcular_costo con el recargo de
+        `bandas` (ver bandas()) aplicado; agrega 'multiplicador' y 'ocupacion'
+        y no modifica el original
+        """
+        multiplicador = PrecioDinamicoService.multiplicador(bandas, ocupados)
+        ocupacion = round(ocupados / CAPACIDAD_ESPACIOS, 4)
+        if multiplicador == 1.0:
+            return dict(calculo, multiplicador=1.0, ocupacion=ocupacion)
+        costo = round(calculo['costo'] * multiplicador, 2)
+        return dict(
+            calculo,
+            costo=costo,
+            multiplicador=multiplicador,
+            ocupacion=ocupacion,
+            detalles=f"{calculo['detalles']} | Recargo por ocupación "
+                     f"({ocupados}/{CAPACIDAD_ESPACIOS}) ×{multiplicador:g}: ${costo:.2f}"
+        )
+
+    @classmethod
+    def bandas(cls, config):
+        """Bandas como (umbrales ordenados, multiplicadores), una vez por versión de tarifa"""
+        version = CacheCotizaciones.version_tarifa()
+        with cls._lock:
+            if cls._bandas is not None and cls._bandas[0] == version:
+                return cls._bandas[1]
+
+        bandas = []
+        if config.bandas_ocupacion:
+            try:
+                bandas = sorted(
+                    (float(b['desde']), float(b['multiplicador']))
+                    for b in json.loads(config.bandas_ocupacion)
+                )
+            except (ValueError, TypeError, KeyError) as e:
+                print(f"Error en bandas de ocupación: {e}")
+                bandas = []
+        compiladas = ([desde for desde, _ in bandas], [multiplicador for _, multiplicador in bandas])
+        with cls._lock:
+            cls._bandas = (version, compiladas)
+        return compiladas
@@ -0,0 +1,282 @@
+# app/servicios/respaldo_service.py
+"""
+Respaldos en caliente y mantenimiento de la base de datos.
+
+- respaldar(): copia parqueaderos.db (y la base de archivo) con la API de
+  backup en línea de SQLite, en un solo paso. Con WAL ese paso lee una
+  instantánea y las escrituras del mostrador siguen en el WAL mientras
+  tanto; copiando por tramos, SQLite reinicia la copia cada vez que otra
+  conexión escribe, y con el mostrador activo no termina nunca. Copiar el
+  archivo a mano con WAL activo puede dejar una copia corrupta.
+  Cada copia se escribe en un temporal y se renombra al terminar (si falla,
+  se borra); se conservan las últimas MAX_RESPALDOS.
+- mantenimiento(): PRAGMA wal_checkpoint(TRUNCATE) y incremental_vacuum,
+  solo cuando no hay escrituras recientes (VACUUM completo bloquea).
+- iniciar_programador(): hilo en segundo plano que hace un respaldo cada
+  BACKUP_INTERVAL_HOURS y el mantenimiento cuando la base está inactiva.
+"""
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+from app.config import DB_PATH, ARCHIVE_DB_PATH, BACKUP_DIR, BACKUP_INTERVAL_HOURS
+from app.utils.cache_respuestas import CacheRespuestas
+
+# Todas las páginas en un paso (ver docstring del módulo)
+PAGINAS_POR_PASO = -1
+MAX_RESPALDOS = 7
+# Revisión del programador y minutos sin commits para considerar la base inactiva
+INTERVALO_REVISION = 60
+MINUTOS_INACTIVIDAD = 10
+# Páginas libres que se devuelven al sistema por cada incremental_vacuum
+PAGINAS_VACUUM = 2000
+
+
+class RespaldoService:
+    """Respaldos rotativos y compactación sin detener la operación"""
+
+    _lock = threading.Lock()
+    _hilo = None
+    _detener = threading.Event()
+    ultimo_respaldo = None        # resultado del último respaldo
+    ultimo_mantenimiento = None   # resultado del último mantenimiento
+
+    # =========================
+    # Respaldo
+    # =========================
+
+    @classmethod
+    def respaldar(cls) -> dict:
+        """
+        Copiar la base principal y la de archivo a BACKUP_DIR.
+
+        Returns:
+            dict con archivos creados, bytes y páginas copiadas y duración
+
+        Raises:
+            ValueError: Si ya hay un respaldo o mantenimiento en curso
+        """
+        if not cls._lock.acquire(blocking=False):
+            raise ValueError("Ya hay un respaldo o mantenimiento en curso")
+        try:
+            os.makedirs(BACKUP_DIR, exist_ok=True)
+            inicio = time.perf_counter()
+            marca = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+            archivos = []
+            for ruta in (DB_PATH, ARCHIVE_DB_PATH):
+                if os.path.exists(ruta):
+                    archivos.append(cls._copiar(ruta, marca))
+
+            resultado = {
+                "fecha": datetime.now().isoformat(timespec="seconds"),
+                "archivos": archivos,
+                "bytes": sum(a["bytes"] for a in archivos),
+                "paginas": sum(a["paginas"] for a in archivos),
+                "duracion_segundos": round(time.perf_counter() - inicio, 2),
+                "eliminados": cls._rotar(),
+            }
+            cls.ultimo_respaldo = resultado
+            print(f"💾 Respaldo completado: {resultado['bytes'] / 1024 / 1024:.1f} MB "
+                  f"en {resultado['duracion_segundos']}s")
+            return resultado
+        finally:
+            cls._lock.release()
+
+    @staticmethod
+    def _prefijo(ruta: str) -> str:
+        return os.path.splitext(os.path.basename(ruta))[0]
+
+    @classmethod
+    def _copiar(cls, ruta: str, marca: str) -> dict:
+        destino = os.path.join(BACKUP_DIR, f"{cls._prefijo(ruta)}_{marca}.db")
+        temporal = destino + ".tmp"
+        paginas = {"total": 0}
+
+        def progreso(estado, restantes, total):
+            paginas["total"] = total
+
+        origen = sqlite3.connect(ruta)
+        try:
+            copia = sqlite3.connect(temporal)
+            try:
+                origen.backup(copia, pages=PAGINAS_POR_PASO, progress=progreso)
+            finally:
+                copia.close()
+        except Exception:
+            # _rotar solo ve los .db: el temporal a medias quedaría para siempre
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            raise
+        finally:
+            origen.close()
+
+        os.replace(temporal, destino)
+        return {
+            "archivo": os.path.basename(destino),
+            "bytes": os.path.getsize(destino),
+            "paginas": paginas["total"],
+        }
+
+    @classmethod
+    def _rotar(cls) -> list:
+        """Conservar solo los MAX_RESPALDOS más recientes de cada base"""
+        eliminados = []
+        for ruta in (DB_PATH, ARCHIVE_DB_PATH):
+            prefijo = cls._prefijo(ruta) + "_"
+            # El nombre de la base principal es prefijo del de archivo: se
+            # exige que tras el prefijo venga la fecha (un dígito)
+            copias = sorted(
+                nombre for nombre in os.listdir(BACKUP_DIR)
+                if nombre.startswith(prefijo) and nombre.endswith(".db")
+                and nombre[len(prefijo):len(prefijo) + 1].isdigit()
+            )
+            for nombre in copias[:-MAX_RESPALDOS]:
+                os.remove(os.path.join(BACKUP_DIR, nombre))
+                eliminados.append(nombre)
+        return eliminados
+
+    @staticmethod
+    def listar_respaldos() -> list:
+        if not os.path.isdir(BACKUP_DIR):
+            return []
+        return [
+            {
+                "archivo": nombre,
+                "bytes": os.path.getsize(os.path.join(BACKUP_DIR, nombre)),
+                "fecha": datetime.fromtimestamp(
+                    os.path.getmtime(os.path.join(BACKUP_DIR, nombre))
+                ).isoformat(timespec="seconds"),
+            }
+            for nombre in sorted(os.listdir(BACKUP_DIR), reverse=True)
+            if nombre.endswith(".db")
+        ]
+
+    # =========================
+    # Mantenimiento
+    # =========================
+
+    @classmethod
+    def mantenimiento(cls, vacuum_completo: bool = False) -> dict:
+        """
+        Checkpoint del WAL (TRUNCATE) e incremental_vacuum en ambas bases.
+
+        incremental_vacuum solo libera espacio si la base usa
+        auto_vacuum=INCREMENTAL; en una base creada sin esa opción se
+        informa 'requiere_vacuum'. vacuum_completo=True hace esa conversión
+        una sola vez con VACUUM (bloquea las escrituras mientras dura).
+        """
+        if not cls._lock.acquire(blocking=False):
+            raise ValueError("Ya hay un respaldo o mantenimiento en curso")
+        try:
+            inicio = time.perf_counter()
+            bases = {}
+            conexion = sqlite3.connect(DB_PATH, timeout=5)
+            try:
+                conexion.execute("ATTACH DATABASE ? AS archivo", (ARCHIVE_DB_PATH,))
+                for esquema in ("main", "archivo"):
+                    bases[esquema] = cls._compactar(conexion, esquema, vacuum_completo)
+            finally:
+                conexion.close()
+
+            resultado = {
+                "fecha": datetime.now().isoformat(timespec="seconds"),
+                "bases": bases,
+                "duracion_segundos": round(time.perf_counter() - inicio, 2),
+            }
+            cls.ultimo_mantenimiento = resultado
+            print(f"🧹 Mantenimiento de la base: {bases}")
+            return resultado
+        finally:
+            cls._lock.release()
+
+    @staticmethod
+    def _compactar(conexion, esquema: str, vacuum_completo: bool) -> dict:
+        tamano_pagina = conexion.execute(f"PRAGMA {esquema}.page_size").fetchone()[0]
+
+        if vacuum_completo and conexion.execute(f"PRAGMA {esquema}.auto_vacuum").fetchone()[0] != 2:
+            conexion.execute(f"PRAGMA {esquema}.auto_vacuum=INCREMENTAL")
+            conexion.execute(f"VACUUM {esquema}")
+
+        libres_antes = conexion.execute(f"PRAGMA {esquema}.freelist_count").fetchone()[0]
+
+        # (bloqueado, páginas en el WAL, páginas copiadas a la base)
+        bloqueado, paginas_wal, copiadas = conexion.execute(
+            f"PRAGMA {esquema}.wal_checkpoint(TRUNCATE)"
+        ).fetchone()
+
+        auto_vacuum = conexion.execute(f"PRAGMA {esquema}.auto_vacuum").fetchone()[0]
+        liberadas = 0
+        if auto_vacuum == 2:  # INCREMENTAL
+            conexion.execute(f"PRAGMA {esquema}.incremental_vacuum({PAGINAS_VACUUM})").fetchall()
+            liberadas = libres_antes - conexion.execute(f"PRAGMA {esquema}.freelist_count").fetchone()[0]
+
+        return {
+            "checkpoint_completo": bloqueado == 0,
+            "paginas_wal": paginas_wal,
+            "paginas_libres": libres_antes - liberadas,
+            "bytes_liberados": liberadas * tamano_pagina,
+            "requiere_vacuum": auto_vacuum != 2 and libres_antes > 0,
+        }
+
+    # =========================
+    # Programador
+    # =========================
+
+    @classmethod
+    def iniciar_programador(cls):
+        """Hilo en segundo plano (BACKUP_INTERVAL_HOURS=0 lo desactiva)"""
+        if not BACKUP_INTERVAL_HOURS or cls._hilo is not None:
+            return
+        cls._detener.clear()
+        cls._hilo = threading.Thread(target=cls._bucle, name="respaldos", daemon=True)
+        cls._hilo.start()
+        print(f"[DB] Respaldos programados cada {BACKUP_INTERVAL_HOURS:g} h en: {BACKUP_DIR}")
+
+    @classmethod
+    def detener_programador(cls):
+        cls._detener.set()
+        cls._hilo = None
+
+    @classmethod
+    def _bucle(cls):
+        version = CacheRespuestas.version_actual()
+        ultimo_cambio = time.monotonic()
+        mantenido = False
+        ultimo_respaldo = cls._fecha_ultimo_respaldo()
+
+        while not cls._detener.wait(INTERVALO_REVISION):
+            try:
+                # Cualquier commit incrementa la versión de datos
+                actual = CacheRespuestas.version_actual()
+                if actual != version:
+                    version = actual
+                    ultimo_cambio = time.monotonic()
+                    mantenido = False
+
+                if ultimo_respaldo is None or time.time() - ultimo_respaldo >= BACKUP_INTERVAL_HOURS * 3600:
+                    cls.respaldar()
+                    ultimo_respaldo = time.time()
+
+                inactiva = time.monotonic() - ultimo_cambio >= MINUTOS_INACTIVIDAD * 60
+                if inactiva and not mantenido:
+                    cls.mantenimiento()
+                    mantenido = True
+            except ValueError:
+                pass  # Ya hay una operación en curso (manual); se reintenta luego
+            except Exception as e:
+                print(f"⚠️ Error en respaldo/mantenimiento programado: {e}")
+
+    @classmethod
+    def _fecha_ultimo_respaldo(cls) -> Optional[float]:
+        prefijo = cls._prefijo(DB_PATH) + "_"
+        respaldos = [
+            r for r in cls.listar_respaldos()
+            if r["archivo"].startswith(prefijo) and r["archivo"][len(prefijo):len(prefijo) + 1].isdigit()
+        ]
+        if not respaldos:
+            return None
+        return os.path.getmtime(os.path.join(BACKUP_DIR, respaldos[0]["archivo"]))
@@ -0,0 +1,353 @@
+# app/servicios/simulacion_tarifas_service.py
+"""
+Simulación "qué pasaría si" de una tarifa candidata sobre las estadías
+históricas (historial_facturas, incluido el archivo si el rango lo alcanza).
+
+Las columnas de entrada, salida y es_nocturno del rango se cargan una vez
+en arreglos de NumPy y se guardan mientras no cambien los datos (versión
+de CacheRespuestas). Cada simulación vuelve a cobrar todas las estadías con
+las mismas reglas de CalculadoraPrecios, pero vectorizadas: un año de
+estadías se recalcula en milisegundos. La tarifa actual se aplica con su
+historial de versiones (cada tramo con la versión vigente en él); la
+candidata, a todo el rango. Cada clase de vehículo se cobra con su tarifa.
+"""
+import json
+import threading
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+from sqlalchemy import select, cast, String, Integer, Float
+from sqlalchemy.orm import Session
+
+from app.servicios.archivo_service import ArchivoService
+from app.modelos.vehiculo_estacionado import CLASES_VEHICULO
+from app.servicios.configuracion_service import ConfiguracionService
+from app.servicios.version_tarifa_service import VersionTarifaService, compilar_tarifa
+from app.utils.cache_respuestas import CacheRespuestas
+from app.utils.calculadora_precios import CalculadoraPrecios
+
+MICROS_MINUTO = 60 * 1_000_000
+MICROS_DIA = 86400 * 1_000_000
+PERCENTILES = (50, 75, 90, 99)
+# Tramos de duración (minutos) para ver dónde se mueven los ingresos
+TRAMOS_DURACION = (("0-60 min", 0, 60), ("1-3 h", 61, 180), ("3-12 h", 181, 720), ("más de 12 h", 721, None))
+CAMPOS_TARIFA = (
+    "precio_0_5_min", "precio_6_30_min", "precio_31_60_min", "precio_hora_adicional",
+    "precio_nocturno", "hora_inicio_nocturno", "hora_fin_nocturno", "rangos_personalizados",
+    "tarifas_por_clase",
+)
+
+
+class SimulacionTarifasService:
+    """Recalcula el historial con una tarifa candidata y compara con la actual"""
+
+    _lock = threading.Lock()
+    _datos = None  # (clave, arreglos) del último rango cargado
+
+    @classmethod
+    def simular(cls, db: Session, datos: dict, fecha_inicio: str = None, fecha_fin: str = None) -> dict:
+        """
+        Args:
+            datos: Campos de ConfiguracionUpdate a cambiar; los que faltan
+                se toman de la configuración actual
+            fecha_inicio, fecha_fin: Rango de salidas (YYYY-MM-DD);
+                por defecto los últimos 365 días
+        """
+        try:
+            fin = datetime.strptime(fecha_fin, "%Y-%m-%d") + timedelta(days=1) if fecha_fin else None
+            inicio = datetime.strptime(fecha_inicio, "%Y-%m-%d") if fecha_inicio else None
+        except ValueError:
+            raise ValueError("Formato de fecha inválido. Use YYYY-MM-DD")
+        if fin is None:
+            fin = datetime.combine(datetime.now().date() + timedelta(days=1), datetime.min.time())
+        if inicio is None:
+            inicio = fin - timedelta(days=365)
+        if inicio >= fin:
+            raise ValueError("fecha_inicio debe ser anterior a fecha_fin")
+
+        config = ConfiguracionService.obtener_configuracion(db)
+        actual = cls._tarifa(config, {})
+        candidata = cls._tarifa(config, datos)
+
+        marca = datetime.now()
+        arreglos = cls._cargar(db, inicio, fin)
+        costos_actual = np.zeros(len(arreglos["entrada"]))
+        costos_candidata = np.zeros(len(arreglos["entrada"]))
+        por_clase = []
+        for clase in CLASES_VEHICULO:
+            filas = np.nonzero(arreglos["clase_vehiculo"] == clase)[0]
+            if not len(filas):
+                continue
+            de_clase = {nombre: arreglo[filas] for nombre, arreglo in arreglos.items()}
+            costos_actual[filas] = cls.cobrar(
+                de_clase, compilar_tarifa(actual, clase), VersionTarifaService.linea(db, clase)
+            )
+            costos_candidata[filas] = cls.cobrar(de_clase, compilar_tarifa(candidata, clase))
+            pagadas_clase = ~de_clase["es_no_pagado"]
+            por_clase.append({
+                "clase_vehiculo": clase,
+                "estadias": int(len(filas)),
+                "ingresos_actual": round(float(costos_actual[filas][pagadas_clase].sum()), 2),
+                "ingresos_candidata": round(float(costos_candidata[filas][pagadas_clase].sum()), 2),
+            })
+        duracion_ms = (datetime.now() - marca).total_seconds() * 1000
+
+        pagadas = ~arreglos["es_no_pagado"]
+        ingresos_actual = float(costos_actual[pagadas].sum())
+        ingresos_candidata = float(costos_candidata[pagadas].sum())
+        diferencias = costos_candidata - costos_actual
+
+        por_duracion = []
+        for nombre, desde, hasta in TRAMOS_DURACION:
+            filtro = pagadas & (arreglos["minutos"] >= desde)
+            if hasta is not None:
+                filtro &= arreglos["minutos"] <= hasta
+            por_duracion.append({
+                "tramo": nombre,
+                "estadias": int(filtro.sum()),
+                "ingresos_actual": round(float(costos_actual[filtro].sum()), 2),
+                "ingresos_candidata": round(float(costos_candidata[filtro].sum()), 2),
+            })
+
+        conteos, bordes = np.histogram(diferencias, bins=10) if len(diferencias) else ([], [])
+        return {
+            "fecha_inicio": inicio.strftime("%Y-%m-%d"),
+            "fecha_fin": (fin - timedelta(days=1)).strftime("%Y-%m-%d"),
+            "estadias": int(len(costos_actual)),
+            "estadias_pagadas": int(pagadas.sum()),
+            "ingresos_registrados": round(float(arreglos["costo_total"][pagadas].sum()), 2),
+            "ingresos_actual": round(ingresos_actual, 2),
+            "ingresos_candidata": round(ingresos_candidata, 2),
+            "diferencia": round(ingresos_candidata - ingresos_actual, 2),
+            "diferencia_porcentaje": round((ingresos_candidata - ingresos_actual) / ingresos_actual * 100, 2) if ingresos_actual else None,
+            "cambios": {
+                "suben": int((diferencias > 0.005).sum()),
+                "bajan": int((diferencias < -0.005).sum()),
+                "iguales": int((abs(diferencias) <= 0.005).sum()),
+            },
+            "percentiles": {
+                "actual": cls._percentiles(costos_actual),
+                "candidata": cls._percentiles(costos_candidata),
+            },
+            "histograma_diferencias": [
+                {"desde": round(float(bordes[i]), 2), "hasta": round(float(bordes[i + 1]), 2), "estadias": int(conteos[i])}
+                for i in range(len(conteos))
+            ],
+            "por_duracion": por_duracion,
+            "por_clase": por_clase,
+            "duracion_calculo_ms": round(duracion_ms, 2),
+        }
+
+    # =========================
+    # Cobro vectorizado
+    # =========================
+
+    @staticmethod
+    def cobrar(arreglos: dict, tarifa, versiones=None) -> "np.ndarray":
+        """
+        Costo de cada estadía con las reglas de CalculadoraPrecios.calcular_costo:
+        tarifa nocturna fija si es_nocturno, si no rango personalizado, si no
+        rangos fijos sobre la duración acumulada con cada ventana nocturna
+        topada en precio_nocturno.
+
+        Con `versiones` (LineaTarifas) cada tramo de la estadía se cobra con
+        la versión vigente en él, y la tarifa fija nocturna y los rangos
+        personalizados con la de la entrada; sin ellas, todo con `tarifa`.
+        """
+        entrada = arreglos["entrada"]
+        salida = arreglos["salida"]
+        minutos = arreglos["minutos"]
+
+        if versiones is None:
+            tarifas = [tarifa]
+            limites = np.array([], dtype=np.int64)
+        else:
+            tarifas = versiones.versiones
+            limites = np.array(versiones.fechas[1:], dtype="datetime64[us]").astype(np.int64)
+
+        # Cada versión cobra lo que agrega su parte [a0, b0) de la estadía;
+        # `noche` lleva lo cobrado en una noche que sigue abierta en el cambio
+        # de versión, para que toda la noche tenga un solo tope
+        costos = np.zeros(len(entrada))
+        noche = np.zeros(len(entrada))
+        for indice, tarifa_tramo in enumerate(tarifas):
+            a0 = entrada if indice == 0 else np.maximum(entrada, limites[indice - 1])
+            b0 = salida if indice == len(limites) else np.minimum(salida, limites[indice])
+            filas = np.nonzero(a0 < b0)[0]
+            if not len(filas):
+                continue
+            e, s, m, a0, b0 = entrada[filas], salida[filas], minutos[filas], a0[filas], b0[filas]
+            antes = -((e - a0) // MICROS_MINUTO)
+            despues = np.where(b0 >= s, m, -((e - b0) // MICROS_MINUTO))
+            excesos, noche_abierta = SimulacionTarifasService._excesos_nocturnos(
+                e, s, m, a0, b0, tarifa_tramo, noche[filas]
+            )
+            costos[filas] += (
+                SimulacionTarifasService._tarifa_rangos(despues, tarifa_tramo)
+                - SimulacionTarifasService._tarifa_rangos(antes, tarifa_tramo)
+                - excesos
+            )
+            noche = np.zeros(len(entrada))
+            noche[filas] = noche_abierta
+
+        # Lo que depende de la versión vigente a la entrada
+        version_entrada = np.searchsorted(limites, entrada, side="right")
+        for indice, tarifa_entrada in enumerate(tarifas):
+            de_version = version_entrada == indice
+            if not de_version.any():
+                continue
+            # Estadías de duración cero: el mínimo de 1 minuto
+            costos = np.where(de_version & (salida <= entrada),
+                              SimulacionTarifasService._tarifa_rangos(minutos, tarifa_entrada), costos)
+
+            rangos = tarifa_entrada.rangos_personalizados
+            if rangos:
+                if isinstance(rangos, str):
+                    rangos = json.loads(rangos)
+                decididas = ~de_version
+                for rango in rangos:
+                    coincide = ~decididas & (minutos >= rango["min_minutos"]) & (minutos <= rango["max_minutos"])
+                    precio = float(rango["precio"])
+                    if precio:
+                        costos = np.where(coincide, precio, costos)
+                    decididas |= coincide
+
+            costos = np.where(de_version & arreglos["es_nocturno"], float(tarifa_entrada.precio_nocturno), costos)
+        return np.round(costos, 2)
+
+    @staticmethod
+    def _excesos_nocturnos(entrada, salida, minutos, a0, b0, tarifa, cobrado_noche):
+        """
+        Lo que las ventanas nocturnas dentro de [a0, b0) agregan por encima
+        de precio_nocturno (se resta de la tarifa acumulada) y lo cobrado en
+        la noche que sigue abierta en b0.
+
+        `cobrado_noche` es lo ya cobrado (con la versión anterior) en una
+        noche abierta en a0: si la ventana de esta versión también cubre a0,
+        es la misma noche y su tope se reduce en esa cantidad.
+        """
+        excesos = np.zeros(len(entrada))
+        abierta = np.zeros(len(entrada))
+        inicio = CalculadoraPrecios._hora(tarifa.hora_inicio_nocturno)
+        fin = CalculadoraPrecios._hora(tarifa.hora_fin_nocturno)
+        if inicio == fin:
+            return excesos, abierta
+
+        tope = float(tarifa.precio_nocturno)
+        desfase = (inicio.hour * 3600 + inicio.minute * 60 + inicio.second) * 1_000_000
+        largo = ((fin.hour - inicio.hour) * 3600 + (fin.minute - inicio.minute) * 60
+                 + fin.second - inicio.second) * 1_000_000 % MICROS_DIA
+        # Una ventana por día calendario, empezando por la víspera de a0;
+        # cada vuelta solo toca las estadías que siguen abiertas
+        dia = (a0 // MICROS_DIA - 1) * MICROS_DIA
+        vivas = np.arange(len(entrada))
+        while len(vivas):
+            desde = dia[vivas] + desfase
+            a = np.maximum(desde, a0[vivas])
+            b = np.minimum(desde + largo, b0[vivas])
+            cruza = a < b
+            if cruza.any():
+                filas = vivas[cruza]
+                e, s, a, b = entrada[filas], salida[filas], a[cruza], b[cruza]
+                antes = -((e - a) // MICROS_MINUTO)
+                despues = np.where(b >= s, minutos[filas], -((e - b) // MICROS_MINUTO))
+                agregado = (SimulacionTarifasService._tarifa_rangos(despues, tarifa)
+                            - SimulacionTarifasService._tarifa_rangos(antes, tarifa))
+                sigue = a == a0[filas]
+                previo = np.where(sigue, cobrado_noche[filas], 0.0)
+                cobrado = np.minimum(agregado, np.maximum(tope - previo, 0.0))
+                excesos[filas] += agregado - cobrado
+                abierta[filas] = np.where(b == b0[filas], previo + cobrado, abierta[filas])
+            dia = dia + MICROS_DIA
+            vivas = vivas[dia[vivas] + desfase < b0[vivas]]
+        return excesos, abierta
+
+    @staticmethod
+    def _tarifa_rangos(minutos, tarifa):
+        """CalculadoraPrecios._tarifa_rangos sobre un arreglo de minutos"""
+        bloques = np.ceil(np.maximum(minutos - 60, 0) / 30.0)
+        return np.select(
+            [minutos <= 0, minutos <= 5, minutos <= 30, minutos <= 60],
+            [0.0, float(tarifa.precio_0_5_min), float(tarifa.precio_6_30_min), float(tarifa.precio_31_60_min)],
+            float(tarifa.precio_31_60_min) + bloques * float(tarifa.precio_hora_adicional) / 2.0
+        )
+
+    # =========================
+    # Datos
+    # =========================
+
+    @classmethod
+    def _cargar(cls, db: Session, inicio: datetime, fin: datetime) -> dict:
+        """Arreglos del rango, reutilizados mientras no haya escrituras"""
+        clave = (inicio, fin, CacheRespuestas.version_actual())
+        with cls._lock:
+            if cls._datos is not None and cls._datos[0] == clave:
+                return cls._datos[1]
+
+        Factura = ArchivoService.historial(db, inicio)
+        # Fechas como texto: las convierte NumPy en bloque, no fila por fila
+        filas = db.execute(
+            select(
+                cast(Factura.fecha_hora_entrada, String),
+                cast(Factura.fecha_hora_salida, String),
+                cast(Factura.es_nocturno, Integer),
+                cast(Factura.es_no_pagado, Integer),
+                cast(Factura.costo_total, Float),
+                Factura.clase_vehiculo,
+            ).where(
+                Factura.fecha_hora_salida >= inicio,
+                Factura.fecha_hora_salida < fin
+            )
+        ).all()
+
+        if filas:
+            entradas, salidas, nocturnos, no_pagados, costos, clases = zip(*filas)
+        else:
+            entradas = salidas = nocturnos = no_pagados = costos = clases = ()
+        entrada = np.array(entradas, dtype="datetime64[us]").astype(np.int64)
+        salida = np.array(salidas, dtype="datetime64[us]").astype(np.int64)
+        # Mismos minutos que CalculadoraPrecios._calcular_minutos (mínimo 1)
+        minutos = np.maximum(-((entrada - salida) // MICROS_MINUTO), 1)
+        arreglos = {
+            "entrada": entrada,
+            "salida": salida,
+            "minutos": minutos,
+            "es_nocturno": np.array(nocturnos, dtype=bool),
+            "es_no_pagado": np.array(no_pagados, dtype=bool),
+            "costo_total": np.array(costos, dtype=float),
+            "clase_vehiculo": np.array(clases, dtype=str),
+        }
+        with cls._lock:
+            cls._datos = (clave, arreglos)
+        return arreglos
+
+    @staticmethod
+    def _tarifa(config, cambios: dict) -> SimpleNamespace:
+        """Configuración actual con los campos de `cambios` que no son None"""
+        tarifa = SimpleNamespace(**{campo: getattr(config, campo) for campo in CAMPOS_TARIFA})
+        for campo in CAMPOS_TARIFA:
+            valor = cambios.get(campo)
+            if valor is not None:
+                setattr(tarifa, campo, valor)
+        if isinstance(tarifa.rangos_personalizados, str) and tarifa.rangos_personalizados:
+            try:
+                tarifa.rangos_personalizados = json.loads(tarifa.rangos_personalizados)
+            except json.JSONDecodeError:
+                raise ValueError("rangos_personalizados no es un JSON válido")
+        if isinstance(tarifa.tarifas_por_clase, str) and tarifa.tarifas_por_clase:
+            try:
+                json.loads(tarifa.tarifas_por_clase)
+            except json.JSONDecodeError:
+                raise ValueError("tarifas_por_clase no es un JSON válido")
+        return tarifa
+
+    @staticmethod
+    def _percentiles(costos) -> dict:
+        if not len(costos):
+            return {"promedio": 0.0, **{f"p{p}": 0.0 for p in PERCENTILES}}
+        valores = np.percentile(costos, PERCENTILES)
+        return {
+            "promedio": round(float(costos.mean()), 2),
+            **{f"p{p}": round(float(v), 2) for p, v in zip(PERCENTILES, valores)}
+        }
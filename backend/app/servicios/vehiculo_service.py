@@ -1,11 +1,48 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from sqlalchemy.orm import joinedload
-from datetime import datetime
-from app.modelos.vehiculo_estacionado import VehiculoEstacionado
+from sqlalchemy import func, cast, Float, tuple_, select, insert, delete, bindparam, literal, exists
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime, timedelta
+import base64
+from app.modelos.vehiculo_estacionado import VehiculoEstacionado, CLASES_VEHICULO, CLASE_POR_DEFECTO
+from app.modelos.vehiculo_activo import VehiculoActivo, siguiente_id_vehiculo
 from app.modelos.historial_factura import HistorialFactura
 from app.servicios.configuracion_service import ConfiguracionService
 from app.servicios.calculo_service import CalculoService
+from app.servicios.version_tarifa_service import VersionTarifaService
+from app.utils.calculadora_precios import CalculadoraPrecios
+from app.utils.cache_cotizaciones import CacheCotizaciones
+from app.utils.contador_ocupacion import ContadorOcupacion
+from app.servicios.precio_dinamico_service import PrecioDinamicoService
+from app.servicios.eventos_service import EventosService
+from app.servicios.busqueda_placas_service import BusquedaPlacasService
+from app.servicios.archivo_service import ArchivoService, MARGEN_CORTE
+from app.servicios.duracion_service import DuracionService
+from app.utils.serializacion import filas_a_dicts
+
+# Columnas del listado de historial (mismas claves que HistorialFactura.to_dict)
+def _campos_historial(Factura):
+    return (
+        ('id', Factura.id),
+        ('vehiculo_id', Factura.vehiculo_id),
+        ('placa', Factura.placa),
+        ('espacio_numero', Factura.espacio_numero),
+        ('fecha_hora_entrada', Factura.fecha_hora_entrada),
+        ('fecha_hora_salida', Factura.fecha_hora_salida),
+        ('tiempo_total_minutos', Factura.tiempo_total_minutos),
+        ('costo_total', cast(Factura.costo_total, Float)),
+        ('detalles_cobro', Factura.detalles_cobro),
+        ('fecha_generacion', Factura.fecha_generacion),
+        ('es_nocturno', Factura.es_nocturno),
+        ('es_no_pagado', Factura.es_no_pagado),
+        ('metodo_pago', Factura.metodo_pago),
+        ('clase_vehiculo', Factura.clase_vehiculo),
+        ('multiplicador_ocupacion', cast(Factura.multiplicador_ocupacion, Float)),
+    )
+
+CLAVES_HISTORIAL = [clave for clave, _ in _campos_historial(HistorialFactura)]
+
+# Tamaño máximo de página del historial
+LIMITE_MAXIMO_HISTORIAL = 1000
 
 class VehiculoService:
     """Servicio para manejar vehículos estacionados"""
@@ -18,7 +55,9 @@ class VehiculoService:
         Returns:
             Lista de diccionarios con el estado de cada espacio
         """
-        vehiculos_activos = db.query(VehiculoEstacionado).filter_by(estado='activo').all()
+        vehiculos_activos = db.query(VehiculoActivo).all()
+        # Ya están todos leídos: de paso se corrige el contador de ocupación
+        ContadorOcupacion.fijar(len(vehiculos_activos))
         espacios = []
         for i in range(1, 25):
             vehiculo = next((v for v in vehiculos_activos if v.espacio_numero == i), None)
@@ -28,7 +67,8 @@ class VehiculoService:
                 'ocupado': vehiculo is not None,
                 'placa': vehiculo.placa if vehiculo else None,
                 'entrada': vehiculo.fecha_hora_entrada.isoformat() if vehiculo else None,
-                'es_nocturno': vehiculo.es_nocturno if vehiculo else False
+                'es_nocturno': vehiculo.es_nocturno if vehiculo else False,
+                'clase_vehiculo': vehiculo.clase_vehiculo if vehiculo else None
             }
             
             print(f"  Espacio {i}: ocupado={espacio_debug['ocupado']}, " +
@@ -40,55 +80,66 @@ class VehiculoService:
         return espacios
     
     @staticmethod
-    def registrar_entrada(db: Session, placa: str, espacio_numero: int, es_nocturno: bool = False):
+    def registrar_entrada(db: Session, placa: str, espacio_numero: int, es_nocturno: bool = False,
+                          clase_vehiculo: str = CLASE_POR_DEFECTO):
         """
         Registrar la entrada de un vehículo
         """
         placa = placa.upper().strip()
         
-        # ✅ Verificar si la placa tiene deudas pendientes
-        deudas_pendientes = db.query(HistorialFactura).filter_by(
-            placa=placa,
-            es_no_pagado=True
-        ).first()
-        
-        if deudas_pendientes:
-            raise ValueError(f'El vehículo {placa} tiene deudas pendientes. Debe pagar primero.')
-        
         # Validar número de espacio
         if not (1 <= espacio_numero <= 24):
             raise ValueError('El número de espacio debe estar entre 1 y 24')
+        if clase_vehiculo not in CLASES_VEHICULO:
+            raise ValueError(f'Clase de vehículo inválida: {clase_vehiculo}')
+        
+        # Una sola sentencia: la deuda pendiente se verifica en el mismo
+        # INSERT y los índices únicos de vehiculos_activos (espacio y placa)
+        # rechazan la entrada si otra terminal ganó la carrera
+        vehiculos = VehiculoActivo.__table__
+        facturas = HistorialFactura.__table__
+        ahora = datetime.now()
+        fila_nueva = select(
+            siguiente_id_vehiculo(), literal(placa), literal(espacio_numero), literal(ahora),
+            literal(es_nocturno), literal(clase_vehiculo), literal(ahora)
+        ).where(~exists().where(
+            facturas.c.placa == placa,
+            facturas.c.es_no_pagado == True
+        ))
+        try:
+            fila = db.execute(
+                insert(vehiculos).from_select(
+                    ['id', 'placa', 'espacio_numero', 'fecha_hora_entrada', 'es_nocturno', 'clase_vehiculo', 'creado_en'],
+                    fila_nueva
+                ).returning(*vehiculos.c)
+            ).first()
+            db.commit()
+        except IntegrityError as e:
+            db.rollback()
+            mensaje = str(e.orig)
+            if 'espacio_numero' in mensaje:
+                raise ValueError(f'El espacio {espacio_numero} ya está ocupado')
+            if 'placa' in mensaje:
+                espacio_actual = db.execute(
+                    select(vehiculos.c.espacio_numero).where(vehiculos.c.placa == placa)
+                ).scalar()
+                raise ValueError(f'El vehículo {placa} ya está estacionado en el espacio {espacio_actual}')
+            raise
+        
+        if fila is None:
+            raise ValueError(f'El vehículo {placa} tiene deudas pendientes. Debe pagar primero.')
         
-        # Verificar si el espacio está ocupado
-        espacio_ocupado = db.query(VehiculoEstacionado).filter_by(
-            espacio_numero=espacio_numero,
-            estado='activo'
-        ).first()
-        
-        if espacio_ocupado:
-            raise ValueError(f'El espacio {espacio_numero} ya está ocupado')
+        # Instancia sin sesión, solo para la respuesta (no hace falta releerla)
+        vehiculo = VehiculoActivo(**fila._mapping)
         
-        # Verificar si el vehículo ya está estacionado
-        vehiculo_activo = db.query(VehiculoEstacionado).filter_by(
-            placa=placa,
-            estado='activo'
-        ).first()
-        
-        if vehiculo_activo:
-            raise ValueError(f'El vehículo {placa} ya está estacionado en el espacio {vehiculo_activo.espacio_numero}')
-        
-        # Crear nuevo vehículo
-        vehiculo = VehiculoEstacionado(
-            placa=placa,
-            espacio_numero=espacio_numero,
-            fecha_hora_entrada=datetime.now(),
-            estado='activo',
-            es_nocturno=es_nocturno
-        )
-        
-        db.add(vehiculo)
-        db.commit()
-        db.refresh(vehiculo)
+        ContadorOcupacion.entrada()
+        BusquedaPlacasService.registrar_entrada(vehiculo.placa, vehiculo.espacio_numero)
+        EventosService.publicar('espacio_ocupado', {
+            'numero': vehiculo.espacio_numero,
+            'placa': vehiculo.placa,
+            'entrada': vehiculo.fecha_hora_entrada.isoformat(),
+            'es_nocturno': vehiculo.es_nocturno
+        }, clave=f"espacio:{vehiculo.espacio_numero}")
         
         return vehiculo
     
@@ -105,23 +156,29 @@ class VehiculoService:
         """
         placa = placa.upper().strip()
         
-        vehiculo = db.query(VehiculoEstacionado).filter_by(
-            placa=placa,
-            estado='activo'
-        ).first()
+        activo = db.query(VehiculoActivo).filter_by(placa=placa).first()
         
-        if not vehiculo:
+        if not activo:
             raise ValueError('Vehículo no encontrado o ya salió')
+        vehiculo = activo
         
+        # Tarifa de la clase del vehículo (compilada y cacheada por versión)
         config = ConfiguracionService.obtener_configuracion(db)
+        tarifa = VersionTarifaService.tarifa_clase(config, vehiculo.clase_vehiculo)
+        versiones = VersionTarifaService.linea(db, vehiculo.clase_vehiculo)
         fecha_salida = datetime.now()
         
         # SIEMPRE calcular el costo real
         calculo = CalculoService.calcular_costo(
             vehiculo.fecha_hora_entrada,
             fecha_salida,
-            config,
-            vehiculo.es_nocturno
+            tarifa,
+            vehiculo.es_nocturno,
+            versiones
+        )
+        # Recargo por ocupación del momento (el vehículo que sale incluido)
+        calculo = PrecioDinamicoService.aplicar(
+            calculo, PrecioDinamicoService.bandas(config), ContadorOcupacion.ocupados(db)
         )
         
         costo_calculado = calculo['costo']
@@ -137,11 +194,22 @@ class VehiculoService:
             detalles = detalles_base
             estado_cobro = f"COBRADO ({metodo_pago.upper()})"
         
-        # Actualizar vehículo
-        vehiculo.fecha_hora_salida = fecha_salida
-        vehiculo.costo_total = costo_calculado
-        vehiculo.estado = 'finalizado'
-        vehiculo.es_no_pagado = es_no_pagado
+        # Mover la estadía al historial (mismo id) y liberar la fila activa
+        vehiculo = VehiculoEstacionado(
+            id=activo.id,
+            placa=activo.placa,
+            espacio_numero=activo.espacio_numero,
+            fecha_hora_entrada=activo.fecha_hora_entrada,
+            fecha_hora_salida=fecha_salida,
+            costo_total=costo_calculado,
+            estado='finalizado',
+            es_nocturno=activo.es_nocturno,
+            es_no_pagado=es_no_pagado,
+            clase_vehiculo=activo.clase_vehiculo,
+            creado_en=activo.creado_en
+        )
+        db.delete(activo)
+        db.add(vehiculo)
         
         # Crear factura con el método de pago
         factura = HistorialFactura(
@@ -155,14 +223,36 @@ class VehiculoService:
             detalles_cobro=detalles,
             es_nocturno=vehiculo.es_nocturno,
             es_no_pagado=es_no_pagado,
-            metodo_pago=metodo_pago  # 👈 GUARDAR EL MÉTODO DE PAGO
+            metodo_pago=metodo_pago,  # 👈 GUARDAR EL MÉTODO DE PAGO
+            clase_vehiculo=vehiculo.clase_vehiculo,
+            multiplicador_ocupacion=calculo['multiplicador']
         )
         
         db.add(factura)
+        # Percentiles de duración: sketches del día, con el bloqueo de escritura ya tomado
+        db.flush()
+        DuracionService.registrar(db, [(
+            fecha_salida, minutos, vehiculo.espacio_numero, vehiculo.es_nocturno, vehiculo.clase_vehiculo
+        )])
         db.commit()
         db.refresh(vehiculo)
         db.refresh(factura)
         
+        ContadorOcupacion.salida()
+        BusquedaPlacasService.registrar_salida(vehiculo.placa)
+        CacheCotizaciones.descartar(vehiculo.placa)
+        EventosService.publicar('espacio_liberado', {
+            'numero': vehiculo.espacio_numero
+        }, clave=f"espacio:{vehiculo.espacio_numero}")
+        EventosService.publicar('salida_facturada', {
+            'factura_id': factura.id,
+            'placa': vehiculo.placa,
+            'espacio': vehiculo.espacio_numero,
+            'costo_total': costo_calculado,
+            'metodo_pago': metodo_pago,
+            'es_no_pagado': es_no_pagado
+        })
+        
         print(f"✅ Salida registrada - Placa: {placa}, Espacio: {vehiculo.espacio_numero}, "
               f"Método: {metodo_pago}, Costo: ${costo_calculado:.2f}, Estado: {estado_cobro}")
         
@@ -172,69 +262,514 @@ class VehiculoService:
             'tiempo_formateado': CalculoService.formatear_tiempo(minutos),
             'costo_calculado': costo_calculado,
             'es_no_pagado': es_no_pagado,
-            'metodo_pago': metodo_pago
+            'metodo_pago': metodo_pago,
+            'multiplicador': calculo['multiplicador']
         }
     
+    @staticmethod
+    def registrar_lote(db: Session, eventos: list) -> dict:
+        """
+        Registrar un lote ordenado de entradas y salidas en una sola transacción.
+
+        Cada evento se valida con las mismas reglas que registrar_entrada y
+        registrar_salida, pero contra el estado de ocupación en memoria
+        (cargado una vez y actualizado evento por evento). Un evento inválido
+        no detiene el lote: queda con su error en el resultado.
+
+        Args:
+            eventos: Lista de EventoLote (tipo, placa, espacio, fecha_hora...)
+
+        Returns:
+            dict con 'resultados' (uno por evento, en el mismo orden) y totales
+        """
+        tabla_activos = VehiculoActivo.__table__
+        historial = VehiculoEstacionado.__table__
+        facturas = HistorialFactura.__table__
+        ahora = datetime.now()
+
+        # Estado de ocupación: a lo sumo 24 vehículos activos
+        activos = {}    # placa -> fila del vehículo (dict)
+        ocupados = {}   # espacio -> placa
+        for v in db.execute(
+            select(
+                tabla_activos.c.id, tabla_activos.c.placa, tabla_activos.c.espacio_numero,
+                tabla_activos.c.fecha_hora_entrada, tabla_activos.c.es_nocturno,
+                tabla_activos.c.clase_vehiculo
+            )
+        ):
+            activos[v.placa] = dict(v._mapping, existente=True)
+            ocupados[v.espacio_numero] = v.placa
+
+        placas = {e.placa for e in eventos}
+        deudores = set(db.execute(
+            select(facturas.c.placa).where(
+                facturas.c.es_no_pagado == True,
+                facturas.c.placa.in_(placas)
+            ).distinct()
+        ).scalars())
+        config = ConfiguracionService.obtener_configuracion(db)
+        tarifas = {
+            clase: (VersionTarifaService.tarifa_clase(config, clase), VersionTarifaService.linea(db, clase))
+            for clase in CLASES_VEHICULO
+        }
+        bandas = PrecioDinamicoService.bandas(config)
+
+        nuevos = []           # vehículos a insertar (pueden salir dentro del mismo lote)
+        actualizados = []     # salidas de vehículos que ya estaban en la base
+        nuevas_facturas = []  # (fila de factura, fila del vehículo, resultado)
+        resultados = []
+
+        for indice, evento in enumerate(eventos):
+            placa = evento.placa
+            resultado = {'indice': indice, 'tipo': evento.tipo, 'placa': placa}
+            resultados.append(resultado)
+            fecha = evento.fecha_hora or ahora
+            if fecha.tzinfo is not None:
+                fecha = fecha.astimezone().replace(tzinfo=None)
+
+            if evento.tipo == 'entrada':
+                espacio = evento.espacio_numero
+                if placa in deudores:
+                    error = f'El vehículo {placa} tiene deudas pendientes. Debe pagar primero.'
+                elif espacio is None or not (1 <= espacio <= 24):
+                    error = 'El número de espacio debe estar entre 1 y 24'
+                elif espacio in ocupados:
+                    error = f'El espacio {espacio} ya está ocupado'
+                elif placa in activos:
+                    error = f'El vehículo {placa} ya está estacionado en el espacio {activos[placa]["espacio_numero"]}'
+                elif fecha > ahora + timedelta(minutes=5):
+                    error = 'La fecha del evento está en el futuro'
+                else:
+                    error = None
+                if error:
+                    resultado.update(ok=False, error=error)
+                    continue
+
+                fila = {
+                    'placa': placa,
+                    'espacio_numero': espacio,
+                    'fecha_hora_entrada': fecha,
+                    'fecha_hora_salida': None,
+                    'costo_total': None,
+                    'estado': 'activo',
+                    'es_nocturno': evento.es_nocturno,
+                    'es_no_pagado': False,
+                    'clase_vehiculo': evento.clase_vehiculo,
+                    'creado_en': ahora,
+                    'existente': False,
+                    'resultado': resultado,
+                }
+                nuevos.append(fila)
+                activos[placa] = fila
+                ocupados[espacio] = placa
+                resultado.update(ok=True, espacio_numero=espacio, fecha=fecha.isoformat())
+                continue
+
+            # Salida
+            vehiculo = activos.get(placa)
+            if vehiculo is None:
+                resultado.update(ok=False, error='Vehículo no encontrado o ya salió')
+                continue
+            if fecha < vehiculo['fecha_hora_entrada']:
+                resultado.update(ok=False, error='La fecha de salida es anterior a la entrada')
+                continue
+
+            tarifa, versiones = tarifas[vehiculo['clase_vehiculo']]
+            calculo = CalculadoraPrecios.calcular_costo(
+                vehiculo['fecha_hora_entrada'], fecha, tarifa, vehiculo['es_nocturno'], versiones
+            )
+            # Ocupación del lote en este evento, antes de liberar el espacio
+            calculo = PrecioDinamicoService.aplicar(calculo, bandas, len(ocupados))
+            costo = calculo['costo']
+            if evento.es_no_pagado:
+                detalles = f"NO PAGADO - {calculo['detalles']} - Valor no cobrado: ${costo:.2f}"
+                deudores.add(placa)
+            else:
+                detalles = calculo['detalles']
+
+            cambios = {
+                'fecha_hora_salida': fecha,
+                'costo_total': costo,
+                'estado': 'finalizado',
+                'es_no_pagado': evento.es_no_pagado,
+            }
+            if vehiculo['existente']:
+                actualizados.append(dict(cambios, b_id=vehiculo['id']))
+            else:
+                vehiculo.update(cambios)
+            del activos[placa]
+            del ocupados[vehiculo['espacio_numero']]
+
+            nuevas_facturas.append(({
+                'placa': placa,
+                'espacio_numero': vehiculo['espacio_numero'],
+                'fecha_hora_entrada': vehiculo['fecha_hora_entrada'],
+                'fecha_hora_salida': fecha,
+                'tiempo_total_minutos': calculo['minutos'],
+                'costo_total': costo,
+                'detalles_cobro': detalles,
+                'es_nocturno': vehiculo['es_nocturno'],
+                'es_no_pagado': evento.es_no_pagado,
+                'metodo_pago': evento.metodo_pago,
+                'clase_vehiculo': vehiculo['clase_vehiculo'],
+                'multiplicador_ocupacion': calculo['multiplicador'],
+            }, vehiculo, resultado))
+            resultado.update(
+                ok=True,
+                espacio_numero=vehiculo['espacio_numero'],
+                fecha=fecha.isoformat(),
+                costo_total=costo,
+                tiempo_total=CalculadoraPrecios.formatear_tiempo(calculo['minutos']),
+                es_no_pagado=evento.es_no_pagado,
+                metodo_pago=evento.metodo_pago,
+                multiplicador_ocupacion=calculo['multiplicador'],
+            )
+
+        # Escritura: un executemany por sentencia. Desde la primera escritura
+        # la transacción tiene el bloqueo de escritura, así que las N filas
+        # recién insertadas en una tabla son las N de id más alto
+        def insertar(tabla, filas) -> list:
+            db.execute(insert(tabla), filas)
+            return ultimos_ids(tabla, len(filas))
+
+        def ultimos_ids(tabla, cantidad) -> list:
+            ids = db.execute(
+                select(tabla.c.id).order_by(tabla.c.id.desc()).limit(cantidad)
+            ).scalars().all()
+            return ids[::-1]
+
+        def parametro(columna):
+            return bindparam(columna.name, type_=columna.type)
+
+        # Los ids de estadía se comparten entre vehiculos_activos y el
+        # historial: las filas nuevas los toman de siguiente_id_vehiculo()
+        def insertar_con_id(tabla, columnas, filas):
+            db.execute(
+                insert(tabla).from_select(
+                    ['id', *columnas],
+                    select(siguiente_id_vehiculo(), *[parametro(tabla.c[c]) for c in columnas])
+                ),
+                [{c: fila[c] for c in columnas} for fila in filas]
+            )
+
+        try:
+            # 1. Salidas de vehículos que ya estaban activos: pasan al
+            #    historial con su id. Va primero para que un espacio liberado
+            #    pueda volver a ocuparse en el mismo lote.
+            if actualizados:
+                db.execute(
+                    insert(historial).from_select(
+                        ['id', 'placa', 'espacio_numero', 'fecha_hora_entrada', 'fecha_hora_salida',
+                         'costo_total', 'estado', 'es_nocturno', 'es_no_pagado', 'clase_vehiculo', 'creado_en'],
+                        select(
+                            tabla_activos.c.id, tabla_activos.c.placa, tabla_activos.c.espacio_numero,
+                            tabla_activos.c.fecha_hora_entrada, parametro(historial.c.fecha_hora_salida),
+                            parametro(historial.c.costo_total), parametro(historial.c.estado),
+                            tabla_activos.c.es_nocturno, parametro(historial.c.es_no_pagado),
+                            tabla_activos.c.clase_vehiculo, tabla_activos.c.creado_en
+                        ).where(tabla_activos.c.id == bindparam('b_id'))
+                    ),
+                    actualizados
+                )
+                db.execute(
+                    delete(tabla_activos).where(tabla_activos.c.id == bindparam('b_id')),
+                    [{'b_id': fila['b_id']} for fila in actualizados]
+                )
+
+            # 2. Entradas que siguen activas al terminar el lote (la placa es
+            #    única en vehiculos_activos y sirve para leer los ids)
+            siguen = [fila for fila in nuevos if fila['estado'] == 'activo']
+            if siguen:
+                insertar_con_id(
+                    tabla_activos,
+                    ('placa', 'espacio_numero', 'fecha_hora_entrada', 'es_nocturno', 'clase_vehiculo', 'creado_en'),
+                    siguen
+                )
+                ids = dict(db.execute(
+                    select(tabla_activos.c.placa, tabla_activos.c.id).where(
+                        tabla_activos.c.placa.in_([fila['placa'] for fila in siguen])
+                    )
+                ).all())
+                for fila in siguen:
+                    fila['id'] = ids[fila['placa']]
+
+            # 3. Estadías que entran y salen dentro del lote: directo al historial
+            completas = [fila for fila in nuevos if fila['estado'] == 'finalizado']
+            if completas:
+                insertar_con_id(
+                    historial,
+                    ('placa', 'espacio_numero', 'fecha_hora_entrada', 'fecha_hora_salida', 'costo_total',
+                     'estado', 'es_nocturno', 'es_no_pagado', 'clase_vehiculo', 'creado_en'),
+                    completas
+                )
+                for fila, vehiculo_id in zip(completas, ultimos_ids(historial, len(completas))):
+                    fila['id'] = vehiculo_id
+
+            for fila in nuevos:
+                fila['resultado']['vehiculo_id'] = fila['id']
+
+            if nuevas_facturas:
+                for fila, vehiculo, resultado in nuevas_facturas:
+                    fila['vehiculo_id'] = vehiculo['id']
+                    resultado['vehiculo_id'] = vehiculo['id']
+                ids = insertar(facturas, [fila for fila, _, _ in nuevas_facturas])
+                for (_, _, resultado), factura_id in zip(nuevas_facturas, ids):
+                    resultado['factura_id'] = factura_id
+                DuracionService.registrar(db, [
+                    tuple(fila[c.name] for c in DuracionService.columnas(HistorialFactura))
+                    for fila, _, _ in nuevas_facturas
+                ])
+
+            db.commit()
+        except IntegrityError:
+            # Otra terminal ocupó un espacio o placa del lote mientras se validaba
+            db.rollback()
+            raise ValueError('La ocupación cambió mientras se procesaba el lote; reintente')
+        except Exception:
+            db.rollback()
+            raise
+
+        # Después del commit: ocupación final, índice de placas y un evento
+        # por espacio con su estado final
+        ContadorOcupacion.fijar(len(activos))
+        espacios = {}
+        for evento, resultado in zip(eventos, resultados):
+            if not resultado['ok']:
+                continue
+            if evento.tipo == 'entrada':
+                BusquedaPlacasService.registrar_entrada(evento.placa, resultado['espacio_numero'])
+            else:
+                BusquedaPlacasService.registrar_salida(evento.placa)
+                CacheCotizaciones.descartar(evento.placa)
+            espacios[resultado['espacio_numero']] = evento.tipo
+
+        for espacio in espacios:
+            placa = ocupados.get(espacio)
+            if placa is None:
+                EventosService.publicar('espacio_liberado', {'numero': espacio}, clave=f"espacio:{espacio}")
+            else:
+                EventosService.publicar('espacio_ocupado', {
+                    'numero': espacio,
+                    'placa': placa,
+                    'entrada': activos[placa]['fecha_hora_entrada'].isoformat(),
+                    'es_nocturno': activos[placa]['es_nocturno']
+                }, clave=f"espacio:{espacio}")
+
+        aceptados = sum(1 for r in resultados if r['ok'])
+        EventosService.publicar('lote_procesado', {
+            'eventos': len(resultados),
+            'aceptados': aceptados,
+            'facturas': len(nuevas_facturas),
+        })
+        print(f"📦 Lote procesado: {aceptados}/{len(resultados)} eventos, {len(nuevas_facturas)} facturas")
+
+        return {
+            'total': len(resultados),
+            'aceptados': aceptados,
+            'rechazados': len(resultados) - aceptados,
+            'resultados': resultados,
+        }
+
     @staticmethod
     def buscar_vehiculo(db: Session, placa: str):
         """
         Buscar un vehículo activo y calcular costo estimado
+
+        La cotización se reutiliza (CacheCotizaciones) hasta el próximo
+        cambio de precio; solo el tiempo transcurrido y el recargo por
+        ocupación (contador en memoria) se recalculan.
         """
         placa = placa.upper().strip()
+        ahora = datetime.now()
         
-        vehiculo = db.query(VehiculoEstacionado).filter_by(
-            placa=placa,
-            estado='activo'
-        ).first()
+        cotizacion = CacheCotizaciones.obtener(placa, ahora)
+        if cotizacion is not None:
+            vehiculo = cotizacion['vehiculo']
+            minutos = CalculadoraPrecios._calcular_minutos(vehiculo.fecha_hora_entrada, ahora)
+            return VehiculoService._con_recargo(
+                db, cotizacion, tiempo_estimado=CalculadoraPrecios.formatear_tiempo(minutos)
+            )
+        
+        version_tarifa = CacheCotizaciones.version_tarifa()
+        vehiculo = db.query(VehiculoActivo).filter_by(placa=placa).first()
         
         if not vehiculo:
             raise ValueError('Vehículo no encontrado')
         
         config = ConfiguracionService.obtener_configuracion(db)
-        print(f"Configuración precio_nocturno: {config.precio_nocturno}")
+        tarifa = VersionTarifaService.tarifa_clase(config, vehiculo.clase_vehiculo)
+        versiones = VersionTarifaService.linea(db, vehiculo.clase_vehiculo)
+        print(f"Configuración precio_nocturno ({vehiculo.clase_vehiculo}): {tarifa.precio_nocturno}")
         
         calculo = CalculoService.calcular_costo(
             vehiculo.fecha_hora_entrada,
-            datetime.now(),
-            config,
-            vehiculo.es_nocturno
+            ahora,
+            tarifa,
+            vehiculo.es_nocturno,
+            versiones
+        )
+        valido_hasta = CalculadoraPrecios.proximo_cambio(
+            vehiculo.fecha_hora_entrada, ahora, tarifa, vehiculo.es_nocturno, versiones
         )
         
-        return {
+        cotizacion = {
             'vehiculo': vehiculo,
             'costo_estimado': calculo['costo'],
-            'tiempo_estimado': CalculoService.formatear_tiempo(calculo['minutos']),
-            'detalles': calculo['detalles']
+            'detalles': calculo['detalles'],
+            'desglose': calculo['desglose'],
+            'valido_hasta': valido_hasta,
+            'bandas_ocupacion': PrecioDinamicoService.bandas(config)
         }
+        CacheCotizaciones.guardar(placa, vehiculo.id, version_tarifa, cotizacion)
+        
+        return VehiculoService._con_recargo(
+            db, cotizacion, tiempo_estimado=CalculoService.formatear_tiempo(calculo['minutos'])
+        )
+    
+    @staticmethod
+    def _con_recargo(db: Session, cotizacion: dict, **extra) -> dict:
+        """Cotización (sin recargo, cacheada) con el recargo por la ocupación actual"""
+        calculo = PrecioDinamicoService.aplicar(
+            {'costo': cotizacion['costo_estimado'], 'detalles': cotizacion['detalles']},
+            cotizacion['bandas_ocupacion'],
+            ContadorOcupacion.ocupados(db)
+        )
+        return dict(
+            cotizacion,
+            costo_estimado=calculo['costo'],
+            detalles=calculo['detalles'],
+            multiplicador=calculo['multiplicador'],
+            ocupacion=calculo['ocupacion'],
+            **extra
+        )
     
     @staticmethod
-    def obtener_historial(db: Session, fecha: str = None, limite: int = 50):
+    def obtener_historial(
+        db: Session,
+        fecha: str = None,
+        limite: int = 50,
+        placa: str = None,
+        fecha_desde: str = None,
+        fecha_hasta: str = None,
+        metodo_pago: str = None,
+        es_nocturno: bool = None,
+        es_no_pagado: bool = None,
+        cursor: str = None
+    ):
         """
-        Obtener el historial de facturas
+        Obtener el historial de facturas con filtros y paginación keyset
+        
+        Args:
+            fecha: Día exacto YYYY-MM-DD (equivale a fecha_desde = fecha_hasta)
+            limite: Tamaño de página (1 a 1000; fuera de rango es ValueError)
+            placa: Prefijo de placa
+            fecha_desde / fecha_hasta: Rango YYYY-MM-DD (ambos inclusive)
+            metodo_pago: 'efectivo' o 'tarjeta'
+            es_nocturno / es_no_pagado: Filtros opcionales
+            cursor: Valor 'siguiente_cursor' de la página anterior
+        
+        Returns:
+            {'data': [...], 'siguiente_cursor': str | None}
+        
+        Todos los filtros son por rango sobre columnas indexadas y la página
+        continúa desde (fecha_generacion, id) del último registro, así que el
+        costo por página no depende de cuántas páginas hay antes.
         """
-        query = db.query(HistorialFactura).options(
-            joinedload(HistorialFactura.vehiculo)
-        )
+        if not 1 <= limite <= LIMITE_MAXIMO_HISTORIAL:
+            raise ValueError(f"limite debe estar entre 1 y {LIMITE_MAXIMO_HISTORIAL}")
         
         if fecha:
-            try:
-                fecha_obj = datetime.strptime(fecha, '%Y-%m-%d').date()
-                query = query.filter(func.date(HistorialFactura.fecha_generacion) == fecha_obj)
-            except ValueError:
-                raise ValueError("Formato de fecha inválido. Use YYYY-MM-DD")
+            fecha_desde = fecha_hasta = fecha
+        inicio = VehiculoService._parsear_fecha(fecha_desde) if fecha_desde else None
+        fin = VehiculoService._parsear_fecha(fecha_hasta) + timedelta(days=1) if fecha_hasta else None
+        posicion = VehiculoService._decodificar_cursor(cursor) if cursor else None
+        
+        def consultar(Factura):
+            query = db.query(*[columna for _, columna in _campos_historial(Factura)])
+            
+            if inicio:
+                query = query.filter(Factura.fecha_generacion >= inicio)
+            if fin:
+                query = query.filter(Factura.fecha_generacion < fin)
+            
+            if placa:
+                # Prefijo como rango (usa el índice de placa, a diferencia de LIKE)
+                prefijo = placa.upper().strip()
+                if prefijo:
+                    siguiente = prefijo[:-1] + chr(ord(prefijo[-1]) + 1)
+                    query = query.filter(
+                        Factura.placa >= prefijo,
+                        Factura.placa < siguiente
+                    )
+            
+            if metodo_pago:
+                query = query.filter(Factura.metodo_pago == metodo_pago)
+            if es_nocturno is not None:
+                query = query.filter(Factura.es_nocturno == es_nocturno)
+            if es_no_pagado is not None:
+                query = query.filter(Factura.es_no_pagado == es_no_pagado)
+            
+            if posicion:
+                query = query.filter(
+                    tuple_(Factura.fecha_generacion, Factura.id) < tuple_(*posicion)
+                )
+            
+            return query.order_by(
+                Factura.fecha_generacion.desc(),
+                Factura.id.desc()
+            ).limit(limite + 1).all()
+        
+        filas = consultar(HistorialFactura)
+        
+        # La página sale de la base principal salvo que llegue a la zona
+        # archivada; en ese caso se repite sobre la unión con el archivo
+        if ArchivoService.alcanza_archivo(db, inicio):
+            limite_caliente = ArchivoService.corte(db) + MARGEN_CORTE
+            if len(filas) <= limite or filas[-1].fecha_generacion < limite_caliente:
+                filas = consultar(ArchivoService.historial(db, inicio))
+        
+        hay_mas = len(filas) > limite
+        historial = filas_a_dicts(CLAVES_HISTORIAL, filas[:limite])
         
-        historial = query.order_by(HistorialFactura.fecha_generacion.desc()).limit(limite).all()
+        siguiente_cursor = None
+        if hay_mas:
+            ultimo = historial[-1]
+            siguiente_cursor = VehiculoService._codificar_cursor(ultimo['fecha_generacion'], ultimo['id'])
         
         if historial:
             print(f"📊 Depuración Historial - Primer registro:")
-            print(f"   Factura ID: {historial[0].id}")
-            print(f"   Placa: {historial[0].placa}")
-            print(f"   Costo: ${historial[0].costo_total}")
-            print(f"   Método Pago: {historial[0].metodo_pago}")
-            print(f"   No Pagado: {historial[0].es_no_pagado}")
-            print(f"   Nocturno: {historial[0].es_nocturno}")
-        
-        return historial
+            print(f"   Factura ID: {historial[0]['id']}")
+            print(f"   Placa: {historial[0]['placa']}")
+            print(f"   Costo: ${historial[0]['costo_total']}")
+            print(f"   Método Pago: {historial[0]['metodo_pago']}")
+            print(f"   No Pagado: {historial[0]['es_no_pagado']}")
+            print(f"   Nocturno: {historial[0]['es_nocturno']}")
+        
+        return {
+            'data': historial,
+            'siguiente_cursor': siguiente_cursor
+        }
+    
+    @staticmethod
+    def _parsear_fecha(fecha: str) -> datetime:
+        try:
+            return datetime.strptime(fecha, '%Y-%m-%d')
+        except ValueError:
+            raise ValueError("Formato de fecha inválido. Use YYYY-MM-DD")
+    
+    @staticmethod
+    def _codificar_cursor(fecha_generacion: datetime, factura_id: int) -> str:
+        valor = f"{fecha_generacion.isoformat()}|{factura_id}"
+        return base64.urlsafe_b64encode(valor.encode()).decode()
+    
+    @staticmethod
+    def _decodificar_cursor(cursor: str):
+        try:
+            valor = base64.urlsafe_b64decode(cursor.encode()).decode()
+            fecha_iso, factura_id = valor.rsplit('|', 1)
+            return datetime.fromisoformat(fecha_iso), int(factura_id)
+        except Exception:
+            raise ValueError("Cursor de paginación inválido")
     
     @staticmethod
     def obtener_reporte_diario(db: Session, fecha: str = None):
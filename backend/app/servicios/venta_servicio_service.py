@@ -1,10 +1,13 @@
 # app/servicios/venta_servicio_service.py
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, and_
+from sqlalchemy import func, and_, cast, Float
 from datetime import datetime, date, timedelta
 from decimal import Decimal  # ← IMPORTANTE: Importar Decimal
 from app.modelos.venta_servicio import VentaServicio, ItemVentaServicio
 from app.servicios.producto_service import ProductoService
+from app.servicios.eventos_service import EventosService
+from app.servicios.archivo_service import ArchivoService
+from app.utils.serializacion import filas_a_dicts
 from typing import List, Optional
 
 # Precio fijo del baño por persona (usar Decimal)
@@ -117,6 +120,12 @@ class VentaServicioService:
 
         db.commit()
         db.refresh(venta)
+
+        EventosService.publicar("venta_registrada", {
+            "id": venta.id,
+            "total": float(venta.total),
+            "metodo_pago": venta.metodo_pago,
+        })
         return venta
 
     @staticmethod
@@ -140,6 +149,72 @@ class VentaServicioService:
 
         return query.order_by(VentaServicio.fecha.desc()).limit(limite).all()
 
+    @staticmethod
+    def obtener_ventas_listado(
+        db: Session,
+        fecha: Optional[str] = None,
+        limite: int = 50
+    ) -> List[dict]:
+        """
+        Igual que obtener_ventas pero leyendo solo las columnas de
+        VentaServicioResponse: una consulta para las ventas y otra para
+        sus items, sin instanciar modelos ni llamar to_dict().
+        """
+        inicio = fin = None
+        if fecha:
+            try:
+                fecha_obj = datetime.strptime(fecha, "%Y-%m-%d").date()
+                inicio = datetime.combine(fecha_obj, datetime.min.time())
+                fin = datetime.combine(fecha_obj + timedelta(days=1), datetime.min.time())
+            except ValueError:
+                pass
+
+        # Un día ya archivado se lee también del archivo
+        Venta = ArchivoService.ventas(db, inicio) if inicio else VentaServicio
+        Item = ArchivoService.items(db, inicio) if inicio else ItemVentaServicio
+
+        query = db.query(
+            Venta.id,
+            cast(Venta.total, Float),
+            Venta.fecha,
+            func.coalesce(Venta.metodo_pago, "efectivo"),
+        )
+        if inicio:
+            query = query.filter(and_(Venta.fecha >= inicio, Venta.fecha < fin))
+
+        filas = query.order_by(Venta.fecha.desc()).limit(limite).all()
+        ventas = filas_a_dicts(("id", "total", "fecha", "metodo_pago"), filas)
+        if not ventas:
+            return ventas
+
+        items_por_venta = {v["id"]: [] for v in ventas}
+        for v in ventas:
+            v["items"] = items_por_venta[v["id"]]
+
+        items = db.query(
+            Item.venta_id,
+            Item.id,
+            Item.producto_id,
+            Item.nombre_producto,
+            Item.cantidad,
+            cast(Item.precio_unitario, Float),
+            cast(Item.subtotal, Float),
+        ).filter(
+            Item.venta_id.in_(list(items_por_venta))
+        ).order_by(Item.id).all()
+
+        for venta_id, item_id, producto_id, nombre, cantidad, precio_unit, subtotal in items:
+            items_por_venta[venta_id].append({
+                "id": item_id,
+                "producto_id": producto_id,
+                "nombre": nombre,
+                "cantidad": cantidad,
+                "precio_unit": precio_unit,
+                "subtotal": subtotal,
+            })
+
+        return ventas
+
     @staticmethod
     def obtener_venta_por_id(db: Session, venta_id: int) -> Optional[VentaServicio]:
         return (
@@ -153,19 +228,31 @@ class VentaServicioService:
     def obtener_reporte_por_rango(db: Session, fecha_inicio: date, fecha_fin: date) -> dict:
         """Obtiene reporte completo para un rango de fechas con desglose por categorías, habitaciones y productos"""
         from app.modelos.producto import Producto
-        from decimal import Decimal
 
         inicio = datetime.combine(fecha_inicio, datetime.min.time())
         fin = datetime.combine(fecha_fin + timedelta(days=1), datetime.min.time())
 
-        filtro_fecha = and_(VentaServicio.fecha >= inicio, VentaServicio.fecha < fin)
+        # Fuentes: tablas principales o su unión con el archivo si el rango lo alcanza
+        Venta = ArchivoService.ventas(db, inicio)
+        Item = ArchivoService.items(db, inicio)
+        filtro_fecha = and_(Venta.fecha >= inicio, Venta.fecha < fin)
 
-        ventas = (
-            db.query(VentaServicio)
-            .options(joinedload(VentaServicio.items))
-            .filter(filtro_fecha)
+        ventas = db.query(Venta.id, Venta.total, Venta.metodo_pago).filter(filtro_fecha).all()
+
+        # Items del rango con la categoría del producto en la misma consulta
+        items_por_venta = {}
+        items = (
+            db.query(
+                Item.venta_id, Item.tipo_item, Item.nombre_producto, Item.cantidad,
+                Item.subtotal, Item.habitacion, Producto.categoria
+            )
+            .outerjoin(Producto, Producto.id == Item.producto_id)
+            .filter(Item.venta_id.in_(db.query(Venta.id).filter(filtro_fecha)))
+            .order_by(Item.id)
             .all()
         )
+        for item in items:
+            items_por_venta.setdefault(item.venta_id, []).append(item)
 
         # ✅ INICIALIZAR CON DECIMAL, NO CON FLOAT
         total_ventas = Decimal('0.00')
@@ -198,7 +285,7 @@ class VentaServicioService:
             elif venta.metodo_pago == "transferencia":
                 total_transferencia += total_venta_decimal
 
-            for item in venta.items:
+            for item in items_por_venta.get(venta.id, ()):
                 # Convertir subtotal a Decimal si es necesario
                 subtotal_decimal = Decimal(str(item.subtotal))
 
@@ -223,9 +310,8 @@ class VentaServicioService:
                     else:
                         ventas_por_producto[item.nombre_producto]["transferencia"] += subtotal_decimal
 
-                    producto = db.query(Producto).filter(Producto.id == item.producto_id).first()
-                    if producto:
-                        categoria = producto.categoria
+                    if item.categoria is not None:
+                        categoria = item.categoria.value
                         if categoria in ventas_por_categoria:
                             ventas_por_categoria[categoria] += subtotal_decimal
 
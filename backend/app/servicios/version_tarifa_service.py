@@ -0,0 +1,179 @@
+# app/servicios/version_tarifa_service.py
+"""
+Línea de tiempo de versiones de tarifa (versiones_tarifa).
+
+Las versiones se cargan una vez, ordenadas por vigente_desde, y se guardan
+en memoria hasta el próximo cambio de configuración (versión de tarifa de
+CacheCotizaciones). "Tarifa vigente en t" es un bisect sobre esa lista; la
+primera versión rige también para instantes anteriores a ella.
+
+Cada versión se compila una vez por clase de vehículo (automóvil = tarifa
+base; moto y camioneta = base + lo que defina tarifas_por_clase, con los
+rangos personalizados ya leídos del JSON): la línea de una clase es un
+acceso a diccionario.
+"""
+import json
+import threading
+from bisect import bisect_right
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+
+from sqlalchemy.orm import Session
+
+from app.modelos.vehiculo_estacionado import CLASES_VEHICULO, CLASE_POR_DEFECTO
+from app.modelos.version_tarifa import VersionTarifa
+from app.utils.cache_cotizaciones import CacheCotizaciones
+
+CAMPOS_TARIFA = (
+    'precio_0_5_min', 'precio_6_30_min', 'precio_31_60_min', 'precio_hora_adicional',
+    'precio_nocturno', 'hora_inicio_nocturno', 'hora_fin_nocturno', 'rangos_personalizados',
+    'tarifas_por_clase',
+)
+# Campos que una clase de vehículo puede redefinir en tarifas_por_clase
+CAMPOS_POR_CLASE = (
+    'precio_0_5_min', 'precio_6_30_min', 'precio_31_60_min', 'precio_hora_adicional',
+    'precio_nocturno', 'rangos_personalizados',
+)
+# vigente_desde de la versión que se crea con la configuración anterior al
+# primer cambio: rige para todo el historial previo
+INICIO_VIGENCIA = datetime(2000, 1, 1)
+
+
+def leer_tarifas_por_clase(valor) -> dict:
+    """tarifas_por_clase (JSON o dict) como dict; {} si está vacío o no se puede leer"""
+    if not valor:
+        return {}
+    if isinstance(valor, str):
+        try:
+            valor = json.loads(valor)
+        except ValueError:
+            return {}
+    return valor if isinstance(valor, dict) else {}
+
+
+def compilar_tarifa(origen, clase: str = CLASE_POR_DEFECTO):
+    """
+    Tarifa de una clase lista para CalculadoraPrecios a partir de la
+    configuración o de una versión: mismos atributos, con los precios
+    propios de la clase y rangos_personalizados como lista
+    """
+    tarifa = SimpleNamespace(
+        id=getattr(origen, 'id', None),
+        vigente_desde=getattr(origen, 'vigente_desde', None),
+        clase_vehiculo=clase,
+        **{campo: getattr(origen, campo, None) for campo in CAMPOS_TARIFA if campo != 'tarifas_por_clase'}
+    )
+    propia = leer_tarifas_por_clase(getattr(origen, 'tarifas_por_clase', None)).get(clase) or {}
+    for campo in CAMPOS_POR_CLASE:
+        if campo in propia and campo != 'rangos_personalizados':
+            setattr(tarifa, campo, Decimal(str(propia[campo])).quantize(Decimal('0.01')))
+    rangos = propia['rangos_personalizados'] if 'rangos_personalizados' in propia else tarifa.rangos_personalizados
+    if isinstance(rangos, str):
+        try:
+            rangos = json.loads(rangos)
+        except ValueError as e:
+            print(f"Error en rangos personalizados: {e}")
+            rangos = None
+    tarifa.rangos_personalizados = rangos or []
+    return tarifa
+
+
+class LineaTarifas:
+    """Versiones ordenadas por vigente_desde, con búsqueda por bisect"""
+
+    def __init__(self, versiones: list):
+        self.versiones = versiones
+        self.fechas = [v.vigente_desde for v in versiones]
+
+    def __len__(self):
+        return len(self.versiones)
+
+    def vigente_en(self, instante: datetime):
+        """Versión vigente en `instante`"""
+        return self.versiones[max(bisect_right(self.fechas, instante) - 1, 0)]
+
+    def tramos(self, desde: datetime, hasta: datetime) -> list:
+        """Partir [desde, hasta) en (inicio, fin, versión) según los cambios de tarifa"""
+        primero = max(bisect_right(self.fechas, desde) - 1, 0)
+        tramos = []
+        inicio = desde
+        for indice in range(primero + 1, len(self.versiones)):
+            cambio = self.fechas[indice]
+            if cambio >= hasta:
+                break
+            tramos.append((inicio, cambio, self.versiones[indice - 1]))
+            inicio = cambio
+            primero = indice
+        tramos.append((inicio, hasta, self.versiones[primero]))
+        return tramos
+
+
+class VersionTarifaService:
+    """Versiones de tarifa con vigencia"""
+
+    _lock = threading.Lock()
+    _lineas = None  # (versión de tarifa, {clase: LineaTarifas} o None)
+    _tarifas = None  # (versión de tarifa, {clase: tarifa actual compilada})
+
+    @classmethod
+    def linea(cls, db: Session, clase: str = CLASE_POR_DEFECTO):
+        """
+        Línea de tiempo vigente de la clase, o None si todavía no hay versiones
+        (base sin cambios de tarifa: se cobra con tarifa_clase(configuración))
+        """
+        version = CacheCotizaciones.version_tarifa()
+        with cls._lock:
+            if cls._lineas is not None and cls._lineas[0] == version:
+                lineas = cls._lineas[1]
+                return lineas[clase] if lineas is not None else None
+
+        versiones = db.query(VersionTarifa).order_by(VersionTarifa.vigente_desde).all()
+        lineas = {
+            clase_vehiculo: LineaTarifas([compilar_tarifa(v, clase_vehiculo) for v in versiones])
+            for clase_vehiculo in CLASES_VEHICULO
+        } if versiones else None
+        with cls._lock:
+            cls._lineas = (version, lineas)
+        return lineas[clase] if lineas is not None else None
+
+    @classmethod
+    def tarifa_clase(cls, config, clase: str = CLASE_POR_DEFECTO):
+        """Tarifa actual (configuracion_precios) de la clase, compilada una vez por versión"""
+        version = CacheCotizaciones.version_tarifa()
+        with cls._lock:
+            if cls._tarifas is not None and cls._tarifas[0] == version:
+                return cls._tarifas[1][clase]
+
+        tarifas = {clase_vehiculo: compilar_tarifa(config, clase_vehiculo) for clase_vehiculo in CLASES_VEHICULO}
+        with cls._lock:
+            cls._tarifas = (version, tarifas)
+        return tarifas[clase]
+
+    @staticmethod
+    def asegurar_inicial(db: Session, config):
+        """
+        Antes del primer cambio: guardar la configuración actual como versión
+        inicial, para que el historial previo se siga cobrando con ella
+        """
+        if db.query(VersionTarifa.id).first() is None:
+            db.add(VersionTarifaService._desde_config(config, INICIO_VIGENCIA))
+            db.flush()
+
+    @staticmethod
+    def registrar(db: Session, config, vigente_desde: datetime = None) -> VersionTarifa:
+        """Agregar la configuración (ya modificada) como versión vigente desde ahora"""
+        version = VersionTarifaService._desde_config(config, vigente_desde or datetime.now())
+        db.add(version)
+        return version
+
+    @staticmethod
+    def listar(db: Session) -> list:
+        return [v.to_dict() for v in db.query(VersionTarifa).order_by(VersionTarifa.vigente_desde.desc()).all()]
+
+    @staticmethod
+    def _desde_config(config, vigente_desde: datetime) -> VersionTarifa:
+        return VersionTarifa(
+            vigente_desde=vigente_desde,
+            **{campo: getattr(config, campo) for campo in CAMPOS_TARIFA}
+        )
@@ -0,0 +1,241 @@
+# app/utils/archivos_streaming.py
+"""
+Escritura de archivos por partes para StreamingResponse.
+
+- SumideroBytes: "archivo" en memoria que se vacía después de cada parte;
+  sirve de destino para escritores que esperan un archivo (zipfile,
+  pyarrow) sin acumular el archivo completo.
+- csv_por_partes / xlsx_por_partes: reciben hojas (nombre, encabezados,
+  iterador de filas) y devuelven un generador de bytes. Las filas se
+  consumen a medida que se envían; cada hoja se pide al generador de hojas
+  solo cuando la anterior terminó, así una hoja de resumen puede usar lo
+  acumulado al recorrer la de detalle.
+
+El XLSX se arma a mano (SpreadsheetML mínimo con textos en línea) sobre un
+zip en modo streaming: openpyxl arma el libro completo antes de guardarlo.
+"""
+import csv
+import io
+import re
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Iterable, Iterator, Sequence, Tuple
+from xml.sax.saxutils import escape
+
+# Bytes acumulados antes de enviar una parte al cliente
+TAMANO_PARTE = 64 * 1024
+
+Hoja = Tuple[str, Sequence[str], Iterable[Sequence]]
+
+# Caracteres de control que XML 1.0 no admite
+_INVALIDOS_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+class SumideroBytes:
+    """Archivo de solo escritura que entrega lo escrito con vaciar()"""
+
+    def __init__(self):
+        self._partes = []
+        self._posicion = 0
+        self._pendientes = 0
+        self.closed = False
+
+    def write(self, datos) -> int:
+        datos = bytes(datos)
+        self._partes.append(datos)
+        self._posicion += len(datos)
+        self._pendientes += len(datos)
+        return len(datos)
+
+    def tell(self) -> int:
+        return self._posicion
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self) -> bool:
+        return True
+
+    @property
+    def pendientes(self) -> int:
+        """Bytes escritos que todavía no se vaciaron"""
+        return self._pendientes
+
+    def vaciar(self) -> bytes:
+        datos = b"".join(self._partes)
+        self._partes = []
+        self._pendientes = 0
+        return datos
+
+
+# =========================
+# CSV
+# =========================
+
+def _texto_csv(valor):
+    if valor is None:
+        return ""
+    if isinstance(valor, bool):
+        return "Sí" if valor else "No"
+    if isinstance(valor, datetime):
+        return valor.strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(valor, date):
+        return valor.isoformat()
+    return valor
+
+
+def csv_por_partes(hojas: Iterable[Hoja]) -> Iterator[bytes]:
+    """
+    CSV UTF-8 con BOM (Excel lo abre con tildes correctas). Con varias
+    hojas se escriben una tras otra, separadas por una línea en blanco y
+    con el nombre de la hoja como título.
+    """
+    texto = io.StringIO()
+    escritor = csv.writer(texto)
+    texto.write("﻿")
+
+    for numero, (nombre, encabezados, filas) in enumerate(hojas):
+        if numero > 0:
+            escritor.writerow([])
+            escritor.writerow([nombre])
+        escritor.writerow(encabezados)
+        for fila in filas:
+            escritor.writerow([_texto_csv(v) for v in fila])
+            if texto.tell() >= TAMANO_PARTE:
+                yield texto.getvalue().encode("utf-8")
+                texto.seek(0)
+                texto.truncate()
+
+    yield texto.getvalue().encode("utf-8")
+
+
+# =========================
+# XLSX
+# =========================
+
+_TIPOS_CONTENIDO = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '{hojas}'
+    '</Types>'
+)
+_HOJA_TIPO = (
+    '<Override PartName="/xl/worksheets/sheet{n}.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+)
+_RELACIONES_PAQUETE = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_LIBRO = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets>{hojas}</sheets></workbook>'
+)
+_RELACIONES_LIBRO = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '{hojas}</Relationships>'
+)
+_RELACION_HOJA = (
+    '<Relationship Id="rId{n}" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet{n}.xml"/>'
+)
+_INICIO_HOJA = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_FIN_HOJA = '</sheetData></worksheet>'
+
+
+def _columna(indice: int) -> str:
+    """0 -> A, 25 -> Z, 26 -> AA"""
+    letras = ""
+    indice += 1
+    while indice:
+        indice, resto = divmod(indice - 1, 26)
+        letras = chr(65 + resto) + letras
+    return letras
+
+
+def _celda(referencia: str, valor) -> str:
+    if valor is None or valor == "":
+        return ""
+    if isinstance(valor, bool):
+        return f'<c r="{referencia}" t="b"><v>{int(valor)}</v></c>'
+    if isinstance(valor, (int, float, Decimal)):
+        return f'<c r="{referencia}"><v>{valor}</v></c>'
+    valor = _texto_csv(valor)
+    texto = escape(_INVALIDOS_XML.sub("", str(valor)))
+    return f'<c r="{referencia}" t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>'
+
+
+def _fila_xml(numero: int, valores) -> str:
+    celdas = "".join(_celda(f"{_columna(i)}{numero}", v) for i, v in enumerate(valores))
+    return f'<row r="{numero}">{celdas}</row>'
+
+
+def _nombre_hoja(nombre: str, usados: set) -> str:
+    """Excel: máximo 31 caracteres, sin []:*?/\\ y sin repetir"""
+    base = re.sub(r"[\[\]:*?/\\]", " ", nombre)[:31] or "Hoja"
+    candidato, n = base, 2
+    while candidato.lower() in usados:
+        sufijo = f" ({n})"
+        candidato, n = base[:31 - len(sufijo)] + sufijo, n + 1
+    usados.add(candidato.lower())
+    return candidato
+
+
+def xlsx_por_partes(hojas: Iterable[Hoja]) -> Iterator[bytes]:
+    """Libro XLSX escrito hoja por hoja en un zip que se envía por partes"""
+    sumidero = SumideroBytes()
+    nombres = []
+    usados = set()
+
+    with zipfile.ZipFile(sumidero, mode="w", compression=zipfile.ZIP_DEFLATED) as libro:
+        for numero, (nombre, encabezados, filas) in enumerate(hojas, 1):
+            nombres.append(_nombre_hoja(nombre, usados))
+            with libro.open(f"xl/worksheets/sheet{numero}.xml", mode="w") as hoja:
+                hoja.write(_INICIO_HOJA.encode("utf-8"))
+                hoja.write(_fila_xml(1, encabezados).encode("utf-8"))
+                for fila_numero, fila in enumerate(filas, 2):
+                    hoja.write(_fila_xml(fila_numero, fila).encode("utf-8"))
+                    if sumidero.pendientes >= TAMANO_PARTE:
+                        yield sumidero.vaciar()
+                hoja.write(_FIN_HOJA.encode("utf-8"))
+
+        # Las partes que listan las hojas van al final: recién ahora se conocen
+        n_hojas = range(1, len(nombres) + 1)
+        libro.writestr("[Content_Types].xml", _TIPOS_CONTENIDO.format(
+            hojas="".join(_HOJA_TIPO.format(n=n) for n in n_hojas)
+        ))
+        libro.writestr("_rels/.rels", _RELACIONES_PAQUETE)
+        libro.writestr("xl/workbook.xml", _LIBRO.format(hojas="".join(
+            f'<sheet name="{escape(nombre, {chr(34): "&quot;"})}" sheetId="{n}" r:id="rId{n}"/>'
+            for n, nombre in zip(n_hojas, nombres)
+        )))
+        libro.writestr("xl/_rels/workbook.xml.rels", _RELACIONES_LIBRO.format(
+            hojas="".join(_RELACION_HOJA.format(n=n) for n in n_hojas)
+        ))
+
+    yield sumidero.vaciar()
+
+
+FORMATOS_DESCARGA = {
+    "csv": ("text/csv; charset=utf-8", csv_por_partes),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", xlsx_por_partes),
+}
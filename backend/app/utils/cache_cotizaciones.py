@@ -0,0 +1,83 @@
+# app/utils/cache_cotizaciones.py
+"""
+Cache de cotizaciones para /api/vehiculos/buscar/{placa}.
+
+El operador consulta la misma placa una y otra vez mientras el cliente
+espera, y el precio solo cambia en los bordes de la tarifa (rangos, bloques
+de 30 min, ventana nocturna). Cada cotización se guarda con la clave
+(id del vehículo, versión de tarifa) junto con el instante del próximo
+cambio de precio (CalculadoraPrecios.proximo_cambio); hasta ese instante
+la consulta es una búsqueda en un dict, sin tocar la base de datos.
+
+Se invalida al salir el vehículo (descartar) y al cambiar la configuración
+de precios (invalidar_tarifa).
+"""
+import threading
+from datetime import datetime
+from typing import Optional
+
+
+class CacheCotizaciones:
+    """Cotizaciones vigentes de los vehículos activos"""
+
+    _lock = threading.Lock()
+    _version_tarifa = 0
+    _placas = {}      # placa -> id del vehículo activo
+    _entradas = {}    # (vehiculo_id, version_tarifa) -> cotización
+
+    @classmethod
+    def version_tarifa(cls) -> int:
+        return cls._version_tarifa
+
+    @classmethod
+    def obtener(cls, placa: str, ahora: datetime) -> Optional[dict]:
+        """Cotización vigente para la placa, o None si hay que recalcular"""
+        with cls._lock:
+            vehiculo_id = cls._placas.get(placa)
+            if vehiculo_id is None:
+                return None
+            cotizacion = cls._entradas.get((vehiculo_id, cls._version_tarifa))
+        if cotizacion is None:
+            return None
+        valido_hasta = cotizacion['valido_hasta']
+        if valido_hasta is not None and ahora >= valido_hasta:
+            return None
+        return cotizacion
+
+    @classmethod
+    def guardar(cls, placa: str, vehiculo_id: int, version_tarifa: int, cotizacion: dict):
+        """
+        Guardar una cotización calculada con `version_tarifa` (leída ANTES de
+        consultar la configuración: si la tarifa cambió en medio, la
+        cotización queda con una versión vieja y no se vuelve a usar)
+        """
+        with cls._lock:
+            if version_tarifa != cls._version_tarifa:
+                return
+            anterior = cls._placas.get(placa)
+            if anterior is not None and anterior != vehiculo_id:
+                cls._entradas.pop((anterior, version_tarifa), None)
+            cls._placas[placa] = vehiculo_id
+            cls._entradas[(vehiculo_id, version_tarifa)] = cotizacion
+
+    @classmethod
+    def descartar(cls, placa: str):
+        """El vehículo salió: su cotización ya no aplica"""
+        with cls._lock:
+            vehiculo_id = cls._placas.pop(placa, None)
+            if vehiculo_id is not None:
+                cls._entradas.pop((vehiculo_id, cls._version_tarifa), None)
+
+    @classmethod
+    def invalidar_tarifa(cls):
+        """La configuración de precios cambió: todas las cotizaciones vencen"""
+        with cls._lock:
+            cls._version_tarifa += 1
+            cls._placas.clear()
+            cls._entradas.clear()
+
+    @classmethod
+    def limpiar(cls):
+        with cls._lock:
+            cls._placas.clear()
+            cls._entradas.clear()
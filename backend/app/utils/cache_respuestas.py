@@ -0,0 +1,104 @@
+# app/utils/cache_respuestas.py
+"""
+Cache de respuestas para los endpoints de consulta frecuente (polling).
+
+Cada respuesta se guarda ya serializada (bytes JSON) junto con un ETag
+fuerte y la versión global de datos con la que se generó. Cualquier
+commit en la base de datos incrementa la versión, por lo que mientras no
+haya escrituras las consultas se responden sin tocar la base de datos ni
+volver a serializar, y con 304 si el cliente envía If-None-Match.
+"""
+import hashlib
+import threading
+from typing import Any
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from sqlalchemy import event
+
+from app.config import SessionLocal
+
+
+class CacheRespuestas:
+    """Cache en memoria de respuestas JSON validadas por versión de datos"""
+
+    _version = 0
+    _lock = threading.Lock()
+    _entradas = {}       # clave -> (version, etag, cuerpo)
+    _adaptadores = {}    # response_model -> TypeAdapter
+
+    # =========================
+    # Versión global de datos
+    # =========================
+
+    @classmethod
+    def version_actual(cls) -> int:
+        return cls._version
+
+    @classmethod
+    def incrementar_version(cls) -> int:
+        """Invalida todas las respuestas cacheadas"""
+        with cls._lock:
+            cls._version += 1
+            return cls._version
+
+    # =========================
+    # Respuestas
+    # =========================
+
+    @classmethod
+    def responder(cls, request: Request, clave: str, generar, modelo=None) -> Response:
+        """
+        Responder desde el cache o generar la respuesta si los datos cambiaron.
+
+        Args:
+            request: Petición actual (se lee If-None-Match)
+            clave: Identificador de la respuesta (endpoint + parámetros)
+            generar: Función sin argumentos que construye los datos
+            modelo: response_model opcional para validar igual que FastAPI
+        """
+        entrada = cls._entradas.get(clave)
+
+        if entrada is None or entrada[0] != cls._version:
+            # Leer la versión ANTES de generar: si hay una escritura en medio,
+            # la entrada queda vieja y se regenera en la siguiente consulta
+            version = cls._version
+            cuerpo = cls._serializar(generar(), modelo)
+            etag = '"' + hashlib.sha1(cuerpo).hexdigest() + '"'
+            entrada = (version, etag, cuerpo)
+            cls._entradas[clave] = entrada
+
+        _, etag, cuerpo = entrada
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+        if cls._etag_coincide(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+
+        return Response(content=cuerpo, media_type="application/json", headers=headers)
+
+    @classmethod
+    def limpiar(cls):
+        cls._entradas.clear()
+
+    @classmethod
+    def _serializar(cls, datos, modelo) -> bytes:
+        if modelo is None:
+            modelo = Any
+        adaptador = cls._adaptadores.get(modelo)
+        if adaptador is None:
+            adaptador = TypeAdapter(modelo)
+            cls._adaptadores[modelo] = adaptador
+        return adaptador.dump_json(adaptador.validate_python(datos))
+
+    @staticmethod
+    def _etag_coincide(if_none_match, etag: str) -> bool:
+        if not if_none_match:
+            return False
+        candidatos = [e.strip() for e in if_none_match.split(",")]
+        return "*" in candidatos or etag in candidatos
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _invalidar_por_commit(session):
+    """Cualquier commit puede cambiar los datos servidos: nueva versión"""
+    CacheRespuestas.incrementar_version()
@@ -1,4 +1,5 @@
-from datetime import datetime
+from bisect import bisect_right
+from datetime import datetime, time, timedelta
 import math
 
 
@@ -6,22 +7,38 @@ class CalculadoraPrecios:
     """Utilidad para calcular precios del parqueadero con rangos específicos"""
 
     @staticmethod
-    def calcular_costo(fecha_entrada, fecha_salida, config, es_nocturno=False):
+    def calcular_costo(fecha_entrada, fecha_salida, config, es_nocturno=False, versiones=None):
         """
         Calcular el costo total del estacionamiento usando rangos específicos
 
         LÓGICA:
-        1. Si es nocturno → tarifa fija
-        2. Si no → rangos definidos hasta 60 min, luego bloques de 30 min
-        """
+        1. Si es nocturno (marcado en la entrada) → tarifa fija
+        2. Si un rango personalizado cubre la duración → su precio
+        3. Si no → la estadía se parte en tramos diurnos y nocturnos según
+           hora_inicio_nocturno / hora_fin_nocturno. Los rangos fijos (hasta
+           60 min, luego bloques de 30 min) se aplican a la duración
+           acumulada: cada tramo paga lo que agrega al total, y lo que agrega
+           una noche nunca pasa de precio_nocturno.
+
+        Con `versiones` (LineaTarifas), la tarifa fija nocturna y los rangos
+        personalizados son los de la versión vigente a la entrada, y si la
+        estadía cruza un cambio de tarifa cada tramo se cobra con la versión
+        vigente en él; una noche partida por un cambio de tarifa sigue
+        teniendo un solo tope (el de la versión de cada tramo, descontando
+        lo ya cobrado esa noche).
 
-        print("\n" + "=" * 60)
-        print("DEBUG CalculadoraPrecios.calcular_costo")
-        print(f"es_nocturno: {es_nocturno}")
+        Returns:
+            dict con costo, minutos, detalles (texto), tipo y desglose
+            (un elemento por tramo con inicio, fin, minutos y costo)
+        """
+        entrada, salida = CalculadoraPrecios._normalizar_fechas(fecha_entrada, fecha_salida)
+        if versiones is not None and entrada is not None and entrada.tzinfo is None:
+            config = versiones.vigente_en(entrada)
+        else:
+            versiones = None
 
         # TARIFA NOCTURNA
         if es_nocturno:
-            print("APLICANDO TARIFA NOCTURNA FIJA")
             minutos = CalculadoraPrecios._calcular_minutos(fecha_entrada, fecha_salida)
             costo = round(float(config.precio_nocturno), 2)
 
@@ -30,17 +47,11 @@ class CalculadoraPrecios:
                 "minutos": minutos,
                 "detalles": f"TARIFA NOCTURNA FIJA: ${config.precio_nocturno}",
                 "tipo": "nocturno",
+                "desglose": [],
             }
 
         # TARIFA NORMAL
         minutos_totales = CalculadoraPrecios._calcular_minutos(fecha_entrada, fecha_salida)
-        print(f"Minutos totales: {minutos_totales}")
-
-        if minutos_totales <= 0:
-            minutos_totales = 1
-
-        costo_total = 0.0
-        detalles = []
 
         # 🔹 RANGOS PERSONALIZADOS
         if hasattr(config, "rangos_personalizados") and config.rangos_personalizados:
@@ -52,69 +63,260 @@ class CalculadoraPrecios:
 
                 for rango in rangos:
                     if rango["min_minutos"] <= minutos_totales <= rango["max_minutos"]:
-                        costo_total = float(rango["precio"])
+                        if not float(rango["precio"]):
+                            break
                         desc = rango.get(
                             "descripcion",
                             f'{rango["min_minutos"]}-{rango["max_minutos"]} min',
                         )
-                        detalles.append(f"Rango personalizado: {desc}")
-                        print(f"Rango personalizado aplicado: {desc}")
-                        break
+                        return {
+                            "costo": round(float(rango["precio"]), 2),
+                            "minutos": minutos_totales,
+                            "detalles": f"Rango personalizado: {desc}",
+                            "tipo": "normal",
+                            "desglose": [],
+                        }
             except Exception as e:
                 print(f"Error en rangos personalizados: {e}")
 
-        # 🔹 RANGOS FIJOS
-        if costo_total == 0:
-            # Rango 0-5 minutos
-            if minutos_totales <= 5:
-                costo_total = float(config.precio_0_5_min)
-                detalles.append(f"0-5 minutos: ${config.precio_0_5_min}")
-                print(f"Aplicado: 0-5 min = ${costo_total}")
-
-            # Rango 6-30 minutos
-            elif minutos_totales <= 30:
-                costo_total = float(config.precio_6_30_min)
-                detalles.append(f"6-30 minutos: ${config.precio_6_30_min}")
-                print(f"Aplicado: 6-30 min = ${costo_total}")
-
-            # Rango 31-60 minutos (primera hora completa)
-            elif minutos_totales <= 60:
-                costo_total = float(config.precio_31_60_min)
-                detalles.append(f"31-60 minutos: ${config.precio_31_60_min}")
-                print(f"Aplicado: 31-60 min = ${costo_total}")
-
-            # ✅ MÁS DE 60 MINUTOS: Bloques de 30 minutos
+        # 🔹 RANGOS FIJOS POR TRAMOS (VERSIÓN DE TARIFA, DIURNO / NOCTURNO)
+        if entrada is None:
+            return CalculadoraPrecios._resultado_diurno(minutos_totales, config)
+
+        por_version = versiones.tramos(entrada, salida) if versiones is not None else [(entrada, salida, config)]
+        tramos = []
+        for desde, hasta, tarifa in por_version:
+            for tipo, inicio, fin in CalculadoraPrecios.partir_estadia(
+                desde, hasta,
+                CalculadoraPrecios._hora(tarifa.hora_inicio_nocturno),
+                CalculadoraPrecios._hora(tarifa.hora_fin_nocturno)
+            ):
+                tramos.append((tipo, inicio, fin, tarifa))
+        if len(por_version) == 1 and all(tramo[0] == "diurno" for tramo in tramos):
+            return CalculadoraPrecios._resultado_diurno(minutos_totales, config)
+
+        desglose = []
+        detalles = []
+        costo_total = 0.0
+        minutos_previos = 0
+        cobrado_noche = 0.0  # tramos nocturnos seguidos = la misma noche
+        for indice, (tipo, desde, hasta, tarifa) in enumerate(tramos):
+            if indice == len(tramos) - 1:
+                minutos_acumulados = minutos_totales
             else:
-                # Primera hora (siempre cobra el precio_31_60_min)
-                costo_total = float(config.precio_31_60_min)
-                minutos_restantes = minutos_totales - 60
+                minutos_acumulados = math.ceil((hasta - entrada).total_seconds() / 60)
+            # Lo que el tramo agrega a la duración acumulada, con su tarifa
+            costo = (CalculadoraPrecios._tarifa_rangos(minutos_acumulados, tarifa)
+                     - CalculadoraPrecios._tarifa_rangos(minutos_previos, tarifa))
+            con_tope = False
+            if tipo == "nocturno":
+                if indice == 0 or tramos[indice - 1][0] != "nocturno":
+                    cobrado_noche = 0.0
+                tope_nocturno = max(float(tarifa.precio_nocturno) - cobrado_noche, 0.0)
+                con_tope = costo > tope_nocturno
+                if con_tope:
+                    costo = tope_nocturno
+                cobrado_noche += costo
+
+            desglose.append({
+                "tipo": tipo,
+                "inicio": desde.isoformat(),
+                "fin": hasta.isoformat(),
+                "minutos": minutos_acumulados - minutos_previos,
+                "costo": round(costo, 2),
+                "tope_nocturno": con_tope,
+                "version_tarifa": getattr(tarifa, "id", None) if versiones is not None else None,
+            })
+            detalles.append(
+                (f"Tarifa desde {tarifa.vigente_desde.strftime('%d/%m/%Y %H:%M')}: " if len(por_version) > 1 else "")
+                + f"{'Diurno' if tipo == 'diurno' else 'Nocturno'} "
+                f"{desde.strftime('%d/%m %H:%M')}-{hasta.strftime('%d/%m %H:%M')} "
+                f"({minutos_acumulados - minutos_previos} min): ${costo:.2f}"
+                + (" (tope nocturno)" if con_tope else "")
+            )
+            costo_total += costo
+            minutos_previos = minutos_acumulados
+
+        return {
+            "costo": round(costo_total, 2),
+            "minutos": minutos_totales,
+            "detalles": " | ".join(detalles),
+            "tipo": "mixto",
+            "desglose": desglose,
+        }
 
-                # Calcular bloques de 30 minutos (redondear hacia arriba)
-                bloques_30min = math.ceil(minutos_restantes / 30.0)
-                
-                # Cada bloque de 30 min cuesta la mitad del precio_hora_adicional
-                precio_por_bloque = float(config.precio_hora_adicional) / 2.0
-                costo_adicional = bloques_30min * precio_por_bloque
-                
-                costo_total += costo_adicional
+    @staticmethod
+    def partir_estadia(entrada, salida, inicio_nocturno, fin_nocturno):
+        """
+        Partir [entrada, salida) en tramos consecutivos ('diurno' | 'nocturno',
+        desde, hasta) según la ventana nocturna diaria.
 
-                # Detalles claros
-                detalles.append(f"Primera hora: ${config.precio_31_60_min}")
-                detalles.append(f"{minutos_restantes} min adicionales ({bloques_30min} bloques de 30min × ${precio_por_bloque:.2f}): ${costo_adicional:.2f}")
+        Se recorre una ventana por día calendario de la estadía (más la de la
+        víspera, que puede seguir abierta a la entrada): O(días). Si la
+        ventana cruza la medianoche (19:00 → 07:00) termina al día siguiente;
+        con inicio == fin no hay horario nocturno.
+        """
+        if salida <= entrada:
+            return [("diurno", entrada, entrada)]
+        if inicio_nocturno == fin_nocturno:
+            return [("diurno", entrada, salida)]
 
-                print(f"Primera hora: ${config.precio_31_60_min}")
-                print(f"{minutos_restantes} min restantes = {bloques_30min} bloques × ${precio_por_bloque:.2f} = ${costo_adicional:.2f}")
+        cruza_medianoche = fin_nocturno < inicio_nocturno
+        zona = entrada.tzinfo
+        tramos = []
+        cursor = entrada
+        dia = entrada.date() - timedelta(days=1)
+        while dia <= salida.date():
+            desde = datetime.combine(dia, inicio_nocturno, tzinfo=zona)
+            hasta = datetime.combine(dia + timedelta(days=1) if cruza_medianoche else dia, fin_nocturno, tzinfo=zona)
+            desde = max(desde, entrada)
+            hasta = min(hasta, salida)
+            if desde < hasta:
+                if cursor < desde:
+                    tramos.append(("diurno", cursor, desde))
+                tramos.append(("nocturno", desde, hasta))
+                cursor = hasta
+            dia += timedelta(days=1)
+        if cursor < salida:
+            tramos.append(("diurno", cursor, salida))
+        return tramos
 
-        print(f"Costo total: ${costo_total:.2f}")
-        print("=" * 60 + "\n")
+    @staticmethod
+    def proximo_cambio(fecha_entrada, ahora, config, es_nocturno=False, versiones=None):
+        """
+        Primer instante después de `ahora` en el que el precio de la estadía
+        puede cambiar (None si no cambia más, como la tarifa nocturna fija).
+
+        Los candidatos son los bordes de los rangos fijos (5, 30, 60 y cada
+        bloque de 30 min), los de los rangos personalizados y los bordes de
+        la ventana nocturna (de la versión de tarifa de la entrada y de la
+        vigente ahora) y el próximo cambio de versión. Entre dos candidatos
+        el precio es constante; devolver alguno de más solo adelanta el
+        recálculo.
+        """
+        if es_nocturno:
+            return None
+        entrada, ahora = CalculadoraPrecios._normalizar_fechas(fecha_entrada, ahora)
+        if entrada is None:
+            return None
+        tarifas = [config]
+        candidatos = []
+        if versiones is not None and entrada.tzinfo is None:
+            tarifas = [versiones.vigente_en(entrada), versiones.vigente_en(ahora)]
+            siguiente = bisect_right(versiones.fechas, ahora)
+            if siguiente < len(versiones.fechas):
+                candidatos.append(versiones.fechas[siguiente])
 
+        minutos = CalculadoraPrecios._calcular_minutos(entrada, ahora)
+        if minutos <= 5:
+            borde = 5
+        elif minutos <= 30:
+            borde = 30
+        elif minutos <= 60:
+            borde = 60
+        else:
+            borde = 60 + 30 * math.ceil((minutos - 60) / 30.0)
+
+        rangos = getattr(tarifas[0], "rangos_personalizados", None)
+        if rangos:
+            try:
+                if isinstance(rangos, str):
+                    import json
+                    rangos = json.loads(rangos)
+                for rango in rangos:
+                    for limite in (int(rango["min_minutos"]) - 1, int(rango["max_minutos"])):
+                        if minutos <= limite < borde:
+                            borde = limite
+            except Exception as e:
+                print(f"Error en rangos personalizados: {e}")
+        candidatos.append(entrada + timedelta(minutes=borde))
+
+        for tarifa in tarifas:
+            inicio = CalculadoraPrecios._hora(tarifa.hora_inicio_nocturno)
+            fin = CalculadoraPrecios._hora(tarifa.hora_fin_nocturno)
+            if inicio == fin:
+                continue
+            for hora in (inicio, fin):
+                siguiente = datetime.combine(ahora.date(), hora, tzinfo=ahora.tzinfo)
+                if siguiente <= ahora:
+                    siguiente += timedelta(days=1)
+                candidatos.append(siguiente)
+        return min(candidatos)
+
+    @staticmethod
+    def _tarifa_rangos(minutos, config):
+        """Costo de los rangos fijos para una duración acumulada (0 minutos → 0)"""
+        if minutos <= 0:
+            return 0.0
+        if minutos <= 5:
+            return float(config.precio_0_5_min)
+        if minutos <= 30:
+            return float(config.precio_6_30_min)
+        if minutos <= 60:
+            return float(config.precio_31_60_min)
+        bloques_30min = math.ceil((minutos - 60) / 30.0)
+        return float(config.precio_31_60_min) + bloques_30min * float(config.precio_hora_adicional) / 2.0
+
+    @staticmethod
+    def _resultado_diurno(minutos_totales, config):
+        """Estadía sin tramo nocturno: rangos fijos sobre la duración total"""
+        # Rango 0-5 minutos
+        if minutos_totales <= 5:
+            detalles = [f"0-5 minutos: ${config.precio_0_5_min}"]
+
+        # Rango 6-30 minutos
+        elif minutos_totales <= 30:
+            detalles = [f"6-30 minutos: ${config.precio_6_30_min}"]
+
+        # Rango 31-60 minutos (primera hora completa)
+        elif minutos_totales <= 60:
+            detalles = [f"31-60 minutos: ${config.precio_31_60_min}"]
+
+        # ✅ MÁS DE 60 MINUTOS: Bloques de 30 minutos
+        else:
+            minutos_restantes = minutos_totales - 60
+            bloques_30min = math.ceil(minutos_restantes / 30.0)
+            # Cada bloque de 30 min cuesta la mitad del precio_hora_adicional
+            precio_por_bloque = float(config.precio_hora_adicional) / 2.0
+            costo_adicional = bloques_30min * precio_por_bloque
+            detalles = [
+                f"Primera hora: ${config.precio_31_60_min}",
+                f"{minutos_restantes} min adicionales ({bloques_30min} bloques de 30min × ${precio_por_bloque:.2f}): ${costo_adicional:.2f}",
+            ]
+
+        costo_total = CalculadoraPrecios._tarifa_rangos(minutos_totales, config)
         return {
             "costo": round(costo_total, 2),
             "minutos": minutos_totales,
             "detalles": " | ".join(detalles),
             "tipo": "normal",
+            "desglose": [],
         }
 
+    @staticmethod
+    def _hora(valor):
+        """hora_inicio/fin_nocturno como time (la configuración puede traer 'HH:MM[:SS]')"""
+        if isinstance(valor, time):
+            return valor
+        return time.fromisoformat(str(valor))
+
+    @staticmethod
+    def _normalizar_fechas(fecha_entrada, fecha_salida):
+        """Las mismas conversiones que _calcular_minutos; (None, None) si no se pueden leer"""
+        try:
+            if isinstance(fecha_entrada, str):
+                fecha_entrada = datetime.fromisoformat(fecha_entrada.replace("Z", "+00:00"))
+            if isinstance(fecha_salida, str):
+                fecha_salida = datetime.fromisoformat(fecha_salida.replace("Z", "+00:00"))
+            if fecha_entrada.tzinfo and not fecha_salida.tzinfo:
+                fecha_salida = fecha_salida.replace(tzinfo=fecha_entrada.tzinfo)
+            elif fecha_salida.tzinfo and not fecha_entrada.tzinfo:
+                fecha_entrada = fecha_entrada.replace(tzinfo=fecha_salida.tzinfo)
+            return fecha_entrada, fecha_salida
+        except Exception as e:
+            print(f"❌ Error leyendo fechas de la estadía: {e}")
+            return None, None
+
     @staticmethod
     def _calcular_minutos(fecha_entrada, fecha_salida):
         """Calcular minutos entre dos fechas (maneja zonas horarias correctamente)"""
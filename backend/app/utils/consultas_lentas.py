@@ -0,0 +1,138 @@
+# app/utils/consultas_lentas.py
+"""
+Registro opcional de consultas lentas (se activa con SLOW_QUERY_MS).
+
+Cada sentencia que supera el umbral se escribe como una línea JSON en
+logs/consultas_lentas.jsonl (rotativo) con:
+- la sentencia SQL y sus parámetros
+- el origen: la primera función de app/servicios o app/routers en la pila
+- el plan de SQLite (EXPLAIN QUERY PLAN), donde un 'SCAN tabla' delata
+  una consulta que no usa índice
+
+Se instala sobre el engine desde config.py; sin la variable de entorno no
+se registra ningún evento y el costo es nulo.
+"""
+import json
+import logging
+import os
+import time
+import traceback
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+from sqlalchemy import event
+
+NOMBRE_ARCHIVO = "consultas_lentas.jsonl"
+MAX_BYTES_ARCHIVO = 5 * 1024 * 1024
+ARCHIVOS_RESPALDO = 3
+# Parámetros de executemany que se guardan (el resto solo se cuenta)
+MAX_FILAS_PARAMETROS = 5
+MAX_LARGO_TEXTO = 200
+
+# Carpetas cuyo código se considera "origen" de la consulta
+_CARPETAS_ORIGEN = (
+    os.sep + os.path.join("app", "servicios") + os.sep,
+    os.sep + os.path.join("app", "routers") + os.sep,
+)
+
+_DIR_BACKEND = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_logger = logging.getLogger("parqueadero.consultas_lentas")
+
+
+def activar_registro(engine, umbral_ms: float, carpeta_logs: str):
+    """Registrar las sentencias de engine que tarden más de umbral_ms"""
+    os.makedirs(carpeta_logs, exist_ok=True)
+    ruta = os.path.join(carpeta_logs, NOMBRE_ARCHIVO)
+
+    if not _logger.handlers:
+        manejador = RotatingFileHandler(
+            ruta, maxBytes=MAX_BYTES_ARCHIVO, backupCount=ARCHIVOS_RESPALDO, encoding="utf-8"
+        )
+        manejador.setFormatter(logging.Formatter("%(message)s"))
+        _logger.addHandler(manejador)
+        _logger.setLevel(logging.INFO)
+        _logger.propagate = False
+
+    umbral = umbral_ms / 1000
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("lentas_inicio", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _despues(conn, cursor, statement, parameters, context, executemany):
+        inicios = conn.info.get("lentas_inicio")
+        if not inicios:
+            return
+        duracion = time.perf_counter() - inicios.pop()
+        if duracion >= umbral:
+            _registrar(cursor, statement, parameters, executemany, duracion)
+
+    print(f"[DB] Registro de consultas lentas activo (>{umbral_ms:g} ms) en: {ruta}")
+
+
+def _registrar(cursor, statement, parameters, executemany, duracion):
+    try:
+        origen = _origen()
+        entrada = {
+            "fecha": datetime.now().isoformat(timespec="milliseconds"),
+            "duracion_ms": round(duracion * 1000, 2),
+            "origen": origen,
+            "sql": " ".join(statement.split()),
+            "parametros": _parametros(parameters, executemany),
+            "plan": None if executemany else _plan(cursor, statement, parameters),
+        }
+        _logger.info(json.dumps(entrada, ensure_ascii=False, default=str))
+        print(f"🐢 Consulta lenta ({entrada['duracion_ms']} ms) desde {origen}")
+    except Exception as e:
+        # El registro nunca debe romper la consulta que se está midiendo
+        print(f"⚠️ No se pudo registrar la consulta lenta: {e}")
+
+
+def _origen() -> str:
+    """Primera función de servicios/routers en la pila (la más cercana a la consulta)"""
+    pila = traceback.extract_stack()
+    for marco in reversed(pila):
+        if any(carpeta in marco.filename for carpeta in _CARPETAS_ORIGEN):
+            archivo = os.path.relpath(marco.filename, _DIR_BACKEND)
+            return f"{archivo}:{marco.lineno} {marco.name}"
+    return "desconocido"
+
+
+def _valor(valor):
+    if isinstance(valor, (bytes, bytearray, memoryview)):
+        return f"<{len(valor)} bytes>"
+    if isinstance(valor, str) and len(valor) > MAX_LARGO_TEXTO:
+        return valor[:MAX_LARGO_TEXTO] + "…"
+    if valor is None or isinstance(valor, (int, float, bool, str)):
+        return valor
+    return str(valor)
+
+
+def _parametros(parameters, executemany):
+    if executemany:
+        filas = list(parameters or [])
+        return {
+            "filas": len(filas),
+            "primeras": [_parametros(f, False) for f in filas[:MAX_FILAS_PARAMETROS]],
+        }
+    if isinstance(parameters, dict):
+        return {k: _valor(v) for k, v in parameters.items()}
+    return [_valor(v) for v in (parameters or ())]
+
+
+def _plan(cursor, statement, parameters) -> list:
+    """EXPLAIN QUERY PLAN en la misma conexión (no ejecuta la sentencia)"""
+    if not statement.lstrip().upper().startswith(("SELECT", "WITH", "UPDATE", "DELETE", "INSERT")):
+        return None
+    try:
+        explicar = cursor.connection.cursor()
+        try:
+            explicar.execute("EXPLAIN QUERY PLAN " + statement, parameters or ())
+            # Filas: (id, padre, no usado, detalle)
+            return [fila[3] for fila in explicar.fetchall()]
+        finally:
+            explicar.close()
+    except Exception as e:
+        return [f"no disponible: {e}"]
@@ -0,0 +1,64 @@
+# app/utils/contador_ocupacion.py
+"""
+Contador en memoria de los espacios ocupados.
+
+La tarifa dinámica necesita la ocupación en cada cotización y en cada
+salida; en lugar de un COUNT(*) por consulta, el número se lee una sola vez
+de vehiculos_activos y después lo mantienen al día registrar_entrada,
+registrar_salida y registrar_lote (después de su commit).
+"""
+import threading
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.modelos.vehiculo_activo import VehiculoActivo, CAPACIDAD_ESPACIOS
+
+
+class ContadorOcupacion:
+    """Vehículos estacionados ahora"""
+
+    _lock = threading.Lock()
+    _ocupados = None  # None = todavía no se leyó de la base
+
+    @classmethod
+    def ocupados(cls, db: Session) -> int:
+        with cls._lock:
+            if cls._ocupados is not None:
+                return cls._ocupados
+        total = db.execute(select(func.count()).select_from(VehiculoActivo)).scalar()
+        with cls._lock:
+            if cls._ocupados is None:
+                cls._ocupados = total
+            return cls._ocupados
+
+    @classmethod
+    def ocupacion(cls, db: Session) -> float:
+        """Fracción de espacios ocupados (0 a 1)"""
+        return cls.ocupados(db) / CAPACIDAD_ESPACIOS
+
+    @classmethod
+    def entrada(cls):
+        cls._sumar(1)
+
+    @classmethod
+    def salida(cls):
+        cls._sumar(-1)
+
+    @classmethod
+    def fijar(cls, ocupados: int):
+        """Ocupación exacta conocida (p. ej. al terminar un lote)"""
+        with cls._lock:
+            cls._ocupados = ocupados
+
+    @classmethod
+    def limpiar(cls):
+        """Olvidar el contador: la próxima lectura vuelve a contar en la base"""
+        with cls._lock:
+            cls._ocupados = None
+
+    @classmethod
+    def _sumar(cls, delta: int):
+        with cls._lock:
+            if cls._ocupados is not None:
+                cls._ocupados = min(max(cls._ocupados + delta, 0), CAPACIDAD_ESPACIOS)
@@ -0,0 +1,165 @@
+# app/utils/esquema_db.py
+"""
+Ajustes de esquema que create_all() no aplica sobre tablas existentes.
+
+Base.metadata.create_all() solo crea las tablas que faltan; las columnas
+y los índices declarados después en los modelos no llegan a las bases de datos que ya
+están en producción, y las vistas y el traslado de datos entre tablas
+tampoco son cosa suya. Estas funciones se ejecutan al arrancar y desde
+migrate_db.py, y son idempotentes.
+"""
+from sqlalchemy import inspect, select, delete, text, bindparam
+from sqlalchemy.exc import IntegrityError
+
+from app.config import Base
+from app.modelos.vehiculo_activo import VehiculoActivo, VISTA_VEHICULOS_TODOS, sql_vista_vehiculos_todos
+from app.modelos.vehiculo_estacionado import VehiculoEstacionado
+
+# Índices únicos parciales (estado = 'activo') de vehiculos_estacionados,
+# anteriores a vehiculos_activos; migrar_vehiculos_activos los elimina
+INDICES_ACTIVOS_OBSOLETOS = ('ux_vehiculos_activos_espacio', 'ux_vehiculos_activos_placa')
+
+
+def agregar_columnas_faltantes(engine, metadata=None) -> list:
+    """
+    Agregar (ALTER TABLE ADD COLUMN) las columnas declaradas en los modelos
+    que aún no existen. Las NOT NULL necesitan server_default para rellenar
+    las filas existentes; sin él se avisa y se omiten.
+    """
+    metadata = metadata if metadata is not None else Base.metadata
+    inspector = inspect(engine)
+    tablas_existentes = set(inspector.get_table_names(schema=metadata.schema))
+    agregadas = []
+
+    with engine.begin() as conn:
+        for tabla in metadata.sorted_tables:
+            if tabla.name not in tablas_existentes:
+                continue
+            existentes = {c["name"] for c in inspector.get_columns(tabla.name, schema=metadata.schema)}
+            for columna in tabla.columns:
+                if columna.name in existentes:
+                    continue
+                tipo = columna.type.compile(dialect=engine.dialect)
+                definicion = f"{columna.name} {tipo}"
+                if columna.server_default is not None:
+                    definicion += f" DEFAULT '{columna.server_default.arg}'"
+                if not columna.nullable:
+                    if columna.server_default is None:
+                        print(f"[DB] WARNING: {tabla.fullname}.{columna.name} es NOT NULL sin server_default; no se agrega")
+                        continue
+                    definicion += " NOT NULL"
+                conn.execute(text(f"ALTER TABLE {tabla.fullname} ADD COLUMN {definicion}"))
+                agregadas.append(f"{tabla.fullname}.{columna.name}")
+
+    if agregadas:
+        print(f"[DB] Columnas agregadas: {', '.join(agregadas)}")
+    return agregadas
+
+
+def crear_indices_faltantes(engine) -> list:
+    """Crear los índices declarados en los modelos que aún no existen"""
+    inspector = inspect(engine)
+    tablas_existentes = set(inspector.get_table_names())
+    creados = []
+
+    for tabla in Base.metadata.sorted_tables:
+        if tabla.name not in tablas_existentes:
+            continue
+        existentes = {i["name"] for i in inspector.get_indexes(tabla.name)}
+        for indice in tabla.indexes:
+            if indice.name not in existentes:
+                try:
+                    indice.create(bind=engine, checkfirst=True)
+                except IntegrityError as e:
+                    # Índice único sobre datos que ya lo violan: se avisa y el
+                    # sistema sigue arrancando; se reintenta en el próximo inicio
+                    print(f"[DB] WARNING: No se pudo crear el índice {indice.name}: {e.orig}")
+                    continue
+                creados.append(indice.name)
+
+    if creados:
+        print(f"[DB] Índices creados: {', '.join(creados)}")
+    return creados
+
+
+def migrar_vehiculos_activos(engine) -> int:
+    """
+    Mover a vehiculos_activos los vehículos 'activo' que quedaron en
+    vehiculos_estacionados (bases anteriores a la tabla activa). Mismo id.
+
+    Una base anterior puede tener dos 'activo' en el mismo espacio o con la
+    misma placa: se mueve la entrada más reciente de cada espacio y placa, y
+    las demás se finalizan con la salida en la entrada siguiente de ese
+    espacio o placa (el vehículo ya no estaba cuando entró el otro). Quedan
+    sin costo ni factura, que es lo que las distingue de una salida cobrada,
+    y se listan en un aviso para revisarlas.
+
+    También elimina los índices únicos parciales (estado = 'activo') que
+    esas bases tenían sobre vehiculos_estacionados: ahí ya no quedan activos.
+    """
+    activos = VehiculoActivo.__table__
+    historial = VehiculoEstacionado.__table__
+    columnas = ['id', 'placa', 'espacio_numero', 'fecha_hora_entrada', 'es_nocturno', 'clase_vehiculo', 'creado_en']
+    pendientes = historial.c.estado == 'activo'
+
+    try:
+        with engine.begin() as conn:
+            # Entrada más antigua ya vista por espacio y por placa; se recorre
+            # de la más reciente a la más antigua
+            entrada_espacio, entrada_placa = {}, {}
+            for fila in conn.execute(select(activos.c.espacio_numero, activos.c.placa, activos.c.fecha_hora_entrada)):
+                entrada_espacio[fila.espacio_numero] = fila.fecha_hora_entrada
+                entrada_placa[fila.placa] = fila.fecha_hora_entrada
+
+            mover, finalizados = [], []
+            for fila in conn.execute(
+                select(*[historial.c[c] for c in columnas]).where(pendientes).order_by(
+                    historial.c.fecha_hora_entrada.desc(), historial.c.id.desc()
+                )
+            ):
+                siguientes = [
+                    entrada for entrada in (entrada_espacio.get(fila.espacio_numero), entrada_placa.get(fila.placa))
+                    if entrada is not None
+                ]
+                if siguientes:
+                    finalizados.append({'fila_id': fila.id, 'salida': min(siguientes), 'fila': fila})
+                else:
+                    mover.append(dict(fila._mapping))
+                entrada_espacio[fila.espacio_numero] = fila.fecha_hora_entrada
+                entrada_placa[fila.placa] = fila.fecha_hora_entrada
+
+            if mover:
+                conn.execute(activos.insert(), mover)
+                conn.execute(delete(historial).where(historial.c.id.in_([fila['id'] for fila in mover])))
+            if finalizados:
+                conn.execute(
+                    historial.update()
+                    .where(historial.c.id == bindparam('fila_id'))
+                    .values(estado='finalizado', fecha_hora_salida=bindparam('salida')),
+                    [{'fila_id': f['fila_id'], 'salida': f['salida']} for f in finalizados]
+                )
+            for indice in INDICES_ACTIVOS_OBSOLETOS:
+                conn.execute(text(f"DROP INDEX IF EXISTS {indice}"))
+    except IntegrityError as e:
+        # Datos que la tabla activa no acepta (p. ej. espacio fuera de 1-24):
+        # se avisa y el sistema sigue arrancando; se reintenta en el próximo inicio
+        print(f"[DB] WARNING: No se pudieron migrar los vehículos activos: {e.orig}")
+        return 0
+
+    if mover:
+        print(f"[DB] Vehículos activos migrados a vehiculos_activos: {len(mover)}")
+    if finalizados:
+        detalle = ', '.join(
+            f"{f['fila'].placa} (espacio {f['fila'].espacio_numero}, id {f['fila'].id}, salida {f['salida']})"
+            for f in finalizados
+        )
+        print(f"[DB] WARNING: Vehículos 'activo' duplicados por espacio o placa; se finalizaron "
+              f"sin costo ni factura: {detalle}")
+    return len(mover)
+
+
+def crear_vistas(engine):
+    """(Re)crear las vistas de compatibilidad"""
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP VIEW IF EXISTS {VISTA_VEHICULOS_TODOS}"))
+        conn.execute(text(f"CREATE VIEW {VISTA_VEHICULOS_TODOS} AS {sql_vista_vehiculos_todos()}"))
@@ -0,0 +1,273 @@
+# app/utils/idempotencia.py
+"""
+Cabecera Idempotency-Key para las escrituras del mostrador.
+
+El renderer reintenta una entrada, salida o venta lenta con la misma
+Idempotency-Key; sin esto cada reintento creaba otra factura u otra venta
+(y descontaba stock dos veces). Con la cabecera:
+
+- La primera petición se ejecuta normalmente y su respuesta (código y
+  cuerpo, si no es un 5xx) se guarda en un LRU en memoria y en la tabla
+  claves_idempotencia (para sobrevivir a un reinicio).
+- Un reintento con la misma clave recibe la respuesta original sin volver
+  a ejecutar nada (cabecera Idempotent-Replayed: true).
+- Si el reintento llega mientras la original sigue en curso, espera a que
+  termine (hasta ESPERA_MAXIMA segundos) y recibe su respuesta.
+- La misma clave con otro cuerpo es un error del cliente: 422.
+
+Las peticiones sin cabecera no pasan por aquí.
+"""
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete
+from sqlalchemy.dialects.sqlite import insert
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+
+from app.config import SessionLocal
+from app.modelos.clave_idempotencia import ClaveIdempotencia
+
+CABECERA = b"idempotency-key"
+RUTAS_IDEMPOTENTES = {
+    ("POST", "/api/vehiculos/entrada"),
+    ("POST", "/api/vehiculos/salida"),
+    ("POST", "/api/vehiculos/lote"),
+    ("POST", "/api/ventas-servicios/"),
+}
+MAX_EN_MEMORIA = 1000
+HORAS_VIGENCIA = 24
+# Segundos que un reintento espera a que termine la petición original
+ESPERA_MAXIMA = 30
+LARGO_MAXIMO_CLAVE = 255
+# Cada cuántas respuestas guardadas se borran las claves vencidas
+GUARDADAS_POR_LIMPIEZA = 200
+
+
+class AlmacenIdempotencia:
+    """LRU en memoria respaldado por la tabla claves_idempotencia"""
+
+    _lock = threading.Lock()
+    _recientes = OrderedDict()  # (ruta, clave) -> respuesta guardada
+    _guardadas = 0
+
+    @classmethod
+    def _vigente(cls, guardada: dict) -> bool:
+        return guardada["creado_en"] >= datetime.now() - timedelta(hours=HORAS_VIGENCIA)
+
+    @classmethod
+    def _recordar(cls, llave: tuple, guardada: dict):
+        with cls._lock:
+            cls._recientes[llave] = guardada
+            cls._recientes.move_to_end(llave)
+            while len(cls._recientes) > MAX_EN_MEMORIA:
+                cls._recientes.popitem(last=False)
+
+    @classmethod
+    def en_memoria(cls, llave: tuple) -> Optional[dict]:
+        with cls._lock:
+            guardada = cls._recientes.get(llave)
+            if guardada is not None:
+                cls._recientes.move_to_end(llave)
+        if guardada is not None and cls._vigente(guardada):
+            return guardada
+        return None
+
+    @classmethod
+    def buscar(cls, llave: tuple) -> Optional[dict]:
+        """Respuesta guardada para (ruta, clave): primero el LRU, luego la tabla"""
+        guardada = cls.en_memoria(llave)
+        if guardada is not None:
+            return guardada
+
+        ruta, clave = llave
+        db = SessionLocal()
+        try:
+            fila = db.query(ClaveIdempotencia).filter(
+                ClaveIdempotencia.clave == clave,
+                ClaveIdempotencia.ruta == ruta
+            ).first()
+        finally:
+            db.close()
+        if fila is None:
+            return None
+
+        guardada = {
+            "huella": fila.huella,
+            "codigo_estado": fila.codigo_estado,
+            "tipo_contenido": fila.tipo_contenido,
+            "respuesta": fila.respuesta.encode("utf-8"),
+            "creado_en": fila.creado_en,
+        }
+        if not cls._vigente(guardada):
+            return None
+        cls._recordar(llave, guardada)
+        return guardada
+
+    @classmethod
+    def guardar(cls, llave: tuple, huella: str, codigo_estado: int, tipo_contenido: Optional[str], respuesta: bytes):
+        guardada = {
+            "huella": huella,
+            "codigo_estado": codigo_estado,
+            "tipo_contenido": tipo_contenido,
+            "respuesta": respuesta,
+            "creado_en": datetime.now(),
+        }
+        cls._recordar(llave, guardada)
+
+        ruta, clave = llave
+        db = SessionLocal()
+        try:
+            db.execute(
+                insert(ClaveIdempotencia.__table__).values(
+                    clave=clave, ruta=ruta, huella=huella, codigo_estado=codigo_estado,
+                    tipo_contenido=tipo_contenido, respuesta=respuesta.decode("utf-8", "replace"),
+                    creado_en=guardada["creado_en"]
+                ).on_conflict_do_nothing()
+            )
+            with cls._lock:
+                cls._guardadas += 1
+                limpiar = cls._guardadas % GUARDADAS_POR_LIMPIEZA == 0
+            if limpiar:
+                db.execute(delete(ClaveIdempotencia).where(
+                    ClaveIdempotencia.creado_en < datetime.now() - timedelta(hours=HORAS_VIGENCIA)
+                ))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            # La respuesta ya se entregó; sin la fila solo se pierde la
+            # protección tras un reinicio (el LRU la conserva)
+            print(f"⚠️ No se pudo guardar la clave de idempotencia: {e}")
+        finally:
+            db.close()
+
+    @classmethod
+    def limpiar(cls):
+        with cls._lock:
+            cls._recientes.clear()
+
+
+class MiddlewareIdempotencia:
+    """
+    Debe quedar dentro de CORS (agregarse antes): las respuestas repetidas
+    se envían desde aquí y también necesitan las cabeceras CORS.
+    """
+
+    # (ruta, clave) -> asyncio.Event de la petición en curso. Solo se toca
+    # desde el event loop, así que no necesita lock.
+    _en_curso = {}
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or (scope["method"], scope["path"]) not in RUTAS_IDEMPOTENTES:
+            await self.app(scope, receive, send)
+            return
+
+        clave = dict(scope["headers"]).get(CABECERA)
+        if not clave:
+            await self.app(scope, receive, send)
+            return
+        clave = clave.decode("latin-1").strip()
+        if not clave or len(clave) > LARGO_MAXIMO_CLAVE:
+            await JSONResponse(
+                {"detail": f"Idempotency-Key inválida (1 a {LARGO_MAXIMO_CLAVE} caracteres)"},
+                status_code=400
+            )(scope, receive, send)
+            return
+
+        # Cuerpo completo: hace falta su huella antes de decidir
+        partes = []
+        while True:
+            mensaje = await receive()
+            if mensaje["type"] == "http.disconnect":
+                return
+            partes.append(mensaje.get("body", b""))
+            if not mensaje.get("more_body"):
+                break
+        cuerpo = b"".join(partes)
+        huella = hashlib.sha256(cuerpo).hexdigest()
+        llave = (scope["path"], clave)
+
+        # Un reintento que llega con la original en curso espera su resultado
+        while llave in self._en_curso:
+            try:
+                await asyncio.wait_for(self._en_curso[llave].wait(), ESPERA_MAXIMA)
+            except asyncio.TimeoutError:
+                await JSONResponse(
+                    {"detail": "La petición original con esta Idempotency-Key sigue en curso"},
+                    status_code=409
+                )(scope, receive, send)
+                return
+
+        propio = asyncio.Event()
+        self._en_curso[llave] = propio
+        try:
+            guardada = AlmacenIdempotencia.en_memoria(llave)
+            if guardada is None:
+                guardada = await run_in_threadpool(AlmacenIdempotencia.buscar, llave)
+            if guardada is not None:
+                await self._repetir(guardada, huella, scope, receive, send)
+                return
+            await self._ejecutar(llave, huella, cuerpo, scope, receive, send)
+        finally:
+            del self._en_curso[llave]
+            propio.set()
+
+    @staticmethod
+    async def _repetir(guardada: dict, huella: str, scope, receive, send):
+        if guardada["huella"] != huella:
+            await JSONResponse(
+                {"detail": "Idempotency-Key ya usada con otra petición"},
+                status_code=422
+            )(scope, receive, send)
+            return
+
+        cabeceras = [
+            (b"content-length", str(len(guardada["respuesta"])).encode()),
+            (b"idempotent-replayed", b"true"),
+        ]
+        if guardada["tipo_contenido"]:
+            cabeceras.append((b"content-type", guardada["tipo_contenido"].encode("latin-1")))
+        await send({"type": "http.response.start", "status": guardada["codigo_estado"], "headers": cabeceras})
+        await send({"type": "http.response.body", "body": guardada["respuesta"]})
+
+    async def _ejecutar(self, llave: tuple, huella: str, cuerpo: bytes, scope, receive, send):
+        entregado = False
+
+        async def recibir():
+            nonlocal entregado
+            if not entregado:
+                entregado = True
+                return {"type": "http.request", "body": cuerpo, "more_body": False}
+            return await receive()
+
+        estado = None
+        tipo_contenido = None
+        respuesta = []
+        completa = False
+
+        async def enviar(mensaje):
+            nonlocal estado, tipo_contenido, completa
+            if mensaje["type"] == "http.response.start":
+                estado = mensaje["status"]
+                tipo_contenido = dict(mensaje.get("headers", [])).get(b"content-type")
+            elif mensaje["type"] == "http.response.body":
+                respuesta.append(mensaje.get("body", b""))
+                completa = not mensaje.get("more_body", False)
+            await send(mensaje)
+
+        await self.app(scope, recibir, enviar)
+
+        # Los 5xx no se guardan: el reintento debe volver a intentarlo
+        if completa and estado is not None and estado < 500:
+            await run_in_threadpool(
+                AlmacenIdempotencia.guardar, llave, huella, estado,
+                tipo_contenido.decode("latin-1") if tipo_contenido else None,
+                b"".join(respuesta)
+            )
@@ -0,0 +1,296 @@
+# app/utils/metricas.py
+"""
+Métricas por ruta: tiempo total, cantidad de consultas SQL y tiempo en SQL.
+
+- MiddlewareMetricas (ASGI) mide cada petición y la asocia a la plantilla
+  de la ruta ('/api/vehiculos/buscar/{placa}'), no a la URL concreta.
+- Los eventos before/after_cursor_execute del engine suman consultas y
+  tiempo SQL a la medición de la petición en curso (ContextVar; FastAPI
+  copia el contexto al threadpool, así que también cuenta en rutas def).
+- Los valores se acumulan en histogramas de ventana deslizante (últimos
+  VENTANA_MINUTOS minutos) que se exportan en JSON o en formato de texto
+  de Prometheus desde /api/metrics.
+
+Una ruta con muchas consultas por petición (N+1) se ve directamente en
+'consultas_sql' aunque su tiempo total todavía sea aceptable.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+from app.config import engine
+
+# Ventana de los histogramas (una ranura por minuto)
+VENTANA_MINUTOS = 10
+# Peticiones con más consultas que esto se reportan en consola
+UMBRAL_CONSULTAS_ALERTA = 50
+# Rutas de larga duración o propias que no se miden
+RUTAS_EXCLUIDAS = {"/api/eventos/stream", "/api/metrics"}
+
+LIMITES_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LIMITES_CONSULTAS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+class _MedicionPeticion:
+    __slots__ = ("consultas", "tiempo_sql")
+
+    def __init__(self):
+        self.consultas = 0
+        self.tiempo_sql = 0.0
+
+
+_medicion_actual: ContextVar = ContextVar("medicion_peticion", default=None)
+
+
+# =========================
+# Hooks del engine
+# =========================
+
+@event.listens_for(engine, "before_cursor_execute")
+def _antes_de_consulta(conn, cursor, statement, parameters, context, executemany):
+    if _medicion_actual.get() is not None:
+        conn.info.setdefault("metricas_inicio", []).append(time.perf_counter())
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def _despues_de_consulta(conn, cursor, statement, parameters, context, executemany):
+    medicion = _medicion_actual.get()
+    inicios = conn.info.get("metricas_inicio")
+    if medicion is None or not inicios:
+        return
+    medicion.consultas += 1
+    medicion.tiempo_sql += time.perf_counter() - inicios.pop()
+
+
+# =========================
+# Histograma deslizante
+# =========================
+
+class HistogramaRodante:
+    """Histograma acumulativo de los últimos VENTANA_MINUTOS minutos"""
+
+    def __init__(self, limites, ventana_minutos: int = VENTANA_MINUTOS):
+        self.limites = limites
+        self.ventana = ventana_minutos
+        # Por ranura: [minuto, conteos por límite (+Inf al final), suma, cantidad]
+        self._ranuras = [[-1, None, 0.0, 0] for _ in range(ventana_minutos)]
+
+    def observar(self, valor: float, ahora: float):
+        minuto = int(ahora // 60)
+        ranura = self._ranuras[minuto % self.ventana]
+        if ranura[0] != minuto:
+            ranura[:] = [minuto, [0] * (len(self.limites) + 1), 0.0, 0]
+        ranura[1][bisect_left(self.limites, valor)] += 1
+        ranura[2] += valor
+        ranura[3] += 1
+
+    def resumen(self, ahora: float) -> dict:
+        """Conteos acumulados por límite ('le'), suma y cantidad de la ventana"""
+        minimo = int(ahora // 60) - self.ventana
+        conteos = [0] * (len(self.limites) + 1)
+        suma = 0.0
+        cantidad = 0
+        for minuto, parciales, parcial_suma, parcial_cantidad in self._ranuras:
+            if minuto <= minimo or parciales is None:
+                continue
+            for i, c in enumerate(parciales):
+                conteos[i] += c
+            suma += parcial_suma
+            cantidad += parcial_cantidad
+
+        acumulados = []
+        total = 0
+        for c in conteos:
+            total += c
+            acumulados.append(total)
+        return {"acumulados": acumulados, "suma": suma, "cantidad": cantidad}
+
+    def percentil(self, resumen: dict, q: float):
+        """Estimación por límite superior del bucket (como histogram_quantile)"""
+        if not resumen["cantidad"]:
+            return None
+        objetivo = q * resumen["cantidad"]
+        for limite, acumulado in zip(self.limites, resumen["acumulados"]):
+            if acumulado >= objetivo:
+                return limite
+        return float("inf")
+
+
+class _MetricasRuta:
+    def __init__(self):
+        self.duracion = HistogramaRodante(LIMITES_SEGUNDOS)
+        self.tiempo_sql = HistogramaRodante(LIMITES_SEGUNDOS)
+        self.consultas = HistogramaRodante(LIMITES_CONSULTAS)
+        self.max_consultas = 0
+        self.por_estado = {}   # código HTTP -> total desde el arranque
+
+
+# =========================
+# Registro
+# =========================
+
+class Metricas:
+    """Registro en memoria de las métricas de todas las rutas"""
+
+    _lock = threading.Lock()
+    _rutas = {}   # (metodo, ruta) -> _MetricasRuta
+
+    @classmethod
+    def registrar(cls, metodo: str, ruta: str, estado: int,
+                  duracion: float, consultas: int, tiempo_sql: float):
+        ahora = time.time()
+        with cls._lock:
+            metricas = cls._rutas.get((metodo, ruta))
+            if metricas is None:
+                metricas = cls._rutas[(metodo, ruta)] = _MetricasRuta()
+            metricas.duracion.observar(duracion, ahora)
+            metricas.tiempo_sql.observar(tiempo_sql, ahora)
+            metricas.consultas.observar(consultas, ahora)
+            metricas.max_consultas = max(metricas.max_consultas, consultas)
+            metricas.por_estado[estado] = metricas.por_estado.get(estado, 0) + 1
+
+        if consultas > UMBRAL_CONSULTAS_ALERTA:
+            print(f"⚠️ {metodo} {ruta}: {consultas} consultas SQL en una petición "
+                  f"({tiempo_sql * 1000:.1f} ms en SQL, {duracion * 1000:.1f} ms total)")
+
+    @classmethod
+    def limpiar(cls):
+        with cls._lock:
+            cls._rutas = {}
+
+    # =========================
+    # Exportación
+    # =========================
+
+    @classmethod
+    def exportar_json(cls) -> dict:
+        ahora = time.time()
+        rutas = []
+        with cls._lock:
+            for (metodo, ruta), m in sorted(cls._rutas.items(), key=lambda x: (x[0][1], x[0][0])):
+                duracion = m.duracion.resumen(ahora)
+                tiempo_sql = m.tiempo_sql.resumen(ahora)
+                consultas = m.consultas.resumen(ahora)
+                cantidad = duracion["cantidad"]
+                rutas.append({
+                    "metodo": metodo,
+                    "ruta": ruta,
+                    "peticiones": cantidad,
+                    "por_estado": {str(k): v for k, v in sorted(m.por_estado.items())},
+                    "duracion_ms": {
+                        "promedio": round(duracion["suma"] / cantidad * 1000, 2) if cantidad else None,
+                        "p50": _a_ms(m.duracion.percentil(duracion, 0.5)),
+                        "p95": _a_ms(m.duracion.percentil(duracion, 0.95)),
+                        "p99": _a_ms(m.duracion.percentil(duracion, 0.99)),
+                    },
+                    "sql_ms": {
+                        "promedio": round(tiempo_sql["suma"] / cantidad * 1000, 2) if cantidad else None,
+                        "p95": _a_ms(m.tiempo_sql.percentil(tiempo_sql, 0.95)),
+                    },
+                    "consultas_sql": {
+                        "promedio": round(consultas["suma"] / cantidad, 2) if cantidad else None,
+                        "p95": m.consultas.percentil(consultas, 0.95),
+                        "maximo": m.max_consultas,
+                    },
+                })
+        return {"ventana_minutos": VENTANA_MINUTOS, "rutas": rutas}
+
+    @classmethod
+    def exportar_prometheus(cls) -> str:
+        ahora = time.time()
+        lineas = []
+        series = (
+            ("parqueadero_peticion_duracion_segundos", "duracion", "Duración de la petición"),
+            ("parqueadero_peticion_sql_segundos", "tiempo_sql", "Tiempo en SQL por petición"),
+            ("parqueadero_peticion_consultas_sql", "consultas", "Consultas SQL por petición"),
+        )
+        with cls._lock:
+            rutas = sorted(cls._rutas.items(), key=lambda x: (x[0][1], x[0][0]))
+
+            for nombre, atributo, ayuda in series:
+                lineas.append(f"# HELP {nombre} {ayuda} (últimos {VENTANA_MINUTOS} min)")
+                lineas.append(f"# TYPE {nombre} histogram")
+                for (metodo, ruta), m in rutas:
+                    histograma = getattr(m, atributo)
+                    resumen = histograma.resumen(ahora)
+                    etiquetas = f'metodo="{metodo}",ruta="{_escapar(ruta)}"'
+                    for limite, acumulado in zip(histograma.limites, resumen["acumulados"]):
+                        lineas.append(f'{nombre}_bucket{{{etiquetas},le="{limite}"}} {acumulado}')
+                    lineas.append(f'{nombre}_bucket{{{etiquetas},le="+Inf"}} {resumen["cantidad"]}')
+                    lineas.append(f"{nombre}_sum{{{etiquetas}}} {resumen['suma']}")
+                    lineas.append(f"{nombre}_count{{{etiquetas}}} {resumen['cantidad']}")
+
+            lineas.append("# HELP parqueadero_peticiones_total Peticiones por código HTTP desde el arranque")
+            lineas.append("# TYPE parqueadero_peticiones_total counter")
+            for (metodo, ruta), m in rutas:
+                for estado, total in sorted(m.por_estado.items()):
+                    lineas.append(
+                        f'parqueadero_peticiones_total{{metodo="{metodo}",'
+                        f'ruta="{_escapar(ruta)}",estado="{estado}"}} {total}'
+                    )
+        return "\n".join(lineas) + "\n"
+
+
+def _a_ms(segundos):
+    if segundos is None or segundos == float("inf"):
+        return segundos
+    return round(segundos * 1000, 2)
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace('"', '\\"')
+
+
+# =========================
+# Middleware ASGI
+# =========================
+
+class MiddlewareMetricas:
+    """
+    Mide cada petición HTTP hasta el último fragmento del cuerpo y agrega
+    la cabecera Server-Timing (total y SQL) a la respuesta.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in RUTAS_EXCLUIDAS:
+            await self.app(scope, receive, send)
+            return
+
+        medicion = _MedicionPeticion()
+        token = _medicion_actual.set(medicion)
+        inicio = time.perf_counter()
+        estado = 500
+
+        async def enviar(mensaje):
+            nonlocal estado
+            if mensaje["type"] == "http.response.start":
+                estado = mensaje["status"]
+                duracion_ms = (time.perf_counter() - inicio) * 1000
+                cabeceras = list(mensaje.get("headers", []))
+                cabeceras.append((
+                    b"server-timing",
+                    f"app;dur={duracion_ms:.1f}, "
+                    f"db;dur={medicion.tiempo_sql * 1000:.1f};desc=\"{medicion.consultas} consultas\"".encode()
+                ))
+                mensaje = {**mensaje, "headers": cabeceras}
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _medicion_actual.reset(token)
+            ruta = scope.get("route")
+            Metricas.registrar(
+                scope["method"],
+                getattr(ruta, "path", None) or "sin_ruta",
+                estado,
+                time.perf_counter() - inicio,
+                medicion.consultas,
+                medicion.tiempo_sql,
+            )
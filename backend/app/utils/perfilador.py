@@ -0,0 +1,98 @@
+# app/utils/perfilador.py
+"""
+Perfilador por muestreo para diagnosticar el backend en vivo.
+
+Durante N segundos toma cada INTERVALO_MUESTREO la pila de todos los hilos
+del proceso (sys._current_frames) y cuenta cuántas veces aparece cada pila.
+El resultado está en formato "collapsed stack" (una línea por pila,
+marcos separados por ';' y el conteo al final), que aceptan directamente
+flamegraph.pl, speedscope e inferno.
+
+No instala hooks ni trazas: fuera de una sesión de perfilado no hay costo.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# 100 muestras por segundo
+INTERVALO_MUESTREO = 0.01
+MAX_SEGUNDOS = 60
+
+# Hojas de pila que corresponden a hilos esperando trabajo (no consumen CPU)
+_ESPERAS = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("_thread.py", "worker"),
+}
+
+
+def _nombre_marco(marco) -> str:
+    codigo = marco.f_code
+    archivo = os.path.basename(codigo.co_filename)
+    return f"{codigo.co_name} ({archivo}:{codigo.co_firstlineno})"
+
+
+def _en_espera(marco) -> bool:
+    codigo = marco.f_code
+    return (os.path.basename(codigo.co_filename), codigo.co_name) in _ESPERAS
+
+
+class PerfiladorMuestreo:
+    """Una sesión de perfilado a la vez para todo el proceso"""
+
+    _lock = threading.Lock()
+
+    @classmethod
+    def perfilar(cls, segundos: float, incluir_esperas: bool = False) -> dict:
+        """
+        Muestrear las pilas de todos los hilos (bloquea el hilo que llama).
+
+        Returns:
+            dict con 'pilas' (texto collapsed stack), 'muestras' y 'segundos'
+
+        Raises:
+            ValueError: Si la duración no es válida o ya hay una sesión activa
+        """
+        if not 0 < segundos <= MAX_SEGUNDOS:
+            raise ValueError(f"La duración debe estar entre 0 y {MAX_SEGUNDOS} segundos")
+        if not cls._lock.acquire(blocking=False):
+            raise ValueError("Ya hay una sesión de perfilado en curso")
+
+        try:
+            propio = threading.get_ident()
+            nombres = {}
+            pilas = Counter()
+            muestras = 0
+            inicio = time.perf_counter()
+            fin = inicio + segundos
+
+            while time.perf_counter() < fin:
+                for hilo_id, marco in sys._current_frames().items():
+                    if hilo_id == propio:
+                        continue
+                    if not incluir_esperas and _en_espera(marco):
+                        continue
+
+                    marcos = []
+                    while marco is not None:
+                        marcos.append(_nombre_marco(marco))
+                        marco = marco.f_back
+
+                    if hilo_id not in nombres:
+                        nombres = {h.ident: h.name for h in threading.enumerate()}
+                    marcos.append(nombres.get(hilo_id, f"hilo-{hilo_id}"))
+                    pilas[";".join(reversed(marcos))] += 1
+                muestras += 1
+                time.sleep(INTERVALO_MUESTREO)
+
+            duracion = time.perf_counter() - inicio
+        finally:
+            cls._lock.release()
+
+        texto = "\n".join(f"{pila} {conteo}" for pila, conteo in pilas.most_common())
+        print(f"🔬 Perfil tomado: {muestras} muestras en {duracion:.1f}s, {len(pilas)} pilas distintas")
+        return {"pilas": texto + "\n" if texto else "", "muestras": muestras, "segundos": duracion}
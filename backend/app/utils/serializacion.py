@@ -0,0 +1,49 @@
+# app/utils/serializacion.py
+"""
+Serialización rápida de listados grandes.
+
+Los listados (historial de facturas, historial de cajas, ventas) se leen
+como tuplas de columnas y se codifican directamente con orjson, evitando
+el to_dict() por fila (isoformat/float) y la revalidación del
+response_model de FastAPI. Si orjson no está instalado se usa json.
+"""
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # Entornos sin la dependencia: mismo resultado, más lento
+    orjson = None
+
+
+def _por_defecto(valor):
+    if isinstance(valor, (datetime, date, time)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return float(valor)
+    raise TypeError(f"Tipo no serializable: {type(valor).__name__}")
+
+
+def dumps(contenido) -> bytes:
+    """Codificar a JSON (bytes UTF-8)"""
+    if orjson is not None:
+        return orjson.dumps(contenido, default=_por_defecto, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        contenido, ensure_ascii=False, separators=(",", ":"), default=_por_defecto
+    ).encode("utf-8")
+
+
+def filas_a_dicts(claves, filas) -> list:
+    """Convertir tuplas de columnas a diccionarios con las claves dadas"""
+    return [dict(zip(claves, fila)) for fila in filas]
+
+
+class RespuestaJSON(Response):
+    """Respuesta JSON que no revalida contra el response_model"""
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
@@ -0,0 +1,112 @@
+# app/utils/sketch_cuantiles.py
+"""
+Sketch de cuantiles combinable (DDSketch).
+
+Cada valor positivo cae en la cubeta ceil(log_gamma(valor)), con
+gamma = (1 + a) / (1 - a): cualquier cuantil se estima con error relativo
+de a lo sumo `a` (1% por defecto). El sketch guarda solo conteos por
+cubeta, así que dos sketches con la misma precisión se combinan sumando
+conteos, y el resultado es el mismo que si se hubieran agregado todos los
+valores a uno solo: los percentiles de un rango salen de combinar los
+sketches de cada día.
+
+Duraciones de 1 minuto a 1 año ocupan a lo sumo ~660 cubetas, así que no
+hace falta colapsar cubetas. Además se guardan la suma, el mínimo y el
+máximo exactos (promedio exacto y estimaciones acotadas a [mínimo, máximo]).
+"""
+import json
+import math
+
+# Error relativo máximo de los cuantiles estimados
+PRECISION_RELATIVA = 0.01
+
+
+class SketchCuantiles:
+    """Conteos por cubeta logarítmica de una serie de valores no negativos"""
+
+    def __init__(self, precision: float = PRECISION_RELATIVA):
+        if not 0 < precision < 1:
+            raise ValueError("La precisión relativa debe estar entre 0 y 1")
+        self.precision = precision
+        self.gamma = (1 + precision) / (1 - precision)
+        self._log_gamma = math.log(self.gamma)
+        self.cubetas = {}   # índice -> conteo
+        self.ceros = 0      # valores <= 0 (no tienen logaritmo)
+        self.total = 0
+        self.suma = 0.0
+        self.minimo = None
+        self.maximo = None
+
+    def agregar(self, valor: float, cantidad: int = 1):
+        if valor > 0:
+            indice = math.ceil(math.log(valor) / self._log_gamma)
+            self.cubetas[indice] = self.cubetas.get(indice, 0) + cantidad
+        else:
+            valor = 0
+            self.ceros += cantidad
+        self.total += cantidad
+        self.suma += valor * cantidad
+        self.minimo = valor if self.minimo is None else min(self.minimo, valor)
+        self.maximo = valor if self.maximo is None else max(self.maximo, valor)
+
+    def combinar(self, otro: "SketchCuantiles"):
+        """Sumar los conteos de otro sketch (misma precisión) a este"""
+        if otro.precision != self.precision:
+            raise ValueError("Solo se pueden combinar sketches con la misma precisión")
+        for indice, conteo in otro.cubetas.items():
+            self.cubetas[indice] = self.cubetas.get(indice, 0) + conteo
+        self.ceros += otro.ceros
+        self.total += otro.total
+        self.suma += otro.suma
+        if otro.minimo is not None:
+            self.minimo = otro.minimo if self.minimo is None else min(self.minimo, otro.minimo)
+            self.maximo = otro.maximo if self.maximo is None else max(self.maximo, otro.maximo)
+
+    def cuantil(self, q: float):
+        """Valor estimado del cuantil q (0-1); None si el sketch está vacío"""
+        if not 0 <= q <= 1:
+            raise ValueError("El cuantil debe estar entre 0 y 1")
+        if self.total == 0:
+            return None
+        rango = q * (self.total - 1)
+        acumulado = self.ceros
+        if rango < acumulado:
+            return 0.0
+        for indice in sorted(self.cubetas):
+            acumulado += self.cubetas[indice]
+            if acumulado > rango:
+                # Punto de la cubeta (gamma^(i-1), gamma^i] con error relativo <= precisión
+                estimado = 2 * self.gamma ** indice / (self.gamma + 1)
+                return min(max(estimado, self.minimo), self.maximo)
+        return self.maximo
+
+    @property
+    def promedio(self):
+        return self.suma / self.total if self.total else None
+
+    # =========================
+    # Serialización (JSON)
+    # =========================
+
+    def a_json(self) -> str:
+        return json.dumps({
+            'precision': self.precision,
+            'cubetas': {str(indice): conteo for indice, conteo in self.cubetas.items()},
+            'ceros': self.ceros,
+            'total': self.total,
+            'suma': self.suma,
+            'minimo': self.minimo,
+            'maximo': self.maximo,
+        }, separators=(',', ':'))
+
+    @classmethod
+    def desde_json(cls, texto: str) -> "SketchCuantiles":
+        datos = json.loads(texto)
+        sketch = cls(datos['precision'])
+        sketch.cubetas = {int(indice): conteo for indice, conteo in datos['cubetas'].items()}
+        sketch.ceros = datos['ceros']
+        sketch.total = datos['total']
+        sketch.suma = datos['suma']
+        sketch.minimo = datos['minimo']
+        sketch.maximo = datos['maximo']
+        return sketch
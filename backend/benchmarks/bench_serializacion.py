@@ -0,0 +1,96 @@
+# benchmarks/bench_serializacion.py
+"""
+Benchmark de construcción del payload para listados de 1.000 filas.
+
+Compara el camino anterior (ORM + to_dict() + revalidación Pydantic +
+json) con el camino rápido (tuplas de columnas + orjson).
+Ejecutar desde la raíz del backend:
+    python benchmarks/bench_serializacion.py
+"""
+import os
+import sys
+import tempfile
+import timeit
+from datetime import datetime, timedelta
+
+# Base de datos temporal: nunca tocar data/parqueaderos.db
+os.environ["SQLITE_DB_PATH"] = os.path.join(tempfile.mkdtemp(), "bench_serializacion.db")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+from typing import List
+from pydantic import TypeAdapter
+
+from app.config import Base, engine, SessionLocal
+# Importar TODOS los modelos para que SQLAlchemy resuelva las relaciones
+from app.modelos import configuracion_precios, vehiculo_estacionado, historial_factura, producto, venta_servicio  # noqa: F401
+from app.modelos import caja, denominacion_caja, egreso_caja, movimiento_manual  # noqa: F401
+from app.modelos.vehiculo_estacionado import VehiculoEstacionado
+from app.modelos.historial_factura import HistorialFactura
+from app.esquemas.factura_schema import FacturaDetallada
+from app.servicios.vehiculo_service import VehiculoService
+from app.utils.serializacion import dumps
+
+FILAS = 1000
+REPETICIONES = 20
+
+
+def poblar(db):
+    inicio = datetime.now() - timedelta(days=30)
+    for i in range(FILAS):
+        entrada = inicio + timedelta(minutes=30 * i)
+        salida = entrada + timedelta(minutes=45 + i % 300)
+        vehiculo = VehiculoEstacionado(
+            placa=f"ABC{i:04d}", espacio_numero=i % 24 + 1,
+            fecha_hora_entrada=entrada, fecha_hora_salida=salida,
+            costo_total=1.5, estado='finalizado'
+        )
+        db.add(vehiculo)
+        db.flush()
+        db.add(HistorialFactura(
+            vehiculo_id=vehiculo.id, placa=vehiculo.placa,
+            espacio_numero=vehiculo.espacio_numero,
+            fecha_hora_entrada=entrada, fecha_hora_salida=salida,
+            tiempo_total_minutos=45 + i % 300, costo_total=1.5,
+            detalles_cobro="Primera hora: $1.00", fecha_generacion=salida,
+            es_nocturno=i % 7 == 0, metodo_pago="efectivo" if i % 3 else "tarjeta"
+        ))
+    db.commit()
+
+
+def camino_anterior(db, adaptador):
+    facturas = db.query(HistorialFactura).order_by(
+        HistorialFactura.fecha_generacion.desc()
+    ).limit(FILAS).all()
+    datos = adaptador.validate_python([f.to_dict() for f in facturas])
+    return json.dumps(adaptador.dump_python(datos, mode="json")).encode("utf-8")
+
+
+def camino_rapido(db):
+    return dumps({"success": True, **VehiculoService.obtener_historial(db, limite=FILAS)})
+
+
+def main():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    poblar(db)
+    adaptador = TypeAdapter(List[FacturaDetallada])
+
+    # Silenciar los print de depuración del servicio durante la medición
+    stdout, sys.stdout = sys.stdout, open(os.devnull, "w")
+    try:
+        anterior = min(timeit.repeat(lambda: camino_anterior(db, adaptador), number=1, repeat=REPETICIONES))
+        rapido = min(timeit.repeat(lambda: camino_rapido(db), number=1, repeat=REPETICIONES))
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    print(f"Payload historial ({FILAS} filas, mejor de {REPETICIONES}):")
+    print(f"  ORM + to_dict + Pydantic: {anterior * 1000:8.2f} ms")
+    print(f"  Columnas + orjson:        {rapido * 1000:8.2f} ms")
+    print(f"  Mejora:                   {anterior / rapido:8.1f}x")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# benchmarks/conftest.py
+"""
+Prepara la base de datos sintética y el cliente en proceso.
+
+La base se genera una sola vez por (filas, semilla) en benchmarks/.datos/
+y cada sesión trabaja sobre una copia, así las escrituras de los
+escenarios (entradas, salidas, apertura de caja) no alteran el original.
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+FILAS = int(os.getenv("BENCH_FILAS", "10000"))
+SEMILLA = int(os.getenv("BENCH_SEMILLA", "42"))
+
+DIR_BENCH = Path(__file__).resolve().parent
+DIR_DATOS = DIR_BENCH / ".datos"
+DB_ORIGINAL = DIR_DATOS / f"parqueaderos_{FILAS}_{SEMILLA}.db"
+
+if not DB_ORIGINAL.exists():
+    DIR_DATOS.mkdir(exist_ok=True)
+    # Proceso aparte: app.config fija la ruta de la base al importarse
+    subprocess.run(
+        [sys.executable, str(DIR_BENCH / "generador_datos.py"),
+         "--filas", str(FILAS), "--semilla", str(SEMILLA), "--db", str(DB_ORIGINAL)],
+        check=True
+    )
+
+DB_SESION = Path(tempfile.mkdtemp()) / "parqueaderos.db"
+shutil.copy(DB_ORIGINAL, DB_SESION)
+os.environ["SQLITE_DB_PATH"] = str(DB_SESION)
+sys.path.insert(0, str(DIR_BENCH.parent))
+
+
+def pytest_benchmark_update_json(config, benchmarks, output_json):
+    """Guardar la escala de datos junto a los resultados"""
+    output_json["datos"] = {"filas": FILAS, "semilla": SEMILLA}
+
+
+@pytest.fixture(scope="session")
+def cliente():
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as cliente:
+        # Caja abierta hoy para los escenarios de caja
+        if not cliente.get("/api/caja/estado").json()["caja_abierta"]:
+            respuesta = cliente.post("/api/caja/abrir", json={"monto_inicial": 50, "operador": "bench"})
+            assert respuesta.status_code == 201, respuesta.text
+        yield cliente
+
+
+@pytest.fixture(scope="session")
+def fecha_media():
+    """Un día en medio del rango generado (con datos completos)"""
+    from datetime import date, timedelta
+    from generador_datos import FACTURAS_POR_DIA
+
+    dias = max(30, FILAS // FACTURAS_POR_DIA)
+    return date.today() - timedelta(days=dias // 2)
@@ -0,0 +1,114 @@
+# benchmarks/escenarios_api.py
+"""
+Escenarios de las rutas calientes de la API (TestClient en proceso).
+
+    cd backend/benchmarks
+    pip install -r requirements-bench.txt
+    BENCH_FILAS=100000 pytest
+
+Cada ejecución guarda un JSON en benchmarks/resultados/ (pytest-benchmark
+--benchmark-autosave); para comparar dos versiones:
+    pytest-benchmark compare 0001 0002 --storage file://resultados
+"""
+import itertools
+from datetime import timedelta
+
+from app.utils.cache_respuestas import CacheRespuestas
+
+# Espacio libre que usan los escenarios de entrada/salida
+ESPACIO_BENCH = 24
+_placas = (f"BEN{i:05d}" for i in itertools.count())
+
+
+def _ok(respuesta, codigo=200):
+    assert respuesta.status_code == codigo, respuesta.text
+    return respuesta
+
+
+# =========================
+# Vehículos
+# =========================
+
+def test_entrada(benchmark, cliente):
+    estado = {}
+
+    def preparar():
+        # Liberar el espacio ocupado por la ronda anterior (no se mide)
+        if "placa" in estado:
+            _ok(cliente.post("/api/vehiculos/salida", json={"placa": estado["placa"]}))
+        estado["placa"] = next(_placas)
+
+    def entrar():
+        _ok(cliente.post("/api/vehiculos/entrada",
+                         json={"placa": estado["placa"], "espacio_numero": ESPACIO_BENCH}), 201)
+
+    benchmark.pedantic(entrar, setup=preparar, rounds=50)
+    _ok(cliente.post("/api/vehiculos/salida", json={"placa": estado["placa"]}))
+
+
+def test_salida(benchmark, cliente):
+    estado = {}
+
+    def preparar():
+        estado["placa"] = next(_placas)
+        _ok(cliente.post("/api/vehiculos/entrada",
+                         json={"placa": estado["placa"], "espacio_numero": ESPACIO_BENCH}), 201)
+
+    def salir():
+        _ok(cliente.post("/api/vehiculos/salida", json={"placa": estado["placa"]}))
+
+    benchmark.pedantic(salir, setup=preparar, rounds=50)
+
+
+def test_espacios(benchmark, cliente):
+    benchmark(lambda: _ok(cliente.get("/api/vehiculos/espacios")))
+
+
+def test_espacios_sin_cache(benchmark, cliente):
+    benchmark.pedantic(
+        lambda: _ok(cliente.get("/api/vehiculos/espacios")),
+        setup=CacheRespuestas.limpiar, rounds=100
+    )
+
+
+def test_historial_primera_pagina(benchmark, cliente):
+    benchmark(lambda: _ok(cliente.get("/api/vehiculos/historial", params={"limite": 100})))
+
+
+def test_sugerencias_placa(benchmark, cliente):
+    benchmark(lambda: _ok(cliente.get("/api/vehiculos/sugerencias", params={"q": "ABC12"})))
+
+
+# =========================
+# Caja
+# =========================
+
+def test_caja_estado(benchmark, cliente):
+    benchmark(lambda: _ok(cliente.get("/api/caja/estado")))
+
+
+def test_caja_estado_sin_cache(benchmark, cliente):
+    benchmark.pedantic(
+        lambda: _ok(cliente.get("/api/caja/estado")),
+        setup=CacheRespuestas.limpiar, rounds=100
+    )
+
+
+# =========================
+# Reportes
+# =========================
+
+def test_reporte_diario(benchmark, cliente, fecha_media):
+    benchmark(lambda: _ok(cliente.get("/api/reportes/diario", params={"fecha": fecha_media.isoformat()})))
+
+
+def test_reporte_detallado(benchmark, cliente, fecha_media):
+    benchmark(lambda: _ok(cliente.get("/api/reportes/detallado", params={"fecha": fecha_media.isoformat()})))
+
+
+def test_ventas_reporte_mes(benchmark, cliente, fecha_media):
+    params = {
+        "fecha_inicio": (fecha_media - timedelta(days=15)).isoformat(),
+        "fecha_fin": (fecha_media + timedelta(days=15)).isoformat(),
+    }
+    benchmark(lambda: _ok(cliente.get("/api/ventas-servicios/reporte/diario", params=params)))
@@ -0,0 +1,246 @@
+# benchmarks/generador_datos.py
+"""
+Generador reproducible de datos sintéticos para los benchmarks.
+
+Llena una base SQLite nueva con historial realista: vehículos y facturas,
+ventas con items, cajas diarias con denominaciones y egresos. Con la
+misma semilla y cantidad de filas el resultado es siempre idéntico.
+
+Uso (desde la raíz del backend):
+    python benchmarks/generador_datos.py --filas 100000 --db /tmp/bench.db
+"""
+import argparse
+import math
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+# Facturas por día: define cuántos días de historia cubren las filas
+FACTURAS_POR_DIA = 150
+# Tamaño de los lotes de INSERT
+TAMANO_LOTE = 10000
+# Espacios ocupados al terminar (los benchmarks usan los libres)
+ESPACIOS_OCUPADOS = 12
+
+PRODUCTOS = [
+    ("Agua 500ml", 0.75, "BEBIDAS"), ("Cola 500ml", 1.00, "BEBIDAS"),
+    ("Jugo naranja", 1.25, "BEBIDAS"), ("Café", 0.80, "BEBIDAS"),
+    ("Energizante", 2.00, "BEBIDAS"), ("Papas fritas", 0.60, "SNACKS"),
+    ("Galletas", 0.50, "SNACKS"), ("Chocolate", 1.10, "SNACKS"),
+    ("Maní", 0.40, "SNACKS"), ("Cargador", 5.00, "OTROS"),
+    ("Paraguas", 6.50, "OTROS"), ("Mascarilla", 0.30, "OTROS"),
+]
+DENOMINACIONES = [20, 10, 5, 1, 0.50, 0.25, 0.10, 0.05]
+
+
+def costo_tarifa_defecto(minutos: int, es_nocturno: bool) -> float:
+    """Misma regla que CalculadoraPrecios con la configuración por defecto"""
+    if es_nocturno:
+        return 10.0
+    if minutos <= 5:
+        return 0.5
+    if minutos <= 30:
+        return 0.75
+    if minutos <= 60:
+        return 1.0
+    return 1.0 + math.ceil((minutos - 60) / 30.0) * 0.5
+
+
+def generar(ruta_db: str, filas: int, semilla: int = 42):
+    """Crear ruta_db y llenarla con `filas` facturas (y datos asociados)"""
+    if os.path.exists(ruta_db):
+        raise FileExistsError(f"{ruta_db} ya existe; los datos se generan sobre una base vacía")
+
+    # app.config lee la ruta al importarse
+    os.environ["SQLITE_DB_PATH"] = ruta_db
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    from sqlalchemy import text
+    from app.config import Base, engine
+    from app.modelos.configuracion_precios import ConfiguracionPrecios
+    from app.modelos.vehiculo_estacionado import VehiculoEstacionado
+    from app.modelos.vehiculo_activo import VehiculoActivo
+    from app.modelos.historial_factura import HistorialFactura
+    from app.modelos.producto import Producto
+    from app.modelos.venta_servicio import VentaServicio, ItemVentaServicio
+    from app.modelos.caja import Caja
+    from app.modelos.denominacion_caja import DenominacionCaja
+    from app.modelos.egreso_caja import EgresoCaja
+    from app.modelos.movimiento_manual import MovimientoManualCaja  # noqa: F401
+
+    rnd = random.Random(semilla)
+    Base.metadata.create_all(bind=engine)
+
+    dias = max(30, filas // FACTURAS_POR_DIA)
+    hoy = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    inicio = hoy - timedelta(days=dias)
+    letras = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    placas = [
+        "".join(rnd.choices(letras, k=3)) + str(rnd.randint(100, 9999))
+        for _ in range(max(100, filas // 4))
+    ]
+
+    def insertar(conn, tabla, registros):
+        if registros:
+            conn.execute(tabla.insert(), registros)
+
+    with engine.begin() as conn:
+        conn.execute(ConfiguracionPrecios.__table__.insert(), [{
+            "id": 1, "precio_0_5_min": 0.50, "precio_6_30_min": 0.75,
+            "precio_31_60_min": 1.00, "precio_hora_adicional": 1.00,
+            "precio_nocturno": 10.00,
+            "hora_inicio_nocturno": datetime.strptime("19:00", "%H:%M").time(),
+            "hora_fin_nocturno": datetime.strptime("07:00", "%H:%M").time(),
+            "actualizado_en": inicio,
+        }])
+
+        insertar(conn, Producto.__table__, [
+            {"id": i, "nombre": nombre, "precio": precio, "stock": 10 ** 6,
+             "categoria": categoria, "activo": 1, "creado_en": inicio, "actualizado_en": inicio}
+            for i, (nombre, precio, categoria) in enumerate(PRODUCTOS, 1)
+        ])
+
+        # ── VEHÍCULOS Y FACTURAS (por lotes: memoria constante) ──
+        vehiculos, facturas = [], []
+        segundos_totales = dias * 86400
+        for i in range(1, filas + 1):
+            es_nocturno = rnd.random() < 0.10
+            minutos = rnd.randint(600, 780) if es_nocturno else max(1, int(rnd.expovariate(1 / 120)))
+            entrada = inicio + timedelta(seconds=rnd.randrange(segundos_totales - 50000))
+            salida = entrada + timedelta(minutes=minutos)
+            placa = rnd.choice(placas)
+            espacio = rnd.randint(1, 24)
+            costo = costo_tarifa_defecto(minutos, es_nocturno)
+            es_no_pagado = rnd.random() < 0.02
+            vehiculos.append({
+                "id": i, "placa": placa, "espacio_numero": espacio,
+                "fecha_hora_entrada": entrada, "fecha_hora_salida": salida,
+                "costo_total": costo, "estado": "finalizado",
+                "es_nocturno": es_nocturno, "es_no_pagado": es_no_pagado, "creado_en": entrada,
+            })
+            facturas.append({
+                "id": i, "vehiculo_id": i, "placa": placa, "espacio_numero": espacio,
+                "fecha_hora_entrada": entrada, "fecha_hora_salida": salida,
+                "tiempo_total_minutos": minutos, "costo_total": costo,
+                "detalles_cobro": "TARIFA NOCTURNA FIJA: $10.00" if es_nocturno else f"{minutos} minutos",
+                "fecha_generacion": salida, "es_nocturno": es_nocturno,
+                "es_no_pagado": es_no_pagado,
+                "metodo_pago": "efectivo" if rnd.random() < 0.8 else "tarjeta",
+            })
+            if len(facturas) >= TAMANO_LOTE:
+                insertar(conn, VehiculoEstacionado.__table__, vehiculos)
+                insertar(conn, HistorialFactura.__table__, facturas)
+                vehiculos, facturas = [], []
+
+        insertar(conn, VehiculoEstacionado.__table__, vehiculos)
+        insertar(conn, HistorialFactura.__table__, facturas)
+
+        # Vehículos activos al momento de generar
+        activos = []
+        for espacio in range(1, ESPACIOS_OCUPADOS + 1):
+            entrada = datetime.now() - timedelta(minutes=rnd.randint(5, 600))
+            activos.append({
+                "id": filas + espacio, "placa": f"ACT{espacio:04d}", "espacio_numero": espacio,
+                "fecha_hora_entrada": entrada, "es_nocturno": False, "creado_en": entrada,
+            })
+        insertar(conn, VehiculoActivo.__table__, activos)
+
+        # ── VENTAS CON ITEMS (por lotes) ───────────────────────
+        ventas, items = [], []
+        item_id = 0
+        for venta_id in range(1, filas // 2 + 1):
+            fecha = inicio + timedelta(seconds=rnd.randrange(segundos_totales))
+            total = 0.0
+            for _ in range(rnd.randint(1, 3)):
+                item_id += 1
+                tipo = rnd.random()
+                if tipo < 0.80:
+                    producto_id = rnd.randint(1, len(PRODUCTOS))
+                    nombre, precio, _ = PRODUCTOS[producto_id - 1]
+                    cantidad = rnd.randint(1, 4)
+                    item = {"producto_id": producto_id, "tipo_item": "producto", "nombre_producto": nombre,
+                            "cantidad": cantidad, "precio_unitario": precio, "habitacion": None}
+                elif tipo < 0.95:
+                    cantidad = rnd.randint(1, 3)
+                    precio = 0.25
+                    item = {"producto_id": None, "tipo_item": "bano",
+                            "nombre_producto": f"Uso de baño ({cantidad} personas)",
+                            "cantidad": cantidad, "precio_unitario": precio, "habitacion": None}
+                else:
+                    habitacion = str(rnd.randint(101, 120))
+                    cantidad, precio = 1, float(rnd.choice([15, 20, 25, 35]))
+                    item = {"producto_id": None, "tipo_item": "hotel",
+                            "nombre_producto": f"Habitación {habitacion}",
+                            "cantidad": cantidad, "precio_unitario": precio, "habitacion": habitacion}
+                subtotal = round(precio * cantidad, 2)
+                total += subtotal
+                items.append({**item, "id": item_id, "venta_id": venta_id, "subtotal": subtotal})
+            ventas.append({
+                "id": venta_id, "total": round(total, 2), "fecha": fecha,
+                "metodo_pago": rnd.choices(["efectivo", "tarjeta", "transferencia"], [0.7, 0.2, 0.1])[0],
+                "detalles": None,
+            })
+            if len(ventas) >= TAMANO_LOTE:
+                insertar(conn, VentaServicio.__table__, ventas)
+                insertar(conn, ItemVentaServicio.__table__, items)
+                ventas, items = [], []
+        insertar(conn, VentaServicio.__table__, ventas)
+        insertar(conn, ItemVentaServicio.__table__, items)
+
+        # ── CAJAS DIARIAS (cerradas), DENOMINACIONES Y EGRESOS ──
+        cajas, denominaciones, egresos = [], [], []
+        for caja_id in range(1, dias + 1):
+            apertura = inicio + timedelta(days=caja_id - 1, hours=7)
+            cierre = apertura + timedelta(hours=15)
+            monto_inicial = float(rnd.choice([20, 50, 100]))
+            total_parqueo = round(rnd.uniform(50, 250), 2)
+            total_servicios = round(rnd.uniform(10, 120), 2)
+            total_egresos = 0.0
+            for _ in range(rnd.randint(0, 2)):
+                monto = float(rnd.choice([5, 10, 20]))
+                total_egresos += monto
+                egresos.append({
+                    "caja_id": caja_id, "monto": monto, "descripcion": "Retiro de efectivo",
+                    "operador": "bench", "fecha": apertura + timedelta(hours=rnd.randint(1, 14)),
+                })
+            esperado = round(monto_inicial + total_parqueo + total_servicios - total_egresos, 2)
+            monto_final = round(esperado + rnd.choice([0, 0, 0, -0.25, 0.5]), 2)
+            cajas.append({
+                "id": caja_id, "monto_inicial": monto_inicial, "fecha_apertura": apertura,
+                "operador_apertura": "bench", "monto_final": monto_final, "fecha_cierre": cierre,
+                "operador_cierre": "bench", "total_parqueo": total_parqueo,
+                "total_servicios": total_servicios,
+                "total_ingresos": round(total_parqueo + total_servicios, 2),
+                "monto_esperado": esperado, "diferencia": round(monto_final - esperado, 2),
+                "estado": "CERRADA", "notas_apertura": None, "notas_cierre": None,
+            })
+            for tipo, monto in (("apertura", monto_inicial), ("cierre", monto_final)):
+                restante = monto
+                for valor in DENOMINACIONES:
+                    cantidad = int(round(restante, 2) // valor)
+                    if cantidad:
+                        restante = round(restante - cantidad * valor, 2)
+                        denominaciones.append({
+                            "caja_id": caja_id, "tipo": tipo, "denominacion": valor,
+                            "cantidad": cantidad, "subtotal": round(cantidad * valor, 2),
+                            "fecha_registro": apertura if tipo == "apertura" else cierre,
+                        })
+        insertar(conn, Caja.__table__, cajas)
+        insertar(conn, DenominacionCaja.__table__, denominaciones)
+        insertar(conn, EgresoCaja.__table__, egresos)
+
+    # Dejar todo en el archivo principal (se copia tal cual)
+    with engine.connect() as conn:
+        conn.execute(text("PRAGMA wal_checkpoint(TRUNCATE);"))
+    engine.dispose()
+    print(f"✅ {ruta_db}: {filas} facturas, {filas // 2} ventas, {dias} cajas (semilla {semilla})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generar datos sintéticos para benchmarks")
+    parser.add_argument("--filas", type=int, default=10000, help="Cantidad de facturas (10000, 100000, 1000000)")
+    parser.add_argument("--db", required=True, help="Ruta del archivo SQLite a crear")
+    parser.add_argument("--semilla", type=int, default=42)
+    args = parser.parse_args()
+    generar(args.db, args.filas, args.semilla)
@@ -7,11 +7,13 @@ Ejecutar desde la raíz del proyecto backend:
 
 from sqlalchemy import inspect
 from app.config import engine, Base
+from app.utils.esquema_db import agregar_columnas_faltantes, crear_indices_faltantes, migrar_vehiculos_activos, crear_vistas
 
 # IMPORTANTE:
 # Importar TODOS los modelos para que SQLAlchemy los registre
 from app.modelos.configuracion_precios import ConfiguracionPrecios
 from app.modelos.vehiculo_estacionado import VehiculoEstacionado
+from app.modelos.vehiculo_activo import VehiculoActivo
 from app.modelos.historial_factura import HistorialFactura
 from app.modelos.producto import Producto
 from app.modelos.venta_servicio import VentaServicio, ItemVentaServicio
@@ -19,6 +21,9 @@ from app.modelos.movimiento_manual import MovimientoManualCaja
 from app.modelos.caja import Caja, EstadoCaja
 from app.modelos.denominacion_caja import DenominacionCaja
 from app.modelos.egreso_caja import EgresoCaja
+from app.modelos.clave_idempotencia import ClaveIdempotencia
+from app.modelos.version_tarifa import VersionTarifa
+from app.modelos.sketch_duracion import SketchDuracion
 
 def migrar_base_datos():
     """Migrar base de datos sin perder datos existentes"""
@@ -44,6 +49,16 @@ def migrar_base_datos():
         else:
             print("ℹ️  No se crearon tablas nuevas (todas ya existían)")
 
+        # Columnas e índices nuevos sobre tablas existentes
+        agregar_columnas_faltantes(engine)
+        indices_creados = crear_indices_faltantes(engine)
+        if not indices_creados:
+            print("ℹ️  No se crearon índices nuevos")
+
+        # Vehículos activos a su tabla propia y vista de compatibilidad
+        migrar_vehiculos_activos(engine)
+        crear_vistas(engine)
+
         print("✅ Migración completada exitosamente")
         return True
 
@@ -0,0 +1,18 @@
+# tests/conftest.py
+"""
+Pruebas de propiedades de la lógica de cobro.
+
+Ejecutar desde backend:  python -m pytest tests
+(pytest está en benchmarks/requirements-bench.txt)
+
+Las pruebas no abren la base de datos, pero app.config fija su ruta al
+importarse: se apunta a un directorio temporal para no tocar data/.
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+os.environ.setdefault("SQLITE_DB_PATH", str(Path(tempfile.mkdtemp()) / "parqueaderos.db"))
+os.environ.setdefault("BACKUP_INTERVAL_HOURS", "0")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
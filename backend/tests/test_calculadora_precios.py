@@ -0,0 +1,288 @@
+# tests/test_calculadora_precios.py
+"""
+Propiedades de partir_estadia y calcular_costo sobre estadías aleatorias
+(semilla fija: una falla se reproduce igual en cada corrida).
+"""
+import math
+import random
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+from app.utils.calculadora_precios import CalculadoraPrecios
+from app.servicios.version_tarifa_service import LineaTarifas
+
+SEMILLA = 20261019
+CASOS = 1500
+
+# Ventanas nocturnas: cruzan la medianoche, dentro de un mismo día,
+# empiezan a medianoche y sin duración (inicio == fin)
+VENTANAS = [
+    (time(19, 0), time(7, 0)),
+    (time(22, 30), time(5, 45)),
+    (time(0, 0), time(6, 0)),
+    (time(1, 0), time(4, 30)),
+    (time(20, 0), time(23, 30)),
+    (time(7, 0), time(7, 0)),
+]
+
+
+def _precio(rng, desde, hasta, paso="0.05"):
+    """Múltiplo de `paso`: los costos en float suman sin errores de redondeo visibles"""
+    paso = Decimal(paso)
+    return paso * rng.randint(int(Decimal(desde) / paso), int(Decimal(hasta) / paso))
+
+
+def _tarifa(rng, ventana=None, **extra):
+    inicio, fin = ventana or rng.choice(VENTANAS)
+    return SimpleNamespace(
+        id=extra.pop("id", None),
+        vigente_desde=extra.pop("vigente_desde", None),
+        precio_0_5_min=_precio(rng, "0.05", "1.00"),
+        precio_6_30_min=_precio(rng, "0.05", "2.00"),
+        precio_31_60_min=_precio(rng, "0.50", "3.00"),
+        precio_hora_adicional=_precio(rng, "0.10", "4.00", paso="0.10"),
+        precio_nocturno=_precio(rng, "1.00", "15.00"),
+        hora_inicio_nocturno=inicio,
+        hora_fin_nocturno=fin,
+        rangos_personalizados=[],
+        **extra
+    )
+
+
+def _estadia(rng):
+    """Entrada con segundos; duración corta, de horas o de varios días"""
+    entrada = datetime(2026, 1, 1) + timedelta(seconds=rng.randint(0, 365 * 86400))
+    duracion = rng.choice((
+        lambda: rng.randint(0, 90 * 60),
+        lambda: rng.randint(0, 24 * 3600),
+        lambda: rng.randint(0, 4 * 86400),
+    ))()
+    return entrada, entrada + timedelta(seconds=duracion)
+
+
+def _casos():
+    rng = random.Random(SEMILLA)
+    for _ in range(CASOS):
+        yield rng, _tarifa(rng), *_estadia(rng)
+
+
+def _es_nocturno(instante, inicio, fin):
+    hora = instante.time()
+    if inicio < fin:
+        return inicio <= hora < fin
+    return hora >= inicio or hora < fin
+
+
+def _precio_anterior(minutos, config):
+    """Cobro y detalle de una estadía diurna antes de los tramos (solo rangos fijos)"""
+    if minutos <= 5:
+        return float(config.precio_0_5_min), f"0-5 minutos: ${config.precio_0_5_min}"
+    if minutos <= 30:
+        return float(config.precio_6_30_min), f"6-30 minutos: ${config.precio_6_30_min}"
+    if minutos <= 60:
+        return float(config.precio_31_60_min), f"31-60 minutos: ${config.precio_31_60_min}"
+    restantes = minutos - 60
+    bloques = math.ceil(restantes / 30.0)
+    por_bloque = float(config.precio_hora_adicional) / 2.0
+    return (
+        float(config.precio_31_60_min) + bloques * por_bloque,
+        f"Primera hora: ${config.precio_31_60_min} | "
+        f"{restantes} min adicionales ({bloques} bloques de 30min × ${por_bloque:.2f}): ${bloques * por_bloque:.2f}"
+    )
+
+
+# =========================
+# partir_estadia
+# =========================
+
+def test_tramos_contiguos_cubren_la_estadia():
+    for _, tarifa, entrada, salida in _casos():
+        tramos = CalculadoraPrecios.partir_estadia(
+            entrada, salida, tarifa.hora_inicio_nocturno, tarifa.hora_fin_nocturno
+        )
+        assert tramos[0][1] == entrada
+        assert tramos[-1][2] == max(salida, entrada)
+        for (_, _, fin_anterior), (_, inicio, _) in zip(tramos, tramos[1:]):
+            assert fin_anterior == inicio
+        if salida > entrada:
+            assert all(desde < hasta for _, desde, hasta in tramos)
+
+
+def test_tramos_respetan_la_ventana_nocturna():
+    """El tipo de cada tramo es el de su primer instante y ningún borde de la ventana cae dentro"""
+    for _, tarifa, entrada, salida in _casos():
+        inicio, fin = tarifa.hora_inicio_nocturno, tarifa.hora_fin_nocturno
+        for tipo, desde, hasta in CalculadoraPrecios.partir_estadia(entrada, salida, inicio, fin):
+            if desde == hasta:
+                continue
+            if inicio == fin:
+                assert tipo == "diurno"
+                continue
+            assert tipo == ("nocturno" if _es_nocturno(desde, inicio, fin) else "diurno")
+            dia = desde.date()
+            while dia <= hasta.date():
+                for hora in (inicio, fin):
+                    assert not desde < datetime.combine(dia, hora) < hasta
+                dia += timedelta(days=1)
+
+
+@pytest.mark.parametrize("entrada, salida, esperado", [
+    # Cruza la medianoche dentro de la ventana 19:00-07:00
+    (datetime(2026, 3, 1, 18, 0), datetime(2026, 3, 2, 8, 0), [
+        ("diurno", datetime(2026, 3, 1, 18, 0), datetime(2026, 3, 1, 19, 0)),
+        ("nocturno", datetime(2026, 3, 1, 19, 0), datetime(2026, 3, 2, 7, 0)),
+        ("diurno", datetime(2026, 3, 2, 7, 0), datetime(2026, 3, 2, 8, 0)),
+    ]),
+    # Entra de madrugada: la ventana abierta es la de la víspera
+    (datetime(2026, 3, 2, 2, 0), datetime(2026, 3, 2, 9, 0), [
+        ("nocturno", datetime(2026, 3, 2, 2, 0), datetime(2026, 3, 2, 7, 0)),
+        ("diurno", datetime(2026, 3, 2, 7, 0), datetime(2026, 3, 2, 9, 0)),
+    ]),
+    # Varios días: una ventana nocturna por noche
+    (datetime(2026, 3, 1, 12, 0), datetime(2026, 3, 4, 12, 0), [
+        ("diurno", datetime(2026, 3, 1, 12, 0), datetime(2026, 3, 1, 19, 0)),
+        ("nocturno", datetime(2026, 3, 1, 19, 0), datetime(2026, 3, 2, 7, 0)),
+        ("diurno", datetime(2026, 3, 2, 7, 0), datetime(2026, 3, 2, 19, 0)),
+        ("nocturno", datetime(2026, 3, 2, 19, 0), datetime(2026, 3, 3, 7, 0)),
+        ("diurno", datetime(2026, 3, 3, 7, 0), datetime(2026, 3, 3, 19, 0)),
+        ("nocturno", datetime(2026, 3, 3, 19, 0), datetime(2026, 3, 4, 7, 0)),
+        ("diurno", datetime(2026, 3, 4, 7, 0), datetime(2026, 3, 4, 12, 0)),
+    ]),
+])
+def test_ventana_que_cruza_medianoche(entrada, salida, esperado):
+    assert CalculadoraPrecios.partir_estadia(entrada, salida, time(19, 0), time(7, 0)) == esperado
+
+
+def test_ventana_sin_duracion_no_tiene_horario_nocturno():
+    entrada, salida = datetime(2026, 3, 1, 18, 0), datetime(2026, 3, 3, 8, 0)
+    assert CalculadoraPrecios.partir_estadia(entrada, salida, time(7, 0), time(7, 0)) == [
+        ("diurno", entrada, salida)
+    ]
+
+
+# =========================
+# calcular_costo
+# =========================
+
+def test_minutos_de_los_tramos_suman_el_total():
+    for _, tarifa, entrada, salida in _casos():
+        resultado = CalculadoraPrecios.calcular_costo(entrada, salida, tarifa)
+        if resultado["desglose"]:
+            assert sum(t["minutos"] for t in resultado["desglose"]) == resultado["minutos"]
+            assert math.isclose(sum(t["costo"] for t in resultado["desglose"]), resultado["costo"], abs_tol=1e-9)
+
+
+def test_costo_no_supera_la_tarifa_diurna():
+    for _, tarifa, entrada, salida in _casos():
+        resultado = CalculadoraPrecios.calcular_costo(entrada, salida, tarifa)
+        diurna = CalculadoraPrecios._tarifa_rangos(resultado["minutos"], tarifa)
+        assert resultado["costo"] <= round(diurna, 2) + 1e-9
+
+
+def test_tramo_nocturno_con_tope():
+    for _, tarifa, entrada, salida in _casos():
+        for tramo in CalculadoraPrecios.calcular_costo(entrada, salida, tarifa)["desglose"]:
+            if tramo["tipo"] == "nocturno":
+                assert tramo["costo"] <= float(tarifa.precio_nocturno) + 1e-9
+            else:
+                assert not tramo["tope_nocturno"]
+
+
+def test_estadia_diurna_conserva_precio_y_detalle():
+    revisadas = 0
+    for _, tarifa, entrada, salida in _casos():
+        tramos = CalculadoraPrecios.partir_estadia(
+            entrada, salida, tarifa.hora_inicio_nocturno, tarifa.hora_fin_nocturno
+        )
+        if any(tipo == "nocturno" for tipo, _, _ in tramos):
+            continue
+        resultado = CalculadoraPrecios.calcular_costo(entrada, salida, tarifa)
+        costo, detalles = _precio_anterior(resultado["minutos"], tarifa)
+        assert resultado["costo"] == round(costo, 2)
+        assert resultado["detalles"] == detalles
+        assert resultado["tipo"] == "normal"
+        revisadas += 1
+    assert revisadas > CASOS // 10
+
+
+def test_estadia_de_varios_dias():
+    rng = random.Random(SEMILLA)
+    tarifa = _tarifa(rng, VENTANAS[0])
+    entrada = datetime(2026, 3, 1, 12, 0)
+    resultado = CalculadoraPrecios.calcular_costo(entrada, entrada + timedelta(days=3), tarifa)
+    nocturnos = [t for t in resultado["desglose"] if t["tipo"] == "nocturno"]
+    assert len(nocturnos) == 3
+    assert all(t["minutos"] == 12 * 60 for t in nocturnos)
+    assert resultado["minutos"] == 3 * 24 * 60
+
+
+# =========================
+# Versiones de tarifa
+# =========================
+
+def _estadia_con_cambio(rng, linea):
+    """Estadía aleatoria; la mitad de las veces cruza un cambio de versión"""
+    if rng.random() < 0.5:
+        cambio = rng.choice(linea.fechas[1:])
+        return (cambio - timedelta(seconds=rng.randint(1, 2 * 86400)),
+                cambio + timedelta(seconds=rng.randint(1, 2 * 86400)))
+    return _estadia(rng)
+
+
+def _linea(rng, iguales=False):
+    """2-4 versiones con cambios dentro de 2026; `iguales`: todas con la misma tarifa"""
+    cambios = sorted(
+        datetime(2026, 1, 1) + timedelta(minutes=rng.randint(0, 365 * 1440)) for _ in range(rng.randint(1, 3))
+    )
+    base = _tarifa(rng)
+    versiones = []
+    for numero, vigente_desde in enumerate([datetime(2000, 1, 1)] + cambios, 1):
+        if iguales:
+            version = SimpleNamespace(**dict(vars(base), id=numero, vigente_desde=vigente_desde))
+        else:
+            version = _tarifa(rng, id=numero, vigente_desde=vigente_desde)
+        versiones.append(version)
+    return LineaTarifas(versiones)
+
+
+def test_tramos_por_version_de_tarifa():
+    rng = random.Random(SEMILLA)
+    for _ in range(CASOS):
+        linea = _linea(rng)
+        entrada, salida = _estadia_con_cambio(rng, linea)
+
+        resultado = CalculadoraPrecios.calcular_costo(entrada, salida, linea.vigente_en(entrada), versiones=linea)
+        if not resultado["desglose"]:
+            continue
+        assert sum(t["minutos"] for t in resultado["desglose"]) == resultado["minutos"]
+        por_id = {v.id: v for v in linea.versiones}
+        noche, topes = 0.0, []
+        for anterior, tramo in zip([None] + resultado["desglose"], resultado["desglose"]):
+            desde, hasta = datetime.fromisoformat(tramo["inicio"]), datetime.fromisoformat(tramo["fin"])
+            version = linea.vigente_en(desde)
+            assert tramo["version_tarifa"] == version.id
+            # Ningún tramo cruza un cambio de versión
+            assert not any(desde < fecha < hasta for fecha in linea.fechas)
+            if anterior is not None:
+                assert anterior["fin"] == tramo["inicio"]
+            if tramo["tipo"] == "nocturno":
+                # Una noche partida por un cambio de versión tiene un solo tope
+                if anterior is None or anterior["tipo"] != "nocturno":
+                    noche, topes = 0.0, []
+                noche += tramo["costo"]
+                topes.append(float(por_id[tramo["version_tarifa"]].precio_nocturno))
+                assert noche <= max(topes) + 1e-9
+
+
+def test_versiones_iguales_cobran_lo_mismo_que_sin_versiones():
+    rng = random.Random(SEMILLA)
+    for _ in range(CASOS):
+        linea = _linea(rng, iguales=True)
+        entrada, salida = _estadia_con_cambio(rng, linea)
+        con_versiones = CalculadoraPrecios.calcular_costo(entrada, salida, linea.versiones[0], versiones=linea)
+        sin_versiones = CalculadoraPrecios.calcular_costo(entrada, salida, linea.versiones[0])
+        assert con_versiones["minutos"] == sin_versiones["minutos"]
+        assert math.isclose(con_versiones["costo"], sin_versiones["costo"], abs_tol=1e-9)
@@ -2,7 +2,7 @@
 
 import { useState } from "react"
 import useSWR from "swr"
-import { obtenerHistorial } from "@/servicios/vehiculoService"
+import { obtenerHistorial, obtenerHistorialRango } from "@/servicios/vehiculoService"
 import { obtenerReporteDiario } from "@/servicios/reporteService"
 import { Button } from "@/components/ui/button"
 import { Input } from "@/components/ui/input"
@@ -59,58 +59,27 @@ export function HistoryTable() {
   const { data, error, isLoading } = useSWR(
     ["historial", tipoFiltro === "dia" ? fecha : mes, tipoFiltro],
     async () => {
+      // El backend filtra por rango de fechas y pagina; se siguen todas las páginas
+      if (tipoFiltro === "dia" && fecha) {
+        // @ts-ignore
+        return await obtenerHistorialRango(fecha, fecha)
+      } else if (tipoFiltro === "mes" && mes) {
+        const [anio, mesNum] = mes.split("-")
+        const ultimoDia = new Date(parseInt(anio), parseInt(mesNum), 0).getDate()
+        // @ts-ignore
+        return await obtenerHistorialRango(`${mes}-01`, `${mes}-${String(ultimoDia).padStart(2, "0")}`)
+      }
+
+      // Sin filtro: solo las facturas más recientes
       // @ts-ignore
       const todos = await obtenerHistorial(null, 1000)
 
-      console.log("Datos recibidos:", todos)
-
-      // Extraer el array de facturas
-      let todasFacturas = []
       if (todos?.success && todos.data) {
-        todasFacturas = todos.data
+        return todos.data
       } else if (Array.isArray(todos)) {
-        todasFacturas = todos
-      } else {
         return todos
       }
-
-      console.log("Total facturas:", todasFacturas.length)
-
-      if (tipoFiltro === "dia" && fecha) {
-        // Filtrar por día - comparar solo la fecha sin hora
-        const fechaSeleccionada = new Date(fecha + "T00:00:00")
-        const facturasFiltradas = todasFacturas.filter((factura: FacturaHistorial) => {
-          // Usar fecha_hora_salida en lugar de fecha_generacion para evitar problemas de zona horaria
-          const fechaFactura = new Date(factura.fecha_hora_salida)
-          const coincide = fechaFactura.getFullYear() === fechaSeleccionada.getFullYear() &&
-            fechaFactura.getMonth() === fechaSeleccionada.getMonth() &&
-            fechaFactura.getDate() === fechaSeleccionada.getDate()
-
-          console.log(`Factura ${factura.placa}:`, {
-            fecha_hora_salida: factura.fecha_hora_salida,
-            fechaFactura: fechaFactura.toLocaleDateString(),
-            fechaSeleccionada: fechaSeleccionada.toLocaleDateString(),
-            coincide
-          })
-
-          return coincide
-        })
-
-        console.log("Facturas filtradas:", facturasFiltradas.length)
-        return facturasFiltradas
-      } else if (tipoFiltro === "mes" && mes) {
-        // Filtrar por mes
-        const [anio, mesNum] = mes.split("-")
-        const facturasFiltradas = todasFacturas.filter((factura: FacturaHistorial) => {
-          // Usar fecha_hora_salida para consistencia
-          const fechaFactura = new Date(factura.fecha_hora_salida)
-          return fechaFactura.getFullYear() === parseInt(anio) &&
-            (fechaFactura.getMonth() + 1) === parseInt(mesNum)
-        })
-        return facturasFiltradas
-      }
-
-      return todasFacturas
+      return todos
     },
     {
       refreshInterval: 30000,
@@ -173,6 +173,42 @@ export async function obtenerHistorial(fecha = null, limite = 50) {
   }
 }
 
+// ============================
+// 📌 Obtener historial completo de un rango de fechas (YYYY-MM-DD, inclusive)
+// Sigue siguiente_cursor hasta agotar las páginas
+// ============================
+export async function obtenerHistorialRango(fechaDesde, fechaHasta, limite = 1000) {
+  try {
+    const facturas = [];
+    let cursor = null;
+
+    do {
+      let url = `${VEHICULO_URL}/historial?limite=${limite}` +
+        `&fecha_desde=${fechaDesde}&fecha_hasta=${fechaHasta}`;
+      if (cursor) {
+        url += `&cursor=${encodeURIComponent(cursor)}`;
+      }
+
+      const response = await fetch(url, {
+        method: "GET",
+      });
+
+      if (!response.ok) {
+        throw new Error("Error al obtener el historial");
+      }
+
+      const pagina = await response.json();
+      facturas.push(...(pagina.data || []));
+      cursor = pagina.siguiente_cursor;
+    } while (cursor);
+
+    return facturas;
+  } catch (error) {
+    console.error("Error en obtenerHistorialRango:", error);
+    throw error;
+  }
+}
+
 // ============================
 // 📌 Obtener lista de deudores
 // ============================